@@ -0,0 +1,192 @@
+"""Generates realistic synthetic data for the benchmarks: plant API payloads
+in the shape the Plant API returns them, rows as the RDS returns them to the
+mover, and recording histories in the shape of the archive .csv.
+
+Readings follow a daily temperature cycle, and soil moisture dries out
+steadily between waterings roughly every 12 hours, so aggregates and alerts
+see the same kind of data as production.
+
+Run with: python generate_data.py --plants 500 --days 30 --output ./data"""
+
+import argparse
+import json
+from os import makedirs, path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+CONTINENT_CITIES = ["Europe/Berlin", "Europe/London", "America/New_York",
+                    "America/Sao_Paulo", "Asia/Tokyo", "Asia/Kolkata",
+                    "Africa/Lagos", "Australia/Sydney", "Pacific/Honolulu"]
+
+FIRST_NAMES = ["Gertrude", "Eliza", "Carl", "Marianne", "Joseph", "Ynes"]
+LAST_NAMES = ["Jekyll", "Andrews", "Linnaeus", "North", "Hooker", "Mexia"]
+
+WATERING_HOURS = 12
+RECORDING_COLUMNS = ['recording_id', 'plant_id', 'last_watered',
+                     'soil_moisture', 'temperature', 'recording_taken']
+
+
+def make_plants(plant_count: int, seed: int = 0) -> pd.DataFrame:
+    """Returns the fixed details of each plant: name, location and botanist."""
+    rng = np.random.default_rng(seed)
+    plant_ids = np.arange(1, plant_count + 1)
+    botanist_count = max(plant_count // 10, 1)
+    botanists = rng.integers(0, botanist_count, plant_count)
+
+    return pd.DataFrame({
+        'plant_id': plant_ids,
+        'name': [f"Plant Species {plant_id}" for plant_id in plant_ids],
+        'scientific_name': [f"Plantae synthetica {plant_id}" for plant_id in plant_ids],
+        'latitude': rng.uniform(-60, 60, plant_count).round(5),
+        'longitude': rng.uniform(-180, 180, plant_count).round(5),
+        'town': [f"Town {plant_id % 97}" for plant_id in plant_ids],
+        'country_code': rng.choice(["DE", "GB", "US", "BR", "JP", "IN", "NG", "AU"],
+                                   plant_count),
+        'continent_city': rng.choice(CONTINENT_CITIES, plant_count),
+        'botanist_name': [f"{FIRST_NAMES[botanist % len(FIRST_NAMES)]} "
+                          f"{LAST_NAMES[botanist % len(LAST_NAMES)]}{botanist}"
+                          for botanist in botanists],
+        'botanist_email': [f"botanist{botanist}@lnhm.co.uk" for botanist in botanists],
+        'botanist_phone': [f"001-481-273-{botanist:04d}" for botanist in botanists],
+        'moisture_level': rng.uniform(40, 80, plant_count),
+        'base_temperature': rng.uniform(10, 25, plant_count),
+        'watering_offset': rng.uniform(0, WATERING_HOURS, plant_count)
+    })
+
+
+def simulate_readings(plants_df: pd.DataFrame, times: pd.DatetimeIndex,
+                      seed: int = 0) -> pd.DataFrame:
+    """Returns one reading per plant per time, ordered by time then plant."""
+    rng = np.random.default_rng(seed)
+    plant_count, time_count = len(plants_df), len(times)
+
+    hours = (times - times[0]) / pd.Timedelta(hours=1)
+    hours = np.asarray(hours, dtype=np.float64)[:, None]
+    offsets = plants_df['watering_offset'].to_numpy()[None, :]
+
+    hours_since_watered = (hours + offsets) % WATERING_HOURS
+    watered_at = times.to_numpy()[:, None] - (
+        hours_since_watered * 3600).astype('timedelta64[s]')
+
+    soil_moisture = (plants_df['moisture_level'].to_numpy()[None, :]
+                     - 2.5 * hours_since_watered
+                     + rng.normal(0, 1, (time_count, plant_count)))
+    temperature = (plants_df['base_temperature'].to_numpy()[None, :]
+                   + 4 * np.sin(2 * np.pi * (hours % 24) / 24)
+                   + rng.normal(0, 0.3, (time_count, plant_count)))
+
+    return pd.DataFrame({
+        'plant_id': np.tile(plants_df['plant_id'].to_numpy(), time_count),
+        'last_watered': pd.to_datetime(watered_at.ravel()).floor('s'),
+        'soil_moisture': soil_moisture.ravel(),
+        'temperature': temperature.ravel(),
+        'recording_taken': np.repeat(times.to_numpy(), plant_count)
+    })
+
+
+def make_api_payloads(plant_count: int, reading_time: datetime = None,
+                      seed: int = 0) -> list[dict]:
+    """Returns one Plant API response per plant, as of reading_time."""
+    plants_df = make_plants(plant_count, seed)
+    reading_time = pd.Timestamp(reading_time or datetime.now()).floor('s')
+    readings_df = simulate_readings(plants_df, pd.DatetimeIndex([reading_time]), seed)
+
+    payloads = []
+    for plant, reading in zip(plants_df.itertuples(), readings_df.itertuples()):
+        image_url = f"https://perenual.com/storage/species_image/{plant.plant_id}/og/plant.jpg"
+        payloads.append({
+            "botanist": {
+                "email": plant.botanist_email,
+                "name": plant.botanist_name,
+                "phone": plant.botanist_phone
+            },
+            "images": {
+                "license": 45,
+                "license_name": "Attribution-ShareAlike 3.0 Unported (CC BY-SA 3.0)",
+                "license_url": "https://creativecommons.org/licenses/by-sa/3.0/deed.en",
+                "medium_url": image_url, "original_url": image_url,
+                "regular_url": image_url, "small_url": image_url,
+                "thumbnail": image_url
+            },
+            "last_watered": reading.last_watered.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            "name": plant.name,
+            "origin_location": [str(plant.latitude), str(plant.longitude), plant.town,
+                                plant.country_code, plant.continent_city],
+            "plant_id": int(plant.plant_id),
+            "recording_taken": reading.recording_taken.strftime("%Y-%m-%d %H:%M:%S"),
+            "scientific_name": [plant.scientific_name],
+            "soil_moisture": float(reading.soil_moisture),
+            "temperature": float(reading.temperature)
+        })
+
+    return payloads
+
+
+def make_recordings_history(plant_count: int, days: float, end: datetime = None,
+                            freq: str = '1min', seed: int = 0) -> pd.DataFrame:
+    """Returns days of readings for every plant ending at end, newest first,
+    with the columns and string timestamps of the archive .csv."""
+    plants_df = make_plants(plant_count, seed)
+    end = pd.Timestamp(end or datetime.now()).floor(freq)
+    times = pd.date_range(end=end, periods=int(pd.Timedelta(days=days) / pd.Timedelta(freq)),
+                          freq=freq)
+
+    history_df = simulate_readings(plants_df, times, seed).iloc[::-1]
+    history_df.insert(0, 'recording_id', np.arange(len(history_df), 0, -1))
+    history_df['last_watered'] = history_df['last_watered'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    history_df['recording_taken'] = history_df['recording_taken'].dt.strftime(
+        '%Y-%m-%d %H:%M:%S')
+
+    return history_df[RECORDING_COLUMNS].reset_index(drop=True)
+
+
+def make_rds_rows(history_df: pd.DataFrame) -> dict[str, list]:
+    """Returns recordings as the RDS returns them to the mover, as a list
+    of values per column with datetime timestamps."""
+    rows_df = history_df.copy()
+    rows_df['last_watered'] = pd.to_datetime(rows_df['last_watered'])
+    rows_df['recording_taken'] = pd.to_datetime(rows_df['recording_taken'])
+
+    return {column: (rows_df[column].dt.to_pydatetime().tolist()
+                     if column in ('last_watered', 'recording_taken')
+                     else rows_df[column].tolist())
+            for column in rows_df.columns}
+
+
+def make_continents(plant_count: int, seed: int = 0) -> pd.DataFrame:
+    """Returns the continent of each plant, as query_plant_continents does."""
+    plants_df = make_plants(plant_count, seed)
+
+    return pd.DataFrame({
+        'plant_id': plants_df['plant_id'],
+        'continent_name': plants_df['continent_city'].str.split('/').str[0]
+    })
+
+
+def main() -> None:
+    """Writes a set of synthetic data files to the output folder."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plants", type=int, default=50)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="./data")
+    args = parser.parse_args()
+
+    makedirs(args.output, exist_ok=True)
+
+    with open(path.join(args.output, "api_payloads.json"), 'w', encoding='utf-8') as file:
+        json.dump(make_api_payloads(args.plants, seed=args.seed), file)
+
+    history_df = make_recordings_history(args.plants, args.days, seed=args.seed)
+    history_df.to_csv(path.join(args.output, "recordings_history.csv"), index=False)
+    make_continents(args.plants, args.seed).to_csv(
+        path.join(args.output, "plant_continents.csv"), index=False)
+
+    print(f"Wrote {args.plants} API payloads and {len(history_df)} recordings "
+          f"to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Runs each stage of the pipeline, mover and dashboard on synthetic data,
+fully offline, and reports the time and peak memory of each stage.
+
+The Plant API is replaced by a local stand-in for requests.get, the RDS by a
+cursor that answers every query instantly and counts them, and the S3 bucket
+by files in a temporary folder, so the timings measure this code alone.
+Results are saved as JSON and compared with the previous run with the same
+parameters, so regressions show up as a change against the last run.
+
+Run with: python run_benchmarks.py --plants 500 --days 30
+
+Logging from the stages is switched off while they run, as printing every
+log line would dominate the timings."""
+
+import argparse
+import json
+import logging
+import sys
+import tracemalloc
+from glob import glob
+from os import makedirs, path
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest.mock import patch
+import pandas as pd
+
+REPO_ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+for folder in ("pipeline", "database", "streamlit"):
+    sys.path.append(path.join(REPO_ROOT, folder))
+
+# pylint: disable=wrong-import-position
+import generate_data
+import extract
+import transform
+import alerts
+import load
+import lambda_mover
+from external_merge import merge_recordings_csv
+from archive_format import convert_csv_to_archive, read_archive
+from rollups import make_all_rollups
+from compact import compact_recordings
+from bucketing import bucket_aggregate
+from downsample import downsample
+
+
+RESULTS_DIR = path.join(path.dirname(path.abspath(__file__)), "results")
+REGRESSION_THRESHOLD = 0.2
+
+
+class FakeResponse:
+    """Stands in for a requests.Response from the Plant API."""
+
+    def __init__(self, payload: dict, status_code: int = 200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self) -> dict:
+        """Returns the response body."""
+        return self.payload
+
+
+class FakePlantAPI:
+    """Stands in for requests.get, answering from generated payloads."""
+
+    def __init__(self, payloads: list[dict]):
+        self.payloads = {payload["plant_id"]: payload for payload in payloads}
+        self.calls = 0
+
+    def __call__(self, url: str, *args, **kwargs) -> FakeResponse:
+        self.calls += 1
+        plant_id = int(url.rstrip("/").rsplit("/", 1)[-1])
+        if plant_id not in self.payloads:
+            return FakeResponse({"error": "plant not found", "plant_id": plant_id}, 404)
+        return FakeResponse(self.payloads[plant_id])
+
+
+class FakeCursor:
+    """Stands in for a pymssql cursor, counting queries instead of running
+    them. Every lookup finds id 0 and every duplicate check finds nothing."""
+
+    def __init__(self, continents: list[str]):
+        self.continents = [(index, name) for index, name in enumerate(continents)]
+        self.queries = 0
+
+    def execute(self, query: str, params=None) -> None:
+        """Counts the query."""
+        self.queries += 1
+
+    def executemany(self, query: str, rows) -> None:
+        """Counts each row of the batch as a query."""
+        self.queries += len(list(rows))
+
+    def fetchone(self) -> tuple:
+        """Returns a single 0, the id or count of every lookup."""
+        return (0,)
+
+    def fetchall(self) -> list:
+        """Returns the continents, the only table read with fetchall."""
+        return self.continents
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeConnection:
+    """Stands in for a pymssql connection with a single FakeCursor."""
+
+    def __init__(self, cursor: FakeCursor):
+        self.fake_cursor = cursor
+
+    def cursor(self, *args, **kwargs) -> FakeCursor:
+        """Returns the shared cursor."""
+        return self.fake_cursor
+
+    def commit(self) -> None:
+        """Nothing to commit."""
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+def bench_extract(data: dict) -> dict:
+    """Extracts every plant from the stand-in Plant API."""
+    fake_api = FakePlantAPI(data["payloads"])
+    with patch.object(extract.requests, "get", fake_api):
+        plant_data = extract.get_all_plant_data()
+    return {"plants": len(plant_data), "requests": fake_api.calls}
+
+
+def bench_transform(data: dict) -> dict:
+    """Transforms, validates and cleans every payload into the PLANT_DATA.csv df."""
+    plant_df, quarantine_df = transform.validate_data(
+        transform.insert_in_dataframe(data["payloads"]))
+    plant_df = transform.clean_data(plant_df)
+    return {"rows": len(plant_df), "quarantined": len(quarantine_df)}
+
+
+def bench_alerts(data: dict) -> dict:
+    """Checks one run of readings against an hour of rolling statistics."""
+    readings_df = alerts.prepare_readings(data["plant_df"])
+    found = alerts.find_alerts(readings_df, data["alert_state"])
+    alerts.update_state(readings_df, data["alert_state"])
+    return {"alerts": len(found)}
+
+
+def bench_load(data: dict) -> dict:
+    """Loads one run of transformed data through the stand-in RDS."""
+    cursor = FakeCursor(data["continent_names"])
+    with patch.object(load, "get_connection", lambda: FakeConnection(cursor)), \
+            patch.object(load, "load_csv", lambda: data["plant_df"].copy()), \
+            patch.object(load, "config_log", lambda: None):
+        load.load_data_into_database()
+    return {"queries": cursor.queries}
+
+
+def bench_mover(data: dict) -> dict:
+    """Archives the RDS rows older than a day: converts them, merges them
+    into the archive .csv, writes the .rec archive and builds the rollups."""
+    recordings_df = lambda_mover.convert_data_to_df(data["rds_rows"])
+    output_csv = path.join(data["workdir"], "updated_recordings_data.csv")
+    rows = merge_recordings_csv(recordings_df, data["archive_csv"], output_csv)
+    convert_csv_to_archive(output_csv, path.join(data["workdir"], "updated.rec"))
+    make_all_rollups(recordings_df, data["continents_df"])
+    return {"archived_rows": len(recordings_df), "archive_rows": rows}
+
+
+def bench_dashboard(data: dict) -> dict:
+    """Builds the dashboard's aggregations from the merged history: the
+    compact frame, the 30-minute trend, one plant's readings by minute and
+    the hourly continent averages, each downsampled for its chart."""
+    compact_df = compact_recordings(data["history_df"])
+
+    trend_df = bucket_aggregate(
+        compact_df, 'recording_taken', '30min',
+        {'soil_moisture': ('soil_moisture', 'mean'),
+         'temperature': ('temperature', 'mean')}, fill_empty=True)
+    trend_df = trend_df.melt(id_vars='recording_taken', var_name='Measurement',
+                             value_name='Value')
+    downsample(trend_df, 'recording_taken', 'Value', 'Measurement')
+
+    plant_df = read_archive(data["archive_rec"], plant_id=1)
+    minute_df = bucket_aggregate(
+        plant_df, 'recording_taken', '1min',
+        {'soil_moisture': ('soil_moisture', 'mean'),
+         'temperature': ('temperature', 'mean')})
+    downsample(minute_df.assign(stack_height=minute_df['soil_moisture']
+                                + minute_df['temperature']),
+               'recording_taken', 'stack_height', method='minmax')
+
+    continent_df = compact_df.merge(data["continents_df"], on='plant_id')
+    hourly_df = bucket_aggregate(
+        continent_df, 'recording_taken', '1h',
+        {'soil_moisture': ('soil_moisture', 'mean')}, group_column='continent_name')
+    downsample(hourly_df, 'recording_taken', 'soil_moisture', 'continent_name')
+
+    return {"history_rows": len(compact_df), "plant_rows": len(plant_df)}
+
+
+STAGES = {
+    "extract": bench_extract,
+    "transform": bench_transform,
+    "alerts": bench_alerts,
+    "load": bench_load,
+    "mover": bench_mover,
+    "dashboard": bench_dashboard
+}
+
+
+def prepare_data(plants: int, days: float, mover_hours: float, workdir: str) -> dict:
+    """Generates the inputs shared by the stages, outside of any timing.
+    The mover archives the mover_hours of recordings just over a day old."""
+    print(f"Generating {plants} plants with {days} days of history...")
+    end = datetime.now().replace(second=0, microsecond=0)
+    payloads = generate_data.make_api_payloads(plants, end)
+    plant_df = transform.clean_data(transform.insert_in_dataframe(payloads))
+    continents_df = generate_data.make_continents(plants)
+
+    history_df = generate_data.make_recordings_history(plants, days, end)
+    recording_taken = pd.to_datetime(history_df['recording_taken'])
+    day_ago = pd.Timestamp(end) - pd.Timedelta(days=1)
+    archive_df = history_df[recording_taken < day_ago]
+    moved_df = archive_df[pd.to_datetime(archive_df['recording_taken'])
+                          >= day_ago - pd.Timedelta(hours=mover_hours)]
+    archive_df = archive_df.iloc[len(moved_df):]
+
+    archive_csv = path.join(workdir, "existing_recordings.csv")
+    archive_df.to_csv(archive_csv, index=False)
+    archive_rec = path.join(workdir, "history.rec")
+    history_csv = path.join(workdir, "history.csv")
+    history_df.to_csv(history_csv, index=False)
+    convert_csv_to_archive(history_csv, archive_rec)
+
+    alert_state = alerts.empty_state()
+    for minutes_ago in range(60, 0, -1):
+        minute_payloads = generate_data.make_api_payloads(
+            plants, end - pd.Timedelta(minutes=minutes_ago))
+        minute_df = alerts.prepare_readings(
+            transform.clean_data(transform.insert_in_dataframe(minute_payloads)))
+        alert_state = alerts.update_state(minute_df, alert_state)
+
+    return {
+        "workdir": workdir,
+        "payloads": payloads,
+        "plant_df": plant_df,
+        "alert_state": alert_state,
+        "continent_names": sorted(continents_df['continent_name'].unique()),
+        "continents_df": continents_df,
+        "rds_rows": generate_data.make_rds_rows(moved_df),
+        "archive_csv": archive_csv,
+        "archive_rec": archive_rec,
+        "history_df": history_df
+    }
+
+
+def measure(stage, data: dict, repeat: int) -> dict:
+    """Returns the best time of repeat untraced runs of a stage, then the
+    peak memory of one run traced with tracemalloc."""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        details = stage(data)
+        times.append(perf_counter() - start)
+
+    tracemalloc.start()
+    stage(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(times), "peak_mb": peak / 1024 ** 2, **details}
+
+
+def find_previous_results(parameters: dict, results_dir: str) -> dict:
+    """Returns the latest saved results run with the same parameters."""
+    for results_path in sorted(glob(path.join(results_dir, "*.json")), reverse=True):
+        with open(results_path, encoding='utf-8') as results_file:
+            results = json.load(results_file)
+        if results.get("parameters") == parameters:
+            return results
+    return None
+
+
+def save_results(results: dict, results_dir: str) -> str:
+    """Saves the results as a timestamped JSON file, returning its path."""
+    makedirs(results_dir, exist_ok=True)
+    results_path = path.join(results_dir,
+                             f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(results_path, 'w', encoding='utf-8') as results_file:
+        json.dump(results, results_file, indent=2)
+    return results_path
+
+
+def change(current: float, previous: float) -> str:
+    """Formats the change from previous to current as a percentage,
+    marking changes beyond the regression threshold."""
+    if not previous:
+        return ""
+    ratio = current / previous - 1
+    marker = " !" if ratio > REGRESSION_THRESHOLD else ""
+    return f"{ratio:+.0%}{marker}"
+
+
+def report(results: dict, previous: dict) -> None:
+    """Prints each stage's time and memory, with the change from the
+    previous run where there is one."""
+    previous_stages = previous["stages"] if previous else {}
+    print(f"\n{'stage':<11}{'time (s)':>10}{'change':>9}{'peak (MB)':>11}{'change':>9}"
+          "  details")
+
+    for name, stage in results["stages"].items():
+        before = previous_stages.get(name, {})
+        details = ", ".join(f"{key}={value}" for key, value in stage.items()
+                            if key not in ("seconds", "peak_mb"))
+        print(f"{name:<11}{stage['seconds']:>10.3f}"
+              f"{change(stage['seconds'], before.get('seconds')):>9}"
+              f"{stage['peak_mb']:>11.1f}"
+              f"{change(stage['peak_mb'], before.get('peak_mb')):>9}  {details}")
+
+    if previous:
+        print(f"\nCompared with the run of {previous['created']}; "
+              f"! marks a change of more than {REGRESSION_THRESHOLD:.0%}.")
+
+
+def main() -> None:
+    """Runs the selected stages and saves and reports their results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plants", type=int, default=50)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--mover-hours", type=float, default=1,
+                        help="hours of recordings the mover archives (24 in production)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    parameters = {"plants": args.plants, "days": args.days,
+                  "mover_hours": args.mover_hours}
+
+    with TemporaryDirectory() as workdir:
+        data = prepare_data(args.plants, args.days, args.mover_hours, workdir)
+        stages = {}
+        for name in args.stages:
+            print(f"Running {name}...")
+            stages[name] = measure(STAGES[name], data, args.repeat)
+
+    results = {"created": datetime.now().isoformat(timespec="seconds"),
+               "parameters": parameters, "stages": stages}
+
+    report(results, find_previous_results(parameters, args.results_dir))
+    print(f"\nSaved results to {save_results(results, args.results_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Compact binary archive format for recordings.
+
+An archive is a short file header followed by a sequence of blocks. Each block
+stores up to a chunk of recordings as typed columns (int16 plant_id, float32
+measurements, epoch second timestamps) with last_watered dictionary encoded,
+compressed with zstd where available and gzip otherwise. Every block header
+also records the time and plant_id range it covers, so readers can skip
+blocks that fall outside a query without decompressing them."""
+
+import gzip
+import io
+import struct
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RECORDING_COLUMNS = ['recording_id', 'plant_id', 'last_watered',
+                     'soil_moisture', 'temperature', 'recording_taken']
+
+ARCHIVE_MAGIC = b'PHRA'
+ARCHIVE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sBc')
+BLOCK_HEADER = struct.Struct('<IIqqhh')
+
+CHUNK_SIZE = 50000
+NAT_EPOCH = np.iinfo(np.int64).min
+
+
+def default_codec() -> bytes:
+    """Returns the codec used for new archives, zstd if installed."""
+    return b'z' if zstandard is not None else b'g'
+
+
+def compress(payload: bytes, codec: bytes) -> bytes:
+    """Compresses a block payload with the given codec."""
+    if codec == b'z':
+        return zstandard.ZstdCompressor(level=9).compress(payload)
+    return gzip.compress(payload, compresslevel=6)
+
+
+def decompress(payload: bytes, codec: bytes) -> bytes:
+    """Decompresses a block payload with the given codec."""
+    if codec == b'z':
+        if zstandard is None:
+            raise ValueError("Archive is zstd compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return gzip.decompress(payload)
+
+
+def to_epoch_seconds(timestamps: pd.Series) -> np.ndarray:
+    """Converts timestamps to int64 epoch seconds, NaT becoming NAT_EPOCH."""
+    timestamps = pd.to_datetime(timestamps)
+    epoch = timestamps.values.astype('datetime64[s]').astype(np.int64)
+
+    return np.where(timestamps.isna().values, NAT_EPOCH, epoch)
+
+
+def from_epoch_seconds(epoch: np.ndarray) -> pd.Series:
+    """Converts int64 epoch seconds back to datetime64[ns] timestamps."""
+    return pd.Series(epoch.astype('datetime64[s]').astype('datetime64[ns]'))
+
+
+def smallest_code_dtype(size: int) -> np.dtype:
+    """Returns the smallest unsigned dtype able to index size values."""
+    if size <= np.iinfo(np.uint8).max:
+        return np.uint8
+    if size <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+def encode_block(recordings_df: pd.DataFrame, codec: bytes) -> bytes:
+    """Encodes a chunk of recordings into one compressed block,
+    including its block header."""
+    recording_taken = to_epoch_seconds(recordings_df['recording_taken'])
+    watered_values, watered_codes = np.unique(
+        to_epoch_seconds(recordings_df['last_watered']), return_inverse=True)
+    plant_id = recordings_df['plant_id'].to_numpy().astype(np.int16)
+
+    columns = io.BytesIO()
+    np.savez(columns,
+             recording_id=recordings_df['recording_id'].to_numpy().astype(np.int32),
+             plant_id=plant_id,
+             soil_moisture=recordings_df['soil_moisture'].to_numpy().astype(np.float32),
+             temperature=recordings_df['temperature'].to_numpy().astype(np.float32),
+             recording_taken=recording_taken,
+             last_watered_values=watered_values,
+             last_watered_codes=watered_codes.astype(
+                 smallest_code_dtype(len(watered_values))))
+    payload = compress(columns.getvalue(), codec)
+
+    header = BLOCK_HEADER.pack(len(payload), len(recordings_df),
+                               recording_taken.min(), recording_taken.max(),
+                               plant_id.min(), plant_id.max())
+
+    return header + payload
+
+
+def decode_block(payload: bytes, codec: bytes) -> pd.DataFrame:
+    """Decodes a compressed block back into the archive's df columns."""
+    columns = np.load(io.BytesIO(decompress(payload, codec)))
+
+    watered_values = from_epoch_seconds(columns['last_watered_values'])
+    last_watered = watered_values.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+
+    return pd.DataFrame({
+        'recording_id': columns['recording_id'].astype(np.int64),
+        'plant_id': columns['plant_id'].astype(np.int64),
+        'last_watered': last_watered[columns['last_watered_codes']],
+        'soil_moisture': columns['soil_moisture'].astype(np.float64),
+        'temperature': columns['temperature'].astype(np.float64),
+        'recording_taken': from_epoch_seconds(columns['recording_taken'])
+    })
+
+
+def write_archive(chunks, archive_path: str, codec: bytes = None) -> int:
+    """Writes an iterable of recordings dfs to an archive file,
+    one block per non-empty df, returning the number of rows written."""
+    codec = codec or default_codec()
+    rows_written = 0
+
+    with open(archive_path, 'wb') as archive_file:
+        archive_file.write(FILE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, codec))
+
+        for chunk_df in chunks:
+            if chunk_df.empty:
+                continue
+            archive_file.write(encode_block(chunk_df, codec))
+            rows_written += len(chunk_df)
+
+    return rows_written
+
+
+def block_in_range(block_header: tuple, plant_id: int = None,
+                   start: pd.Timestamp = None, end: pd.Timestamp = None) -> bool:
+    """Returns whether a block could hold rows matching the filters,
+    using the time and plant_id range in its header."""
+    _, _, min_taken, max_taken, min_plant, max_plant = block_header
+
+    if plant_id is not None and not min_plant <= plant_id <= max_plant:
+        return False
+    if start is not None and max_taken < pd.Timestamp(start).timestamp():
+        return False
+    if end is not None and min_taken > pd.Timestamp(end).timestamp():
+        return False
+
+    return True
+
+
+def iter_archive(archive_path: str, plant_id: int = None,
+                 start: pd.Timestamp = None, end: pd.Timestamp = None):
+    """Yields the recordings in an archive file block by block, skipping
+    blocks outside the optional plant_id and recording_taken filters."""
+    with open(archive_path, 'rb') as archive_file:
+        magic, version, codec = FILE_HEADER.unpack(
+            archive_file.read(FILE_HEADER.size))
+
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{archive_path} is not a recordings archive.")
+
+        while header_bytes := archive_file.read(BLOCK_HEADER.size):
+            block_header = BLOCK_HEADER.unpack(header_bytes)
+
+            if not block_in_range(block_header, plant_id, start, end):
+                archive_file.seek(block_header[0], io.SEEK_CUR)
+                continue
+
+            block_df = decode_block(archive_file.read(block_header[0]), codec)
+
+            if plant_id is not None:
+                block_df = block_df[block_df['plant_id'] == plant_id]
+            if start is not None:
+                block_df = block_df[block_df['recording_taken'] >= start]
+            if end is not None:
+                block_df = block_df[block_df['recording_taken'] <= end]
+
+            yield block_df
+
+
+def read_archive(archive_path: str, plant_id: int = None,
+                 start: pd.Timestamp = None, end: pd.Timestamp = None) -> pd.DataFrame:
+    """Reads the recordings in an archive file into a single df, with the
+    same columns as the archive .csv file."""
+    blocks = list(iter_archive(archive_path, plant_id, start, end))
+
+    if not blocks:
+        return pd.DataFrame(columns=RECORDING_COLUMNS)
+
+    return pd.concat(blocks, ignore_index=True)
+
+
+def convert_csv_to_archive(csv_path: str, archive_path: str,
+                           chunksize: int = CHUNK_SIZE, codec: bytes = None) -> int:
+    """Converts an archive .csv file to the compact format in chunks,
+    returning the number of rows written."""
+    return write_archive(pd.read_csv(csv_path, chunksize=chunksize), archive_path, codec)
@@ -0,0 +1,395 @@
+# pylint: disable=no-member
+"""Backfills delta.Recordings from the recordings archive, for reloading
+history after reset_db or a schema change.
+
+The archive (the compact .rec file, or the .csv file) is read in batches.
+Worker processes turn each batch into rows, and the main process bulk copies
+them into a staging table and moves them into delta.Recordings in one
+statement, keeping each recording's recording_id. Recordings already in
+delta.Recordings, and those of plants not in delta.Plants, are skipped, so a
+batch can safely be loaded twice, and the number skipped is reported.
+
+Keeping the archived recording_ids is only safe while no new recording can
+take one of them. Before the first batch, the backfill refuses to run if
+delta.Recordings already holds a recording with an id up to the highest
+archived one, and otherwise reseeds its identity above that id, so the ETL
+carries on with ids the archive does not use.
+
+A checkpoint is written after every batch, so an interrupted backfill
+resumes from the first batch it had not loaded. Each batch takes the run
+lock shared with the ETL and the mover, and the backfill stops, to be
+resumed later, if it cannot take it in time.
+
+Run with: python backfill.py --file updated_recordings_data.rec"""
+
+from os import environ, cpu_count, path, remove
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import json
+import boto3
+import pymssql
+import pandas as pd
+from dotenv import load_dotenv
+from archive_format import iter_archive, RECORDING_COLUMNS
+from lambda_mover import download_file_from_s3
+from mover_run_lock import run_lock
+
+
+BATCH_SIZE = 50000
+CHECKPOINT_PATH = "backfill_checkpoint.json"
+STAGING_TABLE = "delta.Recordings_Backfill"
+LOCK_TIMEOUT_SECONDS = float(environ.get("BACKFILL_LOCK_TIMEOUT_SECONDS", "300"))
+
+
+def get_connection() -> pymssql.Connection:
+    """Returns a connection to the RDS."""
+    return pymssql.connect(
+        server=environ["DB_HOST"],
+        port=environ["DB_PORT"],
+        user=environ["DB_USER"],
+        password=environ["DB_PASSWORD"],
+        database=environ["DB_NAME"],
+        as_dict=True
+    )
+
+
+def download_archive(s3: boto3.client) -> str:
+    """Downloads the archive from the S3 bucket, the .rec file if there is
+    one and the .csv file otherwise, returning its local path."""
+    for filename in ('updated_recordings_data.rec', 'updated_recordings_data.csv'):
+        if download_file_from_s3(s3, filename, f'backfill_{filename}'):
+            return f'backfill_{filename}'
+
+    raise FileNotFoundError("No recordings archive found on the S3 bucket.")
+
+
+def iter_batches(source_path: str, batch_size: int = BATCH_SIZE,
+                 start: pd.Timestamp = None, end: pd.Timestamp = None):
+    """Yields the recordings in a .rec or .csv archive as dfs of up to
+    batch_size rows, in archive order, keeping only those taken between
+    the optional start and end."""
+    if str(source_path).endswith('.rec'):
+        chunks = iter_archive(source_path, start=start, end=end)
+    else:
+        chunks = pd.read_csv(source_path, chunksize=batch_size)
+
+    pending = []
+    pending_rows = 0
+
+    for chunk_df in chunks:
+        taken = pd.to_datetime(chunk_df['recording_taken'])
+        in_range = pd.Series(True, index=chunk_df.index)
+        if start is not None:
+            in_range &= taken >= start
+        if end is not None:
+            in_range &= taken <= end
+        chunk_df = chunk_df.loc[in_range, RECORDING_COLUMNS]
+
+        pending.append(chunk_df)
+        pending_rows += len(chunk_df)
+
+        while pending_rows >= batch_size:
+            batch_df = pd.concat(pending, ignore_index=True)
+            yield batch_df.iloc[:batch_size]
+            pending = [batch_df.iloc[batch_size:]]
+            pending_rows = len(pending[0])
+
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def transform_batch(batch_df: pd.DataFrame) -> list[tuple]:
+    """Turns a batch of archived recordings into rows of the staging table,
+    dropping incomplete and repeated recordings. Runs in a worker process."""
+    batch_df = batch_df.dropna(subset=['recording_id', 'plant_id', 'soil_moisture',
+                                       'temperature', 'recording_taken'])
+    batch_df = batch_df.drop_duplicates(subset='recording_id')
+
+    last_watered = pd.to_datetime(batch_df['last_watered'], errors='coerce')
+    recording_taken = pd.to_datetime(batch_df['recording_taken'])
+
+    return list(zip(
+        batch_df['recording_id'].astype(int).tolist(),
+        batch_df['plant_id'].astype(int).tolist(),
+        [None if pd.isna(watered) else watered.to_pydatetime()
+         for watered in last_watered],
+        batch_df['soil_moisture'].astype(float).tolist(),
+        batch_df['temperature'].astype(float).tolist(),
+        [taken.to_pydatetime() for taken in recording_taken]))
+
+
+def create_staging_table(conn: pymssql.Connection) -> None:
+    """Creates the empty staging table the batches are bulk copied into."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{STAGING_TABLE}', 'U') IS NULL
+                CREATE TABLE {STAGING_TABLE} (
+                    recording_id INT NOT NULL,
+                    plant_id INT NOT NULL,
+                    last_watered datetime2,
+                    soil_moisture FLOAT NOT NULL,
+                    temperature FLOAT NOT NULL,
+                    reading_taken datetime2 NOT NULL
+                );
+            TRUNCATE TABLE {STAGING_TABLE};""")
+
+    conn.commit()
+
+
+def drop_staging_table(conn: pymssql.Connection) -> None:
+    """Drops the staging table once the backfill has finished."""
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE};")
+
+    conn.commit()
+
+
+def max_recording_id(source_path: str, start: pd.Timestamp = None,
+                     end: pd.Timestamp = None) -> int:
+    """Returns the highest recording_id to be backfilled, or 0 if there is none."""
+    return max((int(batch_df['recording_id'].max())
+                for batch_df in iter_batches(source_path, BATCH_SIZE, start, end)
+                if not batch_df.empty), default=0)
+
+
+def reserve_archived_ids(conn: pymssql.Connection, max_id: int, check_taken: bool) -> bool:
+    """Makes sure no new recording can take an archived recording_id, by
+    reseeding the delta.Recordings identity above max_id. If check_taken,
+    raises a RuntimeError if delta.Recordings already holds a recording with
+    an id up to max_id, as the archived recording with that id would be
+    skipped. Returns False if the run lock could not be taken."""
+    with run_lock(conn, "backfill", LOCK_TIMEOUT_SECONDS) as acquired:
+        if not acquired:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT ISNULL(IDENT_CURRENT('delta.Recordings'), 0) AS current_id,
+                    (SELECT COUNT(*) FROM delta.Recordings
+                     WHERE recording_id <= %s) AS ids_taken;""", (max_id,))
+            row = cur.fetchone()
+            current_id, ids_taken = (row['current_id'], row['ids_taken']) \
+                if isinstance(row, dict) else row
+
+            if check_taken and ids_taken:
+                raise RuntimeError(
+                    f"delta.Recordings already holds {ids_taken} recordings with ids up to "
+                    f"{max_id}, the highest archived recording_id, so those archived "
+                    "recordings would be skipped. Empty delta.Recordings, or reseed its "
+                    f"identity above {max_id} before new recordings are loaded.")
+
+            if current_id <= max_id:
+                # The next id after a reseed is the new seed, or the one after
+                # it if the table has held rows, so both stay above max_id.
+                cur.execute("DBCC CHECKIDENT ('delta.Recordings', RESEED, %s);",
+                            (max_id + 1,))
+                print(f"Reseeded delta.Recordings to give new recordings ids above {max_id}.")
+
+        conn.commit()
+
+    return True
+
+
+def load_batch(conn: pymssql.Connection, rows: list[tuple]) -> int:
+    """Bulk copies a batch into the staging table and moves it into
+    delta.Recordings, adding the watering events it references, returning
+    the number of recordings inserted."""
+    conn.bulk_copy(STAGING_TABLE, rows, batch_size=len(rows) or 1, tablock=True)
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            DECLARE @inserted INT;
+            INSERT INTO delta.Watering_Events (plant_id, watered_at)
+            SELECT DISTINCT backfill.plant_id, backfill.last_watered
+            FROM {STAGING_TABLE} AS backfill
+            JOIN delta.Plants AS plants
+            ON backfill.plant_id = plants.plant_id
+            WHERE backfill.last_watered IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM delta.Watering_Events AS events
+                            WHERE events.plant_id = backfill.plant_id
+                            AND events.watered_at = backfill.last_watered);
+            SET IDENTITY_INSERT delta.Recordings ON;
+            INSERT INTO delta.Recordings (recording_id, plant_id, watering_event_id,
+                soil_moisture, temperature, reading_taken)
+            SELECT backfill.recording_id, backfill.plant_id, events.watering_event_id,
+                backfill.soil_moisture, backfill.temperature, backfill.reading_taken
+            FROM {STAGING_TABLE} AS backfill
+            JOIN delta.Plants AS plants
+            ON backfill.plant_id = plants.plant_id
+            LEFT JOIN delta.Watering_Events AS events
+            ON events.plant_id = backfill.plant_id AND events.watered_at = backfill.last_watered
+            WHERE NOT EXISTS (SELECT 1 FROM delta.Recordings AS rec
+                              WHERE rec.recording_id = backfill.recording_id);
+            SET @inserted = @@ROWCOUNT;
+            SET IDENTITY_INSERT delta.Recordings OFF;
+            TRUNCATE TABLE {STAGING_TABLE};
+            SELECT @inserted AS rows_inserted;""")
+        row = cur.fetchone()
+
+    conn.commit()
+
+    return row['rows_inserted'] if isinstance(row, dict) else row[0]
+
+
+def load_checkpoint(checkpoint_path: str, source_path: str, batch_size: int,
+                    start: pd.Timestamp = None, end: pd.Timestamp = None) -> dict:
+    """Returns the progress saved by an earlier backfill of the same source,
+    batch size and time window, or a fresh checkpoint if there is none."""
+    checkpoint = {"source": str(source_path), "batch_size": batch_size,
+                  "start": None if start is None else str(start),
+                  "end": None if end is None else str(end),
+                  "batches_done": 0, "rows_read": 0, "rows_inserted": 0,
+                  "rows_skipped": 0, "ids_reserved": False}
+
+    try:
+        with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+            saved = json.load(checkpoint_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return checkpoint
+
+    if any(saved.get(key) != checkpoint[key] for key in ("source", "batch_size", "start", "end")):
+        print(f"Checkpoint {checkpoint_path} is for another backfill, starting over.")
+        return checkpoint
+
+    return {**checkpoint, **saved}
+
+
+def save_checkpoint(checkpoint: dict, checkpoint_path: str) -> None:
+    """Saves the backfill's progress."""
+    with open(checkpoint_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+
+
+def print_progress(checkpoint: dict, rows_read: int, seconds: float) -> None:
+    """Prints the progress of the backfill and its rate in rows per second."""
+    rate = rows_read / seconds if seconds > 0 else 0
+    print(f"Batch {checkpoint['batches_done']}: {checkpoint['rows_read']} rows read, "
+          f"{checkpoint['rows_inserted']} inserted, {checkpoint['rows_skipped']} skipped, "
+          f"{rate:,.0f} rows/s.")
+
+
+def iter_transformed(executor: ProcessPoolExecutor, batches, skip: int, ahead: int):
+    """Yields the rows of each batch after the first skip, transformed by the
+    worker processes, which keep up to ahead batches in progress."""
+    pending = deque()
+
+    for batch_number, batch_df in enumerate(batches):
+        if batch_number < skip:
+            continue
+        pending.append(executor.submit(transform_batch, batch_df))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def load_next(conn: pymssql.Connection, rows: list[tuple], checkpoint: dict,
+              checkpoint_path: str) -> bool:
+    """Loads one transformed batch under the run lock and saves the
+    checkpoint, returning False if the run lock could not be taken."""
+    with run_lock(conn, "backfill", LOCK_TIMEOUT_SECONDS) as acquired:
+        if not acquired:
+            return False
+        inserted = load_batch(conn, rows) if rows else 0
+
+    if inserted < len(rows):
+        print(f"Skipped {len(rows) - inserted} recordings already loaded "
+              "or of plants not in delta.Plants.")
+
+    checkpoint["batches_done"] += 1
+    checkpoint["rows_read"] += len(rows)
+    checkpoint["rows_inserted"] += inserted
+    checkpoint["rows_skipped"] += len(rows) - inserted
+    save_checkpoint(checkpoint, checkpoint_path)
+
+    return True
+
+
+def run_backfill(conn: pymssql.Connection, source_path: str,
+                 checkpoint_path: str = CHECKPOINT_PATH, batch_size: int = BATCH_SIZE,
+                 workers: int = None, start: pd.Timestamp = None,
+                 end: pd.Timestamp = None) -> dict:
+    """Backfills delta.Recordings from the archive at source_path, resuming
+    from the checkpoint, and returns the checkpoint. Batches are transformed
+    by a pool of worker processes, a few batches ahead of the one loading.
+    Raises a RuntimeError if delta.Recordings already uses archived ids."""
+    checkpoint = load_checkpoint(checkpoint_path, source_path, batch_size, start, end)
+    if checkpoint["batches_done"]:
+        print(f"Resuming after {checkpoint['batches_done']} batches.")
+
+    if not reserve_archived_ids(conn, max_recording_id(source_path, start, end),
+                                check_taken=not checkpoint["ids_reserved"]):
+        print("Backfill stopped: the run lock is held by another job.")
+        return checkpoint
+    checkpoint["ids_reserved"] = True
+    save_checkpoint(checkpoint, checkpoint_path)
+
+    create_staging_table(conn)
+    workers = workers or cpu_count() or 1
+    started = perf_counter()
+    rows_read = 0
+    finished = True
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in iter_transformed(executor, iter_batches(source_path, batch_size, start, end),
+                                     checkpoint["batches_done"], workers * 2):
+            if not load_next(conn, rows, checkpoint, checkpoint_path):
+                finished = False
+                executor.shutdown(cancel_futures=True)
+                break
+
+            rows_read += len(rows)
+            print_progress(checkpoint, rows_read, perf_counter() - started)
+
+    seconds = perf_counter() - started
+    print(f"Backfill {'finished' if finished else 'stopped'}: {rows_read} rows in "
+          f"{seconds:.1f}s ({rows_read / seconds if seconds > 0 else 0:,.0f} rows/s), "
+          f"{checkpoint['rows_inserted']} recordings inserted and "
+          f"{checkpoint['rows_skipped']} skipped in total.")
+
+    if finished:
+        drop_staging_table(conn)
+        if path.exists(checkpoint_path):
+            remove(checkpoint_path)
+
+    return checkpoint
+
+
+def parse_args():
+    """Reads the backfill's command line arguments."""
+    parser = ArgumentParser(description="Backfill delta.Recordings from the archive.")
+    parser.add_argument("--file", help="A local .rec or .csv archive. "
+                        "Without it, the archive is downloaded from the S3 bucket.")
+    parser.add_argument("--start", type=pd.Timestamp,
+                        help="Only backfill recordings taken from this time.")
+    parser.add_argument("--end", type=pd.Timestamp,
+                        help="Only backfill recordings taken up to this time.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes transforming batches (default: all CPUs).")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any saved checkpoint and start from the first batch.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    args = parse_args()
+
+    if args.restart and path.exists(args.checkpoint):
+        remove(args.checkpoint)
+
+    source = args.file or download_archive(boto3.client(
+        's3', aws_access_key_id=environ.get("aws_access_key_id"),
+        aws_secret_access_key=environ.get("aws_secret_access_key")))
+
+    connection = get_connection()
+    try:
+        run_backfill(connection, source, args.checkpoint, args.batch_size,
+                     args.workers, args.start, args.end)
+    finally:
+        connection.close()
@@ -0,0 +1,86 @@
+"""Benchmarks the size and decode speed of the compact archive format
+against the archive .csv file, using synthetic recordings.
+
+Run with: python benchmark_archive_format.py [days]"""
+
+import sys
+import tempfile
+from os import path
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from archive_format import write_archive, read_archive, zstandard
+
+
+PLANT_COUNT = 50
+
+
+def make_synthetic_archive(days: int) -> pd.DataFrame:
+    """Makes one reading per plant per minute for the given number of days,
+    newest to oldest, with each plant watered roughly twice a day."""
+    minutes = pd.date_range(end="2024-12-01", periods=days * 24 * 60, freq='min')[::-1]
+    rng = np.random.default_rng(0)
+    row_count = len(minutes) * PLANT_COUNT
+
+    recording_taken = np.repeat(minutes.values, PLANT_COUNT)
+    plant_id = np.tile(np.arange(1, PLANT_COUNT + 1), len(minutes))
+    last_watered = pd.Series(recording_taken).dt.floor('12h')
+
+    return pd.DataFrame({
+        'recording_id': np.arange(row_count, 0, -1),
+        'plant_id': plant_id,
+        'last_watered': last_watered.dt.strftime("%Y-%m-%d %H:%M:%S"),
+        'soil_moisture': rng.uniform(10, 100, row_count),
+        'temperature': rng.uniform(5, 30, row_count),
+        'recording_taken': pd.Series(recording_taken).dt.strftime("%Y-%m-%d %H:%M:%S")
+    })
+
+
+def time_call(function, *args) -> float:
+    """Returns the best of three wall times of a call, in seconds."""
+    timings = []
+    for _ in range(3):
+        start = perf_counter()
+        function(*args)
+        timings.append(perf_counter() - start)
+
+    return min(timings)
+
+
+def read_csv_archive(csv_path: str) -> pd.DataFrame:
+    """Reads the .csv archive the way the mover and dashboard do."""
+    recordings_df = pd.read_csv(csv_path)
+    recordings_df['recording_taken'] = pd.to_datetime(
+        recordings_df['recording_taken'])
+
+    return recordings_df
+
+
+def run_benchmark(days: int) -> None:
+    """Prints size and decode time of each format for days of recordings."""
+    recordings_df = make_synthetic_archive(days)
+    chunks = [recordings_df.iloc[i:i + 50000]
+              for i in range(0, len(recordings_df), 50000)]
+    codecs = {'gzip': b'g', 'zstd': b'z'} if zstandard is not None else {'gzip': b'g'}
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = path.join(directory, 'recordings.csv')
+        recordings_df.to_csv(csv_path, index=False)
+        csv_size = path.getsize(csv_path)
+
+        print(f"{len(recordings_df)} recordings ({days} days, {PLANT_COUNT} plants)")
+        print(f"{'format':<10}{'size (MB)':>12}{'ratio':>8}{'decode (s)':>12}")
+        print(f"{'csv':<10}{csv_size / 1e6:>12.2f}{1:>8.1f}"
+              f"{time_call(read_csv_archive, csv_path):>12.3f}")
+
+        for name, codec in codecs.items():
+            archive_path = path.join(directory, f'recordings_{name}.rec')
+            write_archive(chunks, archive_path, codec)
+            archive_size = path.getsize(archive_path)
+
+            print(f"{name:<10}{archive_size / 1e6:>12.2f}{csv_size / archive_size:>8.1f}"
+                  f"{time_call(read_archive, archive_path):>12.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
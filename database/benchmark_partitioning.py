@@ -0,0 +1,205 @@
+# pylint: disable=no-member
+"""Benchmarks the rowstore and the day-partitioned layouts of delta.Recordings
+on a live SQL Server, comparing the time and logical page reads of the
+dashboard's time-range scans and of the mover's 24 hour cut-off.
+
+Two benchmark tables with the same synthetic recordings, one per layout, are
+created next to delta.Recordings and dropped afterwards. Readings are made
+for the plants already in delta.Plants. Logical reads come from
+sys.dm_exec_sessions and need VIEW SERVER STATE, without which only the
+times are shown.
+
+Run with: python benchmark_partitioning.py [days] [--columnstore]"""
+
+import sys
+from os import environ
+from datetime import datetime, timedelta
+from time import perf_counter
+import numpy as np
+import pymssql
+from dotenv import load_dotenv
+from reset_db import ROWSTORE_RECORDINGS_DDL
+from partitions import (partitioned_recordings_ddl, drop_partitioning_ddl,
+                        add_boundaries, remove_recordings_before)
+
+
+ROWSTORE_TABLE = "Bench_Rowstore"
+PARTITIONED_TABLE = "Bench_Partitioned"
+READINGS_PER_HOUR = 60
+
+
+def drop_bench_tables(conn: pymssql.Connection) -> None:
+    """Drops the benchmark tables and the partitioning of the partitioned one."""
+    with conn.cursor() as cur:
+        for table in (ROWSTORE_TABLE, PARTITIONED_TABLE):
+            cur.execute(f"DROP TABLE IF EXISTS delta.{table};")
+        cur.execute(drop_partitioning_ddl(PARTITIONED_TABLE))
+
+    conn.commit()
+
+
+def create_bench_tables(conn: pymssql.Connection, days: int, columnstore: bool) -> None:
+    """Creates an empty table in each layout, with day boundaries
+    covering the benchmark's days of readings."""
+    with conn.cursor() as cur:
+        cur.execute(ROWSTORE_RECORDINGS_DDL.replace(
+            "delta.Recordings", f"delta.{ROWSTORE_TABLE}"))
+        cur.execute(partitioned_recordings_ddl(PARTITIONED_TABLE, columnstore))
+
+    conn.commit()
+    add_boundaries(conn, datetime.now().date() - timedelta(days=days),
+                   days_ahead=days + 1, table=PARTITIONED_TABLE)
+
+
+def make_readings(plant_ids: list[int], days: int) -> list[tuple]:
+    """Makes a reading a minute for every plant, for the given number of days
+    up to now, as rows without their recording_id or watering event."""
+    now = datetime.now().replace(second=0, microsecond=0)
+    rng = np.random.default_rng(0)
+    readings = []
+
+    for offset in range(days * 24 * READINGS_PER_HOUR):
+        minute = now - timedelta(minutes=offset)
+        moisture = rng.uniform(10, 100, len(plant_ids)).tolist()
+        temperature = rng.uniform(5, 30, len(plant_ids)).tolist()
+        readings.extend(zip(plant_ids, [None] * len(plant_ids),
+                            moisture, temperature, [minute] * len(plant_ids)))
+
+    return readings
+
+
+def fill_bench_tables(conn: pymssql.Connection, readings: list[tuple]) -> None:
+    """Bulk copies the same readings into both tables."""
+    for table in (ROWSTORE_TABLE, PARTITIONED_TABLE):
+        conn.bulk_copy(f"delta.{table}", readings, column_ids=[2, 3, 4, 5, 6],
+                       batch_size=50000, tablock=True)
+
+
+def session_logical_reads(conn: pymssql.Connection) -> int:
+    """Returns the logical reads of this session so far, or None without
+    VIEW SERVER STATE."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""SELECT logical_reads FROM sys.dm_exec_sessions
+                           WHERE session_id = @@SPID;""")
+            return cur.fetchone()['logical_reads']
+    except pymssql.Error:
+        return None
+
+
+def measure(conn: pymssql.Connection, function, *args) -> tuple[float, int]:
+    """Returns the wall time and logical reads of a call."""
+    reads_before = session_logical_reads(conn)
+    start = perf_counter()
+    function(*args)
+    seconds = perf_counter() - start
+    reads_after = session_logical_reads(conn)
+
+    if reads_before is None or reads_after is None:
+        return seconds, None
+    return seconds, reads_after - reads_before
+
+
+def run_query(conn: pymssql.Connection, query: str, params: tuple) -> None:
+    """Runs a query and reads all of its rows."""
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        cur.fetchall()
+
+
+def plant_scan(table: str, plant_id: int, start: datetime):
+    """Returns the dashboard's read of one plant's recent readings."""
+    return (f"""SELECT reading_taken, soil_moisture, temperature FROM delta.{table}
+                WHERE plant_id = %s AND reading_taken >= %s;""", (plant_id, start))
+
+
+def time_range_scan(table: str, start: datetime):
+    """Returns the dashboard's hourly average over every plant since start."""
+    return (f"""SELECT plant_id, DATEADD(HOUR, DATEDIFF(HOUR, 0, reading_taken), 0) AS hour,
+                AVG(soil_moisture) AS soil_moisture, AVG(temperature) AS temperature
+                FROM delta.{table} WHERE reading_taken >= %s
+                GROUP BY plant_id, DATEADD(HOUR, DATEDIFF(HOUR, 0, reading_taken), 0);""",
+            (start,))
+
+
+def cutoff_select(table: str, cutoff: datetime):
+    """Returns the mover's select of the recordings past the cut-off."""
+    return (f"""SELECT recording_id, plant_id, watering_event_id, soil_moisture,
+                temperature, reading_taken FROM delta.{table}
+                WHERE reading_taken < %s;""", (cutoff,))
+
+
+def delete_before(conn: pymssql.Connection, cutoff: datetime) -> None:
+    """Deletes the rowstore table's recordings past the cut-off row by row."""
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM delta.{ROWSTORE_TABLE} WHERE reading_taken < %s;",
+                    (cutoff,))
+    conn.commit()
+
+
+def print_result(name: str, rowstore: tuple, partitioned: tuple) -> None:
+    """Prints the time and logical reads of one operation in both layouts."""
+    def reads(result):
+        return "n/a" if result[1] is None else f"{result[1]:,}"
+
+    print(f"{name:<20}{rowstore[0]:>12.3f}{reads(rowstore):>14}"
+          f"{partitioned[0]:>12.3f}{reads(partitioned):>14}")
+
+
+def run_benchmark(conn: pymssql.Connection, days: int, columnstore: bool) -> None:
+    """Fills both layouts with days of readings and prints the cost of each
+    read and of the cut-off in both."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT plant_id FROM delta.Plants;")
+        plant_ids = [row['plant_id'] for row in cur.fetchall()]
+
+    if not plant_ids:
+        print("delta.Plants is empty, run the ETL once before benchmarking.")
+        return
+
+    drop_bench_tables(conn)
+    create_bench_tables(conn, days, columnstore)
+
+    try:
+        readings = make_readings(plant_ids, days)
+        fill_bench_tables(conn, readings)
+        now = datetime.now()
+        cutoff = now - timedelta(hours=24)
+
+        print(f"{len(readings)} readings ({days} days, {len(plant_ids)} plants), "
+              f"columnstore {'on' if columnstore else 'off'}")
+        print(f"{'operation':<20}{'rowstore (s)':>12}{'reads':>14}"
+              f"{'partitioned':>12}{'reads':>14}")
+
+        for name, make_query, args in (
+                ("plant, last 6h", plant_scan, (plant_ids[0], now - timedelta(hours=6))),
+                ("all, last 24h", time_range_scan, (now - timedelta(hours=24),)),
+                ("cut-off select", cutoff_select, (cutoff,))):
+            print_result(name,
+                         measure(conn, run_query, conn, *make_query(ROWSTORE_TABLE, *args)),
+                         measure(conn, run_query, conn,
+                                 *make_query(PARTITIONED_TABLE, *args)))
+
+        print_result("cut-off delete", measure(conn, delete_before, conn, cutoff),
+                     measure(conn, remove_recordings_before, conn, cutoff,
+                             PARTITIONED_TABLE))
+    finally:
+        drop_bench_tables(conn)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    connection = pymssql.connect(
+        server=environ["DB_HOST"],
+        port=environ["DB_PORT"],
+        user=environ["DB_USER"],
+        password=environ["DB_PASSWORD"],
+        database=environ["DB_NAME"],
+        as_dict=True
+    )
+
+    arguments = [argument for argument in sys.argv[1:] if argument != "--columnstore"]
+    run_benchmark(connection, int(arguments[0]) if arguments else 7,
+                  "--columnstore" in sys.argv)
+    connection.close()
@@ -0,0 +1,123 @@
+"""Bounded-memory merge of newly archived recordings into the existing
+archive .csv file. Both inputs are already sorted newest to oldest, so the
+archive can be streamed through in chunks rather than loaded whole, and
+reading can stop at the first chunk past the warm tier's retention."""
+
+import pandas as pd
+
+
+RECORDING_COLUMNS = ['recording_id', 'plant_id', 'last_watered',
+                     'soil_moisture', 'temperature', 'recording_taken']
+
+CHUNK_SIZE = 50000
+
+
+def sort_recordings(recordings_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns recordings sorted newest to oldest recording_taken."""
+    recordings_df = recordings_df[RECORDING_COLUMNS].copy()
+    recordings_df['recording_taken'] = pd.to_datetime(
+        recordings_df['recording_taken'])
+
+    return recordings_df.sort_values(by='recording_taken', ascending=False, kind='stable')
+
+
+def archived_recording_ids(existing_csv_path: str, recordings_df: pd.DataFrame,
+                           chunksize: int = CHUNK_SIZE) -> set[int]:
+    """Returns the recording_ids of recordings_df that are already in the
+    archive, such as recordings backfilled into the RDS and moved again. An
+    archived copy has the same recording_taken, so only the recording_id and
+    recording_taken columns are read, stopping after the first chunk reaching
+    back past the oldest of the recordings."""
+    if existing_csv_path is None or recordings_df.empty:
+        return set()
+
+    recording_ids = recordings_df['recording_id'].astype(int)
+    oldest = pd.to_datetime(recordings_df['recording_taken']).min()
+    archived_ids = set()
+
+    for chunk_df in pd.read_csv(existing_csv_path, chunksize=chunksize,
+                                usecols=['recording_id', 'recording_taken']):
+        archived = chunk_df['recording_id'].isin(recording_ids)
+        archived_ids.update(chunk_df.loc[archived, 'recording_id'].astype(int).tolist())
+
+        if pd.to_datetime(chunk_df['recording_taken']).min() < oldest:
+            break
+
+    return archived_ids
+
+
+def read_recordings_since(csv_path: str, start, chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Returns the recordings of an archive .csv taken from start onwards,
+    stopping after the first chunk reaching back past start."""
+    recent = []
+
+    for chunk_df in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk_df['recording_taken'] = pd.to_datetime(chunk_df['recording_taken'])
+        recent.append(chunk_df[chunk_df['recording_taken'] >= start])
+
+        if chunk_df['recording_taken'].min() < start:
+            break
+
+    if not recent:
+        return pd.DataFrame(columns=RECORDING_COLUMNS)
+    return pd.concat(recent, ignore_index=True)
+
+
+def iter_merged_chunks(recordings_df: pd.DataFrame, existing_csv_path: str,
+                       chunksize: int = CHUNK_SIZE, expire_before=None):
+    """Yields the merge of recordings_df and the archive at existing_csv_path
+    as sorted chunks. Each archive chunk is only combined with the new
+    recordings that fall inside or before its time range, so memory is bound
+    by chunksize plus the size of the new batch. Recordings taken before
+    expire_before, if given, are left out."""
+    pending_df = sort_recordings(recordings_df)
+
+    if expire_before is not None:
+        pending_df = pending_df[pending_df['recording_taken'] >= expire_before]
+
+    if existing_csv_path is not None:
+        for chunk_df in pd.read_csv(existing_csv_path, chunksize=chunksize):
+            chunk_df = chunk_df[RECORDING_COLUMNS].copy()
+            chunk_df['recording_taken'] = pd.to_datetime(
+                chunk_df['recording_taken'])
+
+            if expire_before is not None:
+                chunk_df = chunk_df[chunk_df['recording_taken'] >= expire_before]
+                if chunk_df.empty:
+                    # Every later chunk is older still.
+                    break
+
+            due = pending_df['recording_taken'] >= chunk_df['recording_taken'].min()
+
+            if due.any():
+                # A recording archived again after a backfill keeps its
+                # recording_id and time, so it meets its archived copy here.
+                chunk_df = pd.concat([pending_df[due], chunk_df], ignore_index=True)
+                chunk_df = chunk_df.drop_duplicates(subset='recording_id', keep='last')
+                chunk_df = chunk_df.sort_values(by='recording_taken', ascending=False,
+                                                kind='stable')
+                pending_df = pending_df[~due]
+
+            yield chunk_df
+
+    yield pending_df
+
+
+def merge_recordings_csv(recordings_df: pd.DataFrame, existing_csv_path: str,
+                         output_path: str, chunksize: int = CHUNK_SIZE,
+                         expire_before=None) -> int:
+    """Writes the merge of recordings_df and the existing archive .csv file to
+    output_path, newest to oldest, returning the number of rows written.
+    existing_csv_path may be None if there is no archive yet. Recordings
+    taken before expire_before, if given, are dropped from the archive."""
+    rows_written = 0
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as output_file:
+        output_file.write(','.join(RECORDING_COLUMNS) + '\n')
+
+        for chunk_df in iter_merged_chunks(recordings_df, existing_csv_path,
+                                           chunksize, expire_before):
+            chunk_df.to_csv(output_file, header=False, index=False)
+            rows_written += len(chunk_df)
+
+    return rows_written
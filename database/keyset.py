@@ -0,0 +1,64 @@
+"""Keyset pagination of delta.Recordings reads into columnar lists.
+
+Reads page through the recordings newest first on (reading_taken,
+recording_id). Each page starts after the last key of the page before, so
+every page is a seek on the reading_taken index or the partitioned clustered
+key, rather than an OFFSET that rescans the rows already read. Rows are
+fetched as tuples and appended to one list per column, so no dict is built
+per row, and only the columns asked for are selected."""
+
+from os import environ
+import pymssql
+
+
+PAGE_SIZE = int(environ.get("RECORDINGS_PAGE_SIZE", "10000"))
+KEY_EXPRESSIONS = ("rec.reading_taken", "rec.recording_id")
+
+
+def select_expressions(columns: dict[str, str]) -> list[str]:
+    """Returns the expressions to select: the columns asked for, followed by
+    whichever key columns are not among them."""
+    expressions = list(columns.values())
+    return expressions + [key for key in KEY_EXPRESSIONS if key not in expressions]
+
+
+def keyset_query(columns: dict[str, str], source: str, where: str, after_key: bool) -> str:
+    """Returns the query for one page of the columns from source, a FROM
+    clause aliasing the recordings table as rec."""
+    keyset = (" AND (rec.reading_taken < %s OR (rec.reading_taken = %s"
+              " AND rec.recording_id < %s))") if after_key else ""
+
+    return f"""SELECT TOP (%s) {", ".join(select_expressions(columns))}
+            FROM {source}
+            WHERE ({where}){keyset}
+            ORDER BY rec.reading_taken DESC, rec.recording_id DESC;"""
+
+
+def fetch_columns(conn: pymssql.Connection, columns: dict[str, str], source: str,
+                  where: str = "1 = 1", params: tuple = (),
+                  page_size: int = PAGE_SIZE) -> dict[str, list]:
+    """Returns the recordings matching where, newest first, as a list of values
+    per column name. columns maps each name to its SQL expression."""
+    values = {name: [] for name in columns}
+    key_positions = [select_expressions(columns).index(key) for key in KEY_EXPRESSIONS]
+    first_query = keyset_query(columns, source, where, False)
+    next_query = keyset_query(columns, source, where, True)
+    last_key = None
+
+    with conn.cursor(as_dict=False) as cur:
+        while True:
+            if last_key is None:
+                cur.execute(first_query, (page_size, *params))
+            else:
+                cur.execute(next_query, (page_size, *params, last_key[0],
+                                         last_key[0], last_key[1]))
+            rows = cur.fetchall()
+
+            # zip stops at the shorter, leaving out any trailing key columns.
+            for column, page_values in zip(values.values(), zip(*rows)):
+                column.extend(page_values)
+
+            if len(rows) < page_size:
+                return values
+
+            last_key = [rows[-1][position] for position in key_positions]
@@ -1,44 +1,59 @@
 # pylint: disable=no-member
-"""Lambda script for moving data rows older than 24 hours from
-short-term RDS storage to long-term S3 bucket storage."""
+"""Lambda script for moving data rows past the hot tier (24 hours by
+default) from short-term RDS storage to long-term S3 bucket storage,
+expiring archived data past the warm and cold tiers of tiering.py."""
 
 from os import environ
-from datetime import datetime
+from datetime import datetime, timedelta
 import boto3
 import pymssql
 from dotenv import load_dotenv
 import pandas as pd
-
-
-def convert_data_to_df(recording_data: list[dict]) -> pd.DataFrame:
-    """Converts data queried from RDS into a pandas df."""
-    recordings_df = pd.DataFrame(columns=['recording_id', 'plant_id', 'last_watered',
-                                          'soil_moisture', 'temperature', 'recording_taken'])
-    rows_added = 0
-
-    for row in recording_data:
-        last_watered = row['last_watered'].strftime("%Y-%m-%d %H:%M:%S")
-        reading_taken = row['reading_taken'].strftime("%Y-%m-%d %H:%M:%S")
-
-        recordings_df.loc[rows_added] = [row['recording_id'], row['plant_id'], last_watered,
-                                         row['soil_moisture'], row['temperature'], reading_taken]
-
-        rows_added += 1
+from rollups import make_all_rollups, replace_rollup_days, rollup_group_column
+from external_merge import merge_recordings_csv, archived_recording_ids, read_recordings_since
+from archive_format import convert_csv_to_archive
+from mover_instrumentation import (reset, stage, count, report, profile_invocation,
+                                   CallCounter, CountingConnection)
+from mover_run_lock import run_lock
+from partitions import is_partitioned, remove_recordings_before, add_boundaries
+from keyset import fetch_columns
+from tiering import HOT_TIER_HOURS, warm_cutoff, expire_rollup
+
+
+LOCK_TIMEOUT_SECONDS = float(environ.get("MOVER_LOCK_TIMEOUT_SECONDS", "120"))
+
+# The archive's columns and the RDS expression each is read from. Recordings
+# reference their watering event, whose time is joined back in.
+RECORDING_COLUMNS = {
+    'recording_id': 'rec.recording_id',
+    'plant_id': 'rec.plant_id',
+    'last_watered': 'events.watered_at',
+    'soil_moisture': 'rec.soil_moisture',
+    'temperature': 'rec.temperature',
+    'recording_taken': 'rec.reading_taken'
+}
+
+
+def convert_data_to_df(recording_data: dict[str, list]) -> pd.DataFrame:
+    """Converts the columns queried from RDS into a pandas df, formatting
+    the timestamps as the archive .csv stores them."""
+    recordings_df = pd.DataFrame(recording_data, columns=list(RECORDING_COLUMNS))
+
+    for column in ('last_watered', 'recording_taken'):
+        recordings_df[column] = pd.to_datetime(
+            recordings_df[column]).dt.strftime("%Y-%m-%d %H:%M:%S")
 
     return recordings_df
 
 
-def download_csv_from_s3(s3: boto3.client) -> bool:
-    """Attempts to download .csv file from S3 bucket."""
-    filename = 'updated_recordings_data.csv'
-
+def download_file_from_s3(s3: boto3.client, filename: str, local_path: str) -> bool:
+    """Attempts to download the named file from the S3 bucket."""
     try:
         for object_name in s3.list_objects(Bucket='c14-gbu-storage')['Contents']:
             object_key = object_name['Key']
 
             if object_key == filename:
-                s3.download_file('c14-gbu-storage', object_key,
-                                 'existing_recordings.csv')
+                s3.download_file('c14-gbu-storage', object_key, local_path)
                 return True
     except KeyError:
         return False
@@ -46,6 +61,12 @@ def download_csv_from_s3(s3: boto3.client) -> bool:
     return False
 
 
+def download_csv_from_s3(s3: boto3.client) -> bool:
+    """Attempts to download .csv file from S3 bucket."""
+    return download_file_from_s3(s3, 'updated_recordings_data.csv',
+                                 'existing_recordings.csv')
+
+
 def make_existing_recordings_df(test_mode: bool) -> pd.DataFrame:
     """Creates empty df if no csv file found on S3,
     fills empty df with test data if test_mode = True."""
@@ -90,65 +111,211 @@ def merge_with_existing_recordings(recordings_df: pd.DataFrame, s3: boto3.client
     return sorted_updated_df
 
 
+def stream_merge_with_existing_recordings(recordings_df: pd.DataFrame,
+                                          s3: boto3.client,
+                                          now: datetime = None) -> tuple[int, pd.DataFrame]:
+    """Bounded-memory version of merge_with_existing_recordings, streaming the
+    existing .csv from the S3 bucket through in chunks instead of loading and
+    sorting it whole. Recordings already in the archive, such as backfilled
+    ones, are skipped and recordings past the warm tier are dropped. Returns
+    the number of rows in the updated .csv file and the newly archived
+    recordings."""
+    file_found = download_csv_from_s3(s3)
+    existing_csv_path = './existing_recordings.csv' if file_found is True else None
+
+    archived_ids = archived_recording_ids(existing_csv_path, recordings_df)
+    if archived_ids:
+        print(f"Skipping {len(archived_ids)} recordings that are already archived.")
+    new_recordings_df = recordings_df[~recordings_df['recording_id'].isin(archived_ids)]
+
+    rows_written = merge_recordings_csv(new_recordings_df, existing_csv_path,
+                                        'updated_recordings_data.csv',
+                                        expire_before=warm_cutoff(now or datetime.now()))
+    return rows_written, new_recordings_df
+
+
 def update_csv_on_s3(s3):
     """Uploads the updated .csv file to the S3 bucket."""
     s3.upload_file('updated_recordings_data.csv',
                    'c14-gbu-storage', 'updated_recordings_data.csv')
 
 
-def query_database(conn: pymssql.Connection, testing_mode=False) -> list[dict]:
+def update_archive_on_s3(s3):
+    """Converts the updated .csv file to the compact archive
+    format and uploads it to the S3 bucket."""
+    convert_csv_to_archive('updated_recordings_data.csv',
+                           'updated_recordings_data.rec')
+    s3.upload_file('updated_recordings_data.rec',
+                   'c14-gbu-storage', 'updated_recordings_data.rec')
+
+
+def update_rollups_on_s3(recordings_df: pd.DataFrame, continents_df: pd.DataFrame,
+                         s3: boto3.client, now: datetime = None) -> None:
+    """Rebuilds the rollups of the days the newly archived recordings were
+    taken on from the updated archive .csv, replaces those days in the
+    rollups already on the S3 bucket, drops the buckets past each rollup's
+    cold tier retention and uploads the results. Days are rebuilt rather than
+    added to, so a recording is never counted twice in the rollups."""
+    now = now or datetime.now()
+    recordings_taken = pd.to_datetime(recordings_df['recording_taken'])
+    cutoff = warm_cutoff(now)
+    if cutoff is not None:
+        recordings_taken = recordings_taken[recordings_taken >= cutoff]
+
+    days = set(recordings_taken.dt.floor('D'))
+    if not days:
+        return
+
+    archived_df = read_recordings_since('updated_recordings_data.csv', min(days))
+    archived_df = archived_df[archived_df['recording_taken'].dt.floor('D').isin(days)]
+
+    for filename, rebuilt_rollup_df in make_all_rollups(archived_df, continents_df).items():
+        group_column = rollup_group_column(filename)
+
+        if download_file_from_s3(s3, filename, f'existing_{filename}'):
+            existing_rollup_df = pd.read_csv(f'./existing_{filename}')
+        else:
+            existing_rollup_df = rebuilt_rollup_df.iloc[0:0]
+
+        updated_rollup_df = expire_rollup(replace_rollup_days(
+            existing_rollup_df, rebuilt_rollup_df, days, group_column), filename, now)
+        updated_rollup_df.to_csv(filename, index=False)
+        s3.upload_file(filename, 'c14-gbu-storage', filename)
+
+
+def query_plant_continents(conn: pymssql.Connection) -> pd.DataFrame:
+    """Returns the continent name of every plant in the RDS."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT plants.plant_id, cont.continent_name
+            FROM delta.Plants AS plants
+            JOIN delta.Locations AS loc
+            ON plants.location_id = loc.location_id
+            JOIN delta.Continents AS cont
+            ON loc.continent_id = cont.continent_id;""")
+        continent_data = cur.fetchall()
+
+    return pd.DataFrame(continent_data, columns=['plant_id', 'continent_name'])
+
+
+def query_database(conn: pymssql.Connection, testing_mode=False) -> dict[str, list]:
     """Queries the RDS for any rows with recording_taken value
-    older than 24 hours, removing and returning those rows."""
+    past the hot tier, removing and returning those rows as a list of
+    values per column, in order of newest to oldest.
+    The cut-off is taken once, so the rows removed are exactly the rows
+    returned. A partitioned table drops whole days by partition.
+    Each row's last_watered is joined from its watering event."""
     if testing_mode is False:
         query_table = "Recordings"
     else:
         query_table = "Test_Recordings"
 
-    with conn.cursor() as cur:
-        cur.execute(
-            f"""SELECT * FROM delta.{query_table} 
-            WHERE reading_taken < DATEADD(HOUR, -24, SYSDATETIME()) 
-            ORDER BY reading_taken DESC;""")
-        recording_data = cur.fetchall()
+    partitioned = is_partitioned(conn, query_table)
 
-        cur.execute(
-            f"""DELETE FROM delta.{query_table} 
-            WHERE reading_taken < DATEADD(HOUR, -24, SYSDATETIME());""")
+    with conn.cursor() as cur:
+        cur.execute("SELECT DATEADD(HOUR, -%s, SYSDATETIME()) AS cutoff;",
+                    (HOT_TIER_HOURS,))
+        cutoff = cur.fetchone()['cutoff']
+
+    recording_data = fetch_columns(
+        conn, RECORDING_COLUMNS,
+        f"""delta.{query_table} AS rec
+            LEFT JOIN delta.Watering_Events AS events
+            ON rec.watering_event_id = events.watering_event_id""",
+        "rec.reading_taken < %s", (cutoff,))
+
+    if not partitioned:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""DELETE FROM delta.{query_table} 
+                WHERE reading_taken < %s;""", (cutoff,))
 
     conn.commit()
 
+    if partitioned:
+        truncated = remove_recordings_before(conn, cutoff, query_table)
+        added = add_boundaries(conn, cutoff.date() + timedelta(days=1), table=query_table)
+        print(f"Truncated {truncated} partitions, added {added} day boundaries.")
+
     return recording_data
 
 
+def prune_continent_hourly_moisture(conn: pymssql.Connection) -> None:
+    """Removes hours from the continent moisture summary once all of their
+    recordings have been archived, as the continent rollup covers them."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM delta.Continent_Hourly_Moisture
+            WHERE hour_start < DATEADD(HOUR, -%s, SYSDATETIME());""",
+                    (HOT_TIER_HOURS + 1,))
+
+    conn.commit()
+
+
 def lambda_handler(event=None, context=None) -> None:
     """Equivalent to __main__ function, for running script
     on AWS Lambda function."""
     load_dotenv()
+    reset()
+
+    with profile_invocation("mover"):
+        move_recordings()
+
+    report("mover")
 
-    conn = pymssql.connect(
+
+def move_recordings() -> None:
+    """Moves recordings past the hot tier from the RDS to the S3 bucket,
+    timing and counting the work of each stage. The recordings are taken
+    from the RDS under the run lock, so an ETL run cannot write at the
+    same time."""
+    conn = CountingConnection(pymssql.connect(
         server=environ["DB_HOST"],
         port=environ["DB_PORT"],
         user=environ["DB_USER"],
         password=environ["DB_PASSWORD"],
         database=environ["DB_NAME"],
         as_dict=True
-    )
+    ))
 
-    recording_data = query_database(conn)
+    with run_lock(conn, "mover", LOCK_TIMEOUT_SECONDS) as acquired:
+        if not acquired:
+            return
 
-    if recording_data == []:
-        print("No recordings older than 24 hours, 0 rows removed.")
-        return
+        with stage("query"):
+            recording_data = query_database(conn)
+            prune_continent_hourly_moisture(conn)
+            count("rows", len(recording_data['recording_id']))
 
-    print("The following recordings have been removed from the database:\n")
-    print(recording_data)
+    if not recording_data['recording_id']:
+        print(f"No recordings older than {HOT_TIER_HOURS} hours, 0 rows removed.")
+        return
 
-    recordings_df = convert_data_to_df(recording_data)
-    s3 = boto3.client('s3', aws_access_key_id=environ.get(
-        "aws_access_key_id"), aws_secret_access_key=environ.get("aws_secret_access_key"))
+    with stage("convert"):
+        recordings_df = convert_data_to_df(recording_data)
+        count("rows", len(recordings_df))
 
-    updated_df = merge_with_existing_recordings(recordings_df, s3)
-    update_csv_on_s3(s3)
+    print("The following recordings have been removed from the database:\n")
+    print(recordings_df)
+
+    s3 = CallCounter(boto3.client('s3', aws_access_key_id=environ.get(
+        "aws_access_key_id"), aws_secret_access_key=environ.get("aws_secret_access_key")),
+        "http_calls")
+
+    with stage("merge"):
+        rows_archived, new_recordings_df = stream_merge_with_existing_recordings(
+            recordings_df, s3)
+        count("rows", rows_archived)
+    print(f"Archive now holds {rows_archived} recordings.")
+
+    with stage("upload"):
+        update_csv_on_s3(s3)
+        update_archive_on_s3(s3)
+        count("rows", rows_archived)
+
+    with stage("rollups"):
+        update_rollups_on_s3(new_recordings_df, query_plant_continents(conn), s3)
+        count("rows", len(new_recordings_df))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""Time-partitioned layout for delta.Recordings.
+
+In this layout delta.Recordings is clustered on (reading_taken, recording_id)
+and partitioned by day of reading_taken, so time-range reads only touch the
+pages of the days they ask for. Its indexes are aligned to the same
+partitions. With the optional nonclustered columnstore index, analytic reads
+over many readings scan compressed columns instead of rows.
+
+The mover removes recordings past the 24 hour cut-off by truncating whole
+day partitions, which only changes metadata. Only the rows of the single
+partition the cut-off falls in are deleted row by row. Day boundaries are
+added DAYS_AHEAD days in advance, and emptied ones are merged away."""
+
+from datetime import date, datetime, timedelta
+import pymssql
+
+
+DAYS_AHEAD = 7
+
+
+def partition_names(table: str = "Recordings") -> tuple[str, str]:
+    """Returns the names of the partition function and scheme of a table."""
+    return (f"pf_{table.lower()}_reading_taken", f"ps_{table.lower()}_reading_taken")
+
+
+def partitioned_recordings_ddl(table: str = "Recordings", columnstore: bool = False) -> str:
+    """Returns the DDL creating a recordings table in the partitioned layout,
+    with no day boundaries yet, and optionally its columnstore index."""
+    function, scheme = partition_names(table)
+    ddl = f"""
+CREATE PARTITION FUNCTION {function} (datetime2)
+    AS RANGE RIGHT FOR VALUES ();
+
+CREATE PARTITION SCHEME {scheme}
+    AS PARTITION {function} ALL TO ([PRIMARY]);
+
+CREATE TABLE delta.{table} (
+    recording_id INT IDENTITY (1, 1) NOT NULL,
+    plant_id INT NOT NULL,
+    watering_event_id INT,
+    soil_moisture FLOAT NOT NULL,
+    temperature FLOAT NOT NULL,
+    reading_taken datetime2 NOT NULL,
+    CONSTRAINT pk_{table.lower()} PRIMARY KEY CLUSTERED (reading_taken, recording_id),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (watering_event_id) REFERENCES delta.Watering_Events (watering_event_id)
+) ON {scheme} (reading_taken);
+
+CREATE INDEX ix_{table.lower()}_plant_reading_taken
+    ON delta.{table} (plant_id, reading_taken)
+    INCLUDE (watering_event_id, soil_moisture, temperature)
+    ON {scheme} (reading_taken);
+
+CREATE INDEX ix_{table.lower()}_recording_id
+    ON delta.{table} (recording_id)
+    ON {scheme} (reading_taken);
+"""
+    if columnstore:
+        ddl += f"""
+CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_{table.lower()}
+    ON delta.{table} (plant_id, reading_taken, soil_moisture, temperature, watering_event_id)
+    ON {scheme} (reading_taken);
+"""
+    return ddl
+
+
+def drop_partitioning_ddl(table: str = "Recordings") -> str:
+    """Returns the DDL dropping the partition scheme and function of a
+    table, to run once the table itself has been dropped."""
+    function, scheme = partition_names(table)
+    return f"""
+IF EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = '{scheme}')
+    DROP PARTITION SCHEME {scheme};
+
+IF EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = '{function}')
+    DROP PARTITION FUNCTION {function};
+"""
+
+
+def first_value(row):
+    """Returns the first value of a row, whichever row type the
+    connection returns."""
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+def is_partitioned(conn: pymssql.Connection, table: str = "Recordings") -> bool:
+    """Returns whether a recordings table uses the partitioned layout."""
+    _, scheme = partition_names(table)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COUNT(*) AS partitioned
+            FROM sys.indexes AS ind
+            JOIN sys.partition_schemes AS scheme
+            ON ind.data_space_id = scheme.data_space_id
+            WHERE ind.object_id = OBJECT_ID('delta.{table}')
+            AND ind.index_id <= 1 AND scheme.name = '{scheme}';""")
+        return first_value(cur.fetchone()) > 0
+
+
+def partition_boundaries(conn: pymssql.Connection,
+                         table: str = "Recordings") -> list[datetime]:
+    """Returns the day boundaries of a table's partition function, oldest first."""
+    function, _ = partition_names(table)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT range_values.value AS boundary
+            FROM sys.partition_range_values AS range_values
+            JOIN sys.partition_functions AS functions
+            ON range_values.function_id = functions.function_id
+            WHERE functions.name = '{function}'
+            ORDER BY range_values.boundary_id;""")
+        return [first_value(row) for row in cur.fetchall()]
+
+
+def missing_boundaries(boundaries: list[datetime], today: date,
+                       days_ahead: int = DAYS_AHEAD) -> list[datetime]:
+    """Returns the day boundaries from yesterday to days_ahead days from
+    today that the partition function does not have yet."""
+    existing = {boundary.date() for boundary in boundaries}
+    days = [today + timedelta(days=offset) for offset in range(-1, days_ahead + 1)]
+
+    return [datetime.combine(day, datetime.min.time()) for day in days
+            if day not in existing]
+
+
+def add_boundaries(conn: pymssql.Connection, today: date,
+                   days_ahead: int = DAYS_AHEAD, table: str = "Recordings") -> int:
+    """Splits new day partitions up to days_ahead days ahead, returning how
+    many were added. Future partitions are empty, so splitting them is
+    cheap."""
+    function, scheme = partition_names(table)
+    new_boundaries = missing_boundaries(partition_boundaries(conn, table), today, days_ahead)
+
+    with conn.cursor() as cur:
+        for boundary in new_boundaries:
+            cur.execute(f"""
+                ALTER PARTITION SCHEME {scheme} NEXT USED [PRIMARY];
+                ALTER PARTITION FUNCTION {function} ()
+                    SPLIT RANGE (%s);""", (boundary,))
+
+    conn.commit()
+    return len(new_boundaries)
+
+
+def remove_recordings_before(conn: pymssql.Connection, cutoff: datetime,
+                             table: str = "Recordings") -> int:
+    """Removes recordings taken before cutoff. Partitions entirely before the
+    cut-off are truncated and merged into one empty partition, and the rest
+    are deleted from the partition the cut-off falls in. Returns the
+    number of partitions truncated."""
+    function, _ = partition_names(table)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT $PARTITION.{function}(%s) AS partition_number;",
+                    (cutoff,))
+        cutoff_partition = first_value(cur.fetchone())
+
+        if cutoff_partition > 1:
+            cur.execute(f"TRUNCATE TABLE delta.{table} "
+                        f"WITH (PARTITIONS (1 TO {cutoff_partition - 1}));")
+
+        cur.execute(f"DELETE FROM delta.{table} WHERE reading_taken < %s;", (cutoff,))
+
+    conn.commit()
+
+    # The boundary of the cut-off partition is kept, as merging it would
+    # move that partition's rows rather than only change metadata.
+    for boundary in partition_boundaries(conn, table)[:max(cutoff_partition - 2, 0)]:
+        with conn.cursor() as cur:
+            cur.execute(f"ALTER PARTITION FUNCTION {function} () "
+                        f"MERGE RANGE (%s);", (boundary,))
+        conn.commit()
+
+    return max(cutoff_partition - 1, 0)
@@ -1,19 +1,29 @@
 from os import environ
+from argparse import ArgumentParser
+from datetime import date
 import pymssql
 from dotenv import load_dotenv
+from partitions import partitioned_recordings_ddl, drop_partitioning_ddl, add_boundaries
 
 
-def reset_db(conn):
-
-    with conn.cursor() as cur:
-        cur.execute("""
+DROP_AND_CREATE_DIMENSIONS = """
 
 IF OBJECT_ID('delta.Recordings', 'U') IS NOT NULL
     DROP TABLE delta.Recordings;
 
+""" + drop_partitioning_ddl() + """
+IF OBJECT_ID('delta.Continent_Hourly_Moisture', 'U') IS NOT NULL
+    DROP TABLE delta.Continent_Hourly_Moisture;
+
+IF OBJECT_ID('delta.Plant_Current_State', 'U') IS NOT NULL
+    DROP TABLE delta.Plant_Current_State;
+
 IF OBJECT_ID('delta.Assignments', 'U') IS NOT NULL
     DROP TABLE delta.Assignments;
 
+IF OBJECT_ID('delta.Watering_Events', 'U') IS NOT NULL
+    DROP TABLE delta.Watering_Events;
+
 IF OBJECT_ID('delta.Plants', 'U') IS NOT NULL
     DROP TABLE delta.Plants;
 
@@ -82,14 +92,58 @@ CREATE TABLE delta.Plants (
     FOREIGN KEY (location_id) REFERENCES delta.Locations (location_id)
 );
 
+CREATE TABLE delta.Watering_Events (
+    watering_event_id INT IDENTITY (1, 1) PRIMARY KEY,
+    plant_id INT NOT NULL,
+    watered_at datetime2 NOT NULL,
+    CONSTRAINT uq_watering_events_plant_watered_at UNIQUE (plant_id, watered_at),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id)
+);
+"""
+
+ROWSTORE_RECORDINGS_DDL = """
 CREATE TABLE delta.Recordings (
     recording_id INT IDENTITY (1, 1) PRIMARY KEY,
     plant_id INT NOT NULL,
-    last_watered datetime2,
+    watering_event_id INT,
     soil_moisture FLOAT NOT NULL,
     temperature FLOAT NOT NULL,
     reading_taken datetime2 NOT NULL,
-    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id)
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (watering_event_id) REFERENCES delta.Watering_Events (watering_event_id)
+);
+
+CREATE INDEX ix_recordings_plant_reading_taken
+    ON delta.Recordings (plant_id, reading_taken)
+    INCLUDE (watering_event_id, soil_moisture, temperature);
+
+CREATE INDEX ix_recordings_reading_taken
+    ON delta.Recordings (reading_taken)
+    INCLUDE (plant_id, soil_moisture);
+"""
+
+CREATE_SUMMARIES = """
+CREATE TABLE delta.Continent_Hourly_Moisture (
+    continent_id INT NOT NULL,
+    hour_start datetime2 NOT NULL,
+    reading_count INT NOT NULL,
+    total_soil_moisture FLOAT NOT NULL,
+    primary key (hour_start, continent_id),
+    FOREIGN KEY (continent_id) REFERENCES delta.Continents (continent_id)
+);
+
+CREATE TABLE delta.Plant_Current_State (
+    plant_id INT NOT NULL,
+    soil_moisture FLOAT NOT NULL,
+    temperature FLOAT NOT NULL,
+    last_watered datetime2,
+    reading_taken datetime2 NOT NULL,
+    botanist_id INT,
+    location_id INT NOT NULL,
+    primary key (plant_id),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (botanist_id) REFERENCES delta.Botanists (botanist_id),
+    FOREIGN KEY (location_id) REFERENCES delta.Locations (location_id)
 );
 
 CREATE TABLE delta.Assignments (
@@ -99,10 +153,27 @@ CREATE TABLE delta.Assignments (
     FOREIGN KEY (botanist_id) REFERENCES delta.Botanists (botanist_id),
     FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id)
 );
-""")
+"""
+
+
+def reset_db(conn, partitioned: bool = False, columnstore: bool = False):
+    """Drops and recreates every table. With partitioned, delta.Recordings
+    uses the day-partitioned layout from partitions.py, and with columnstore
+    also gets its nonclustered columnstore index."""
+    if columnstore and not partitioned:
+        raise ValueError("The columnstore index is part of the partitioned layout.")
+
+    recordings_ddl = (partitioned_recordings_ddl(columnstore=columnstore) if partitioned
+                      else ROWSTORE_RECORDINGS_DDL)
+
+    with conn.cursor() as cur:
+        cur.execute(DROP_AND_CREATE_DIMENSIONS + recordings_ddl + CREATE_SUMMARIES)
 
     conn.commit()
 
+    if partitioned:
+        add_boundaries(conn, date.today())
+
 
 if __name__ == "__main__":
     load_dotenv()
@@ -116,4 +187,11 @@ if __name__ == "__main__":
         as_dict=True
     )
 
-    reset_db(conn)
+    parser = ArgumentParser(description="Drop and recreate every table.")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="Partition delta.Recordings by day of reading_taken.")
+    parser.add_argument("--columnstore", action="store_true",
+                        help="Add a columnstore index to the partitioned delta.Recordings.")
+    args = parser.parse_args()
+
+    reset_db(conn, args.partitioned, args.columnstore)
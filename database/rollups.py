@@ -0,0 +1,90 @@
+"""Functions for building hourly and daily rollups of archived recordings,
+so the dashboard can read small aggregate files instead of raw readings."""
+
+import pandas as pd
+
+
+MEASUREMENTS = ['soil_moisture', 'temperature']
+
+HOURLY_PLANT_ROLLUP = 'hourly_plant_rollup.csv'
+DAILY_PLANT_ROLLUP = 'daily_plant_rollup.csv'
+HOURLY_CONTINENT_ROLLUP = 'hourly_continent_rollup.csv'
+
+
+def rollup_columns(group_column: str) -> list[str]:
+    """Returns the column order used by a rollup grouped on group_column."""
+    columns = [group_column, 'bucket_start', 'reading_count']
+    for measurement in MEASUREMENTS:
+        columns += [f'{measurement}_mean', f'{measurement}_min', f'{measurement}_max']
+
+    return columns
+
+
+def make_rollup(recordings_df: pd.DataFrame, group_column: str, freq: str) -> pd.DataFrame:
+    """Aggregates recordings into the count, mean, min and max of each
+    measurement per group_column per freq sized time bucket."""
+    if recordings_df.empty:
+        return pd.DataFrame(columns=rollup_columns(group_column))
+
+    bucket_start = pd.to_datetime(
+        recordings_df['recording_taken']).dt.floor(freq).rename('bucket_start')
+    measurements_df = recordings_df[MEASUREMENTS].astype(float)
+
+    aggregations = {'reading_count': ('soil_moisture', 'count')}
+    for measurement in MEASUREMENTS:
+        aggregations[f'{measurement}_mean'] = (measurement, 'mean')
+        aggregations[f'{measurement}_min'] = (measurement, 'min')
+        aggregations[f'{measurement}_max'] = (measurement, 'max')
+
+    rollup_df = measurements_df.groupby(
+        [recordings_df[group_column], bucket_start]).agg(**aggregations).reset_index()
+
+    return rollup_df[rollup_columns(group_column)]
+
+
+def add_continents(recordings_df: pd.DataFrame, continents_df: pd.DataFrame) -> pd.DataFrame:
+    """Adds a continent_name column to recordings, using a df of
+    plant_id and continent_name pairs."""
+    recordings_df = recordings_df.astype({'plant_id': int})
+    continents_df = continents_df.astype({'plant_id': int})
+
+    return recordings_df.merge(
+        continents_df[['plant_id', 'continent_name']], how='left', on='plant_id')
+
+
+def replace_rollup_days(existing_df: pd.DataFrame, rebuilt_df: pd.DataFrame,
+                        days: set, group_column: str) -> pd.DataFrame:
+    """Replaces every bucket of a rollup falling on one of days with the
+    rebuilt buckets of those days. Rebuilding the same days from the same
+    recordings gives the same rollup, however often it is done."""
+    existing_df = existing_df.copy()
+    existing_df['bucket_start'] = pd.to_datetime(existing_df['bucket_start'])
+    kept_df = existing_df[~existing_df['bucket_start'].dt.floor('D').isin(days)]
+
+    replaced_df = pd.concat([df for df in (kept_df, rebuilt_df) if not df.empty],
+                            ignore_index=True)
+    if replaced_df.empty:
+        return pd.DataFrame(columns=rollup_columns(group_column))
+
+    replaced_df['bucket_start'] = pd.to_datetime(replaced_df['bucket_start'])
+    return replaced_df.sort_values(by='bucket_start', ascending=False)[
+        rollup_columns(group_column)]
+
+
+def make_all_rollups(recordings_df: pd.DataFrame,
+                     continents_df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Returns every rollup produced during archival, keyed by the
+    filename it is stored under."""
+    return {
+        HOURLY_PLANT_ROLLUP: make_rollup(recordings_df, 'plant_id', 'h'),
+        DAILY_PLANT_ROLLUP: make_rollup(recordings_df, 'plant_id', 'D'),
+        HOURLY_CONTINENT_ROLLUP: make_rollup(
+            add_continents(recordings_df, continents_df), 'continent_name', 'h')
+    }
+
+
+def rollup_group_column(filename: str) -> str:
+    """Returns the column a stored rollup is grouped on."""
+    if filename == HOURLY_CONTINENT_ROLLUP:
+        return 'continent_name'
+    return 'plant_id'
@@ -2,10 +2,25 @@
 IF OBJECT_ID('delta.Recordings', 'U') IS NOT NULL
     DROP TABLE delta.Recordings;
 
+IF EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'ps_recordings_reading_taken')
+    DROP PARTITION SCHEME ps_recordings_reading_taken;
+
+IF EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'pf_recordings_reading_taken')
+    DROP PARTITION FUNCTION pf_recordings_reading_taken;
+
+
+IF OBJECT_ID('delta.Continent_Hourly_Moisture', 'U') IS NOT NULL
+    DROP TABLE delta.Continent_Hourly_Moisture;
+
+IF OBJECT_ID('delta.Plant_Current_State', 'U') IS NOT NULL
+    DROP TABLE delta.Plant_Current_State;
 
 IF OBJECT_ID('delta.Assignments', 'U') IS NOT NULL
     DROP TABLE delta.Assignments;
 
+IF OBJECT_ID('delta.Watering_Events', 'U') IS NOT NULL
+    DROP TABLE delta.Watering_Events;
+
 IF OBJECT_ID('delta.Plants', 'U') IS NOT NULL
     DROP TABLE delta.Plants;
 
@@ -74,14 +89,54 @@ CREATE TABLE delta.Plants (
     FOREIGN KEY (location_id) REFERENCES delta.Locations (location_id)
 );
 
+CREATE TABLE delta.Watering_Events (
+    watering_event_id INT IDENTITY (1, 1) PRIMARY KEY,
+    plant_id INT NOT NULL,
+    watered_at datetime2 NOT NULL,
+    CONSTRAINT uq_watering_events_plant_watered_at UNIQUE (plant_id, watered_at),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id)
+);
+
 CREATE TABLE delta.Recordings (
     recording_id INT IDENTITY (1, 1) PRIMARY KEY,
     plant_id INT NOT NULL,
-    last_watered datetime2,
+    watering_event_id INT,
     soil_moisture FLOAT NOT NULL,
     temperature FLOAT NOT NULL,
     reading_taken datetime2 NOT NULL,
-    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id)
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (watering_event_id) REFERENCES delta.Watering_Events (watering_event_id)
+);
+
+CREATE INDEX ix_recordings_plant_reading_taken
+    ON delta.Recordings (plant_id, reading_taken)
+    INCLUDE (watering_event_id, soil_moisture, temperature);
+
+CREATE INDEX ix_recordings_reading_taken
+    ON delta.Recordings (reading_taken)
+    INCLUDE (plant_id, soil_moisture);
+
+CREATE TABLE delta.Continent_Hourly_Moisture (
+    continent_id INT NOT NULL,
+    hour_start datetime2 NOT NULL,
+    reading_count INT NOT NULL,
+    total_soil_moisture FLOAT NOT NULL,
+    primary key (hour_start, continent_id),
+    FOREIGN KEY (continent_id) REFERENCES delta.Continents (continent_id)
+);
+
+CREATE TABLE delta.Plant_Current_State (
+    plant_id INT NOT NULL,
+    soil_moisture FLOAT NOT NULL,
+    temperature FLOAT NOT NULL,
+    last_watered datetime2,
+    reading_taken datetime2 NOT NULL,
+    botanist_id INT,
+    location_id INT NOT NULL,
+    primary key (plant_id),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (botanist_id) REFERENCES delta.Botanists (botanist_id),
+    FOREIGN KEY (location_id) REFERENCES delta.Locations (location_id)
 );
 
 CREATE TABLE delta.Assignments (
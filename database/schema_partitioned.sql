@@ -0,0 +1,46 @@
+-- The day-partitioned layout of delta.Recordings, an alternative to the
+-- rowstore layout in schema.sql. Run after schema.sql, while
+-- delta.Recordings is empty. The columnstore index at the end is optional,
+-- for analytic reads. The mover, or `python reset_db.py --partitioned`,
+-- adds the day boundaries.
+
+IF OBJECT_ID('delta.Recordings', 'U') IS NOT NULL
+    DROP TABLE delta.Recordings;
+
+IF EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'ps_recordings_reading_taken')
+    DROP PARTITION SCHEME ps_recordings_reading_taken;
+
+IF EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'pf_recordings_reading_taken')
+    DROP PARTITION FUNCTION pf_recordings_reading_taken;
+
+CREATE PARTITION FUNCTION pf_recordings_reading_taken (datetime2)
+    AS RANGE RIGHT FOR VALUES ();
+
+CREATE PARTITION SCHEME ps_recordings_reading_taken
+    AS PARTITION pf_recordings_reading_taken ALL TO ([PRIMARY]);
+
+CREATE TABLE delta.Recordings (
+    recording_id INT IDENTITY (1, 1) NOT NULL,
+    plant_id INT NOT NULL,
+    watering_event_id INT,
+    soil_moisture FLOAT NOT NULL,
+    temperature FLOAT NOT NULL,
+    reading_taken datetime2 NOT NULL,
+    CONSTRAINT pk_recordings PRIMARY KEY CLUSTERED (reading_taken, recording_id),
+    FOREIGN KEY (plant_id) REFERENCES delta.Plants (plant_id),
+    FOREIGN KEY (watering_event_id) REFERENCES delta.Watering_Events (watering_event_id)
+) ON ps_recordings_reading_taken (reading_taken);
+
+CREATE INDEX ix_recordings_plant_reading_taken
+    ON delta.Recordings (plant_id, reading_taken)
+    INCLUDE (watering_event_id, soil_moisture, temperature)
+    ON ps_recordings_reading_taken (reading_taken);
+
+CREATE INDEX ix_recordings_recording_id
+    ON delta.Recordings (recording_id)
+    ON ps_recordings_reading_taken (reading_taken);
+
+-- Optional:
+CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_recordings
+    ON delta.Recordings (plant_id, reading_taken, soil_moisture, temperature, watering_event_id)
+    ON ps_recordings_reading_taken (reading_taken);
@@ -0,0 +1,70 @@
+"""Test file for the compact archive format in archive_format.py"""
+
+import pytest
+import pandas as pd
+from archive_format import (write_archive, read_archive, iter_archive,
+                            convert_csv_to_archive, zstandard)
+
+
+@pytest.fixture(name='test_recordings')
+def test_recordings_df():
+    return pd.DataFrame({
+        'recording_id': [4, 3, 2, 1],
+        'plant_id': [10, 11, 10, 12],
+        'last_watered': ["2024-11-27 14:35:45", "2024-11-26 09:00:00",
+                         "2024-11-27 14:35:45", "2024-11-27 14:35:45"],
+        'soil_moisture': [40.22, 30.5, 20.0, 60.75],
+        'temperature': [23.1, 10.25, 22.0, 18.5],
+        'recording_taken': ["2024-11-28 13:59:00", "2024-11-28 13:10:00",
+                            "2024-11-27 13:05:00", "2024-11-26 12:59:00"]
+    })
+
+
+@pytest.mark.parametrize('codec', [b'g', pytest.param(b'z', marks=pytest.mark.skipif(
+    zstandard is None, reason="zstandard not installed"))])
+def test_round_trip(test_recordings, tmp_path, codec):
+    """Tests an archive reads back to the same columns as the .csv file."""
+    rows_written = write_archive(
+        [test_recordings], tmp_path / 'recordings.rec', codec)
+    archive_df = read_archive(tmp_path / 'recordings.rec')
+
+    assert rows_written == 4
+    assert list(archive_df.columns) == list(test_recordings.columns)
+    assert archive_df['last_watered'].tolist() == test_recordings['last_watered'].tolist()
+    assert archive_df['recording_taken'].tolist() == pd.to_datetime(
+        test_recordings['recording_taken']).tolist()
+    pd.testing.assert_series_equal(archive_df['soil_moisture'],
+                                   test_recordings['soil_moisture'], rtol=1e-6)
+
+
+def test_convert_csv_to_archive(test_recordings, tmp_path):
+    """Tests a .csv file is converted in chunks, one block per chunk."""
+    test_recordings.to_csv(tmp_path / 'recordings.csv', index=False)
+
+    rows_written = convert_csv_to_archive(tmp_path / 'recordings.csv',
+                                          tmp_path / 'recordings.rec', chunksize=2)
+
+    assert rows_written == 4
+    assert len(list(iter_archive(tmp_path / 'recordings.rec'))) == 2
+
+
+def test_read_archive_filters(test_recordings, tmp_path):
+    """Tests blocks outside the filters are skipped and rows filtered."""
+    write_archive([test_recordings.iloc[:2], test_recordings.iloc[2:]],
+                  tmp_path / 'recordings.rec')
+
+    blocks = list(iter_archive(tmp_path / 'recordings.rec',
+                               start=pd.Timestamp("2024-11-28 00:00:00")))
+    filtered_df = read_archive(tmp_path / 'recordings.rec', plant_id=10,
+                               end=pd.Timestamp("2024-11-28 00:00:00"))
+
+    assert len(blocks) == 1
+    assert filtered_df['recording_id'].tolist() == [2]
+
+
+def test_read_archive_rejects_other_files(tmp_path):
+    """Tests files that are not archives raise a ValueError."""
+    (tmp_path / 'recordings.csv').write_text("recording_id,plant_id\n1,2\n")
+
+    with pytest.raises(ValueError):
+        read_archive(tmp_path / 'recordings.csv')
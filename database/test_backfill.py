@@ -0,0 +1,220 @@
+"""Test file for the archive backfill in backfill.py"""
+
+from datetime import datetime
+from shutil import copyfile
+from unittest.mock import MagicMock, patch
+import pytest
+import pandas as pd
+from archive_format import write_archive, RECORDING_COLUMNS
+from backfill import (iter_batches, transform_batch, load_batch, load_checkpoint,
+                      save_checkpoint, reserve_archived_ids, run_backfill)
+from lambda_mover import (convert_data_to_df, stream_merge_with_existing_recordings,
+                          update_rollups_on_s3)
+from rollups import make_all_rollups
+
+
+def fake_connection(current_id: int = 0, ids_taken: int = 0) -> MagicMock:
+    """Returns a connection whose identity check finds the given current
+    delta.Recordings id and number of recordings with archived ids."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = {
+        'current_id': current_id, 'ids_taken': ids_taken}
+    return conn
+
+
+@pytest.fixture(name='test_recordings')
+def test_recordings_df():
+    return pd.DataFrame({
+        'recording_id': [5, 4, 3, 2, 1],
+        'plant_id': [10, 11, 10, 12, 10],
+        'last_watered': ["2024-11-27 14:35:45", None, "2024-11-27 14:35:45",
+                         "2024-11-26 09:00:00", "2024-11-26 09:00:00"],
+        'soil_moisture': [40.22, 30.5, 20.0, 60.75, 55.0],
+        'temperature': [23.1, 10.25, 22.0, 18.5, 17.0],
+        'recording_taken': ["2024-11-28 13:59:00", "2024-11-28 13:10:00",
+                            "2024-11-27 13:05:00", "2024-11-26 12:59:00",
+                            "2024-11-26 12:00:00"]
+    })
+
+
+@pytest.mark.parametrize('filename', ['archive.csv', 'archive.rec'])
+def test_iter_batches_splits_into_batch_size(test_recordings, tmp_path, filename):
+    """Tests both archive formats are read in batches of batch_size rows."""
+    if filename.endswith('.csv'):
+        test_recordings.to_csv(tmp_path / filename, index=False)
+    else:
+        write_archive([test_recordings], tmp_path / filename)
+
+    batches = list(iter_batches(str(tmp_path / filename), batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert pd.concat(batches)['recording_id'].tolist() == [5, 4, 3, 2, 1]
+
+
+def test_iter_batches_filters_time_window(test_recordings, tmp_path):
+    """Tests only recordings taken between start and end are read."""
+    test_recordings.to_csv(tmp_path / 'archive.csv', index=False)
+
+    batches = list(iter_batches(tmp_path / 'archive.csv', 10,
+                                pd.Timestamp("2024-11-27"), pd.Timestamp("2024-11-28 13:30")))
+
+    assert pd.concat(batches)['recording_id'].tolist() == [4, 3]
+
+
+def test_transform_batch_makes_staging_rows(test_recordings):
+    """Tests recordings become staging rows, with a missing last_watered as None."""
+    rows = transform_batch(pd.concat([test_recordings, test_recordings.iloc[:1]]))
+
+    assert len(rows) == 5
+    assert rows[0] == (5, 10, datetime(2024, 11, 27, 14, 35, 45), 40.22, 23.1,
+                       datetime(2024, 11, 28, 13, 59))
+    assert rows[1][2] is None
+
+
+def test_load_batch_bulk_copies_then_inserts():
+    """Tests a batch is bulk copied to the staging table before the insert."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = {
+        'rows_inserted': 2}
+
+    assert load_batch(conn, [(1,), (2,)]) == 2
+    assert conn.bulk_copy.call_args.args[0] == 'delta.Recordings_Backfill'
+    conn.commit.assert_called_once()
+
+
+@patch('backfill.run_lock')
+def test_reserve_archived_ids_reseeds_above_archive(mock_lock):
+    """Tests the identity is reseeded above the highest archived id."""
+    mock_lock.return_value.__enter__.return_value = True
+    conn = fake_connection(current_id=1)
+
+    assert reserve_archived_ids(conn, 5, check_taken=True)
+    cursor = conn.cursor.return_value.__enter__.return_value
+    assert cursor.execute.call_args.args == (
+        "DBCC CHECKIDENT ('delta.Recordings', RESEED, %s);", (6,))
+    conn.commit.assert_called_once()
+
+
+@patch('backfill.run_lock')
+def test_reserve_archived_ids_refuses_taken_ids(mock_lock):
+    """Tests the backfill refuses to run when new recordings already use
+    archived ids, unless it is resuming its own backfill."""
+    mock_lock.return_value.__enter__.return_value = True
+
+    with pytest.raises(RuntimeError):
+        reserve_archived_ids(fake_connection(current_id=3, ids_taken=3), 5, check_taken=True)
+    assert reserve_archived_ids(fake_connection(current_id=9, ids_taken=3), 5,
+                                check_taken=False)
+
+
+def test_checkpoint_resumes_same_backfill(tmp_path):
+    """Tests a checkpoint is only resumed for the same source and batch size."""
+    checkpoint_path = tmp_path / 'checkpoint.json'
+    checkpoint = load_checkpoint(checkpoint_path, 'archive.rec', 100)
+    checkpoint["batches_done"] = 3
+    save_checkpoint(checkpoint, checkpoint_path)
+
+    assert load_checkpoint(checkpoint_path, 'archive.rec', 100)["batches_done"] == 3
+    assert load_checkpoint(checkpoint_path, 'archive.rec', 50)["batches_done"] == 0
+
+
+@patch('backfill.run_lock')
+@patch('backfill.load_batch')
+def test_run_backfill_resumes_from_checkpoint(mock_load, mock_lock, test_recordings,
+                                              tmp_path):
+    """Tests batches before the checkpoint are skipped, and the checkpoint
+    is removed once the backfill finishes."""
+    mock_load.side_effect = lambda conn, rows: len(rows)
+    mock_lock.return_value.__enter__.return_value = True
+    test_recordings.to_csv(tmp_path / 'archive.csv', index=False)
+    checkpoint_path = tmp_path / 'checkpoint.json'
+    checkpoint = load_checkpoint(checkpoint_path, tmp_path / 'archive.csv', 2)
+    checkpoint["batches_done"] = 1
+    save_checkpoint(checkpoint, checkpoint_path)
+
+    result = run_backfill(fake_connection(), tmp_path / 'archive.csv', checkpoint_path,
+                          batch_size=2, workers=1)
+
+    assert result["batches_done"] == 3
+    assert result["rows_inserted"] == 3
+    assert result["rows_skipped"] == 0
+    assert not checkpoint_path.exists()
+
+
+@patch('backfill.run_lock')
+@patch('backfill.load_batch')
+def test_run_backfill_counts_skipped_recordings(mock_load, mock_lock, test_recordings,
+                                                tmp_path, capsys):
+    """Tests recordings the load skips are counted and reported."""
+    mock_load.side_effect = lambda conn, rows: len(rows) - 1
+    mock_lock.return_value.__enter__.return_value = True
+    test_recordings.to_csv(tmp_path / 'archive.csv', index=False)
+
+    result = run_backfill(fake_connection(), tmp_path / 'archive.csv',
+                          tmp_path / 'checkpoint.json', batch_size=2, workers=1)
+
+    assert result["rows_inserted"] == 2
+    assert result["rows_skipped"] == 3
+    assert "2 recordings inserted and 3 skipped in total" in capsys.readouterr().out
+
+
+@patch('backfill.run_lock')
+@patch('backfill.load_batch')
+def test_run_backfill_stops_without_run_lock(mock_load, mock_lock, test_recordings,
+                                             tmp_path):
+    """Tests the backfill stops without loading when the run lock is held."""
+    mock_lock.return_value.__enter__.return_value = False
+    test_recordings.to_csv(tmp_path / 'archive.csv', index=False)
+    checkpoint_path = tmp_path / 'checkpoint.json'
+
+    result = run_backfill(fake_connection(), tmp_path / 'archive.csv', checkpoint_path,
+                          batch_size=2, workers=1)
+
+    assert result["batches_done"] == 0
+    mock_load.assert_not_called()
+
+
+@patch('backfill.run_lock')
+@patch('backfill.load_batch')
+def test_backfilled_recordings_are_not_archived_twice(mock_load, mock_lock, test_recordings,
+                                                      tmp_path, monkeypatch):
+    """Tests recordings backfilled into the RDS and moved again are neither
+    archived nor counted in the rollups a second time, and moving the same
+    recordings twice leaves the rollups as they were."""
+    loaded = []
+    mock_load.side_effect = lambda conn, rows: loaded.extend(rows) or len(rows)
+    mock_lock.return_value.__enter__.return_value = True
+    continents_df = pd.DataFrame({'plant_id': [10, 11, 12],
+                                  'continent_name': ['Europe', 'Asia', 'Europe']})
+    bucket = tmp_path / 'bucket'
+    bucket.mkdir()
+    test_recordings.to_csv(bucket / 'updated_recordings_data.csv', index=False)
+    for filename, rollup_df in make_all_rollups(test_recordings, continents_df).items():
+        rollup_df.to_csv(bucket / filename, index=False)
+
+    run_backfill(fake_connection(), bucket / 'updated_recordings_data.csv',
+                 tmp_path / 'checkpoint.json', batch_size=2, workers=1)
+    new_row = (6, 10, datetime(2024, 11, 27, 14, 35, 45), 41.0, 23.5,
+               datetime(2024, 11, 28, 14, 30))
+    recordings_df = convert_data_to_df(dict(zip(RECORDING_COLUMNS, zip(new_row, *loaded))))
+
+    s3 = MagicMock()
+    s3.upload_file.side_effect = lambda path, _, key: copyfile(path, bucket / key)
+    monkeypatch.chdir(tmp_path)
+    with patch('lambda_mover.download_file_from_s3',
+               side_effect=lambda _, key, path: copyfile(bucket / key, path) and True):
+        for _ in range(2):
+            rows_archived, new_recordings_df = stream_merge_with_existing_recordings(
+                recordings_df, s3, datetime(2024, 11, 29, 12))
+            s3.upload_file('updated_recordings_data.csv', 'c14-gbu-storage',
+                           'updated_recordings_data.csv')
+            update_rollups_on_s3(new_recordings_df, continents_df, s3,
+                                 datetime(2024, 11, 29, 12))
+
+    assert len(loaded) == 5
+    assert rows_archived == 6
+    assert new_recordings_df.empty
+    for filename in make_all_rollups(test_recordings, continents_df):
+        rollup_df = pd.read_csv(bucket / filename)
+        assert rollup_df['reading_count'].sum() == 6
+        assert not rollup_df.duplicated(subset=list(rollup_df.columns[:2])).any()
@@ -0,0 +1,101 @@
+"""Test file for the bounded-memory merge in external_merge.py"""
+
+import tracemalloc
+import numpy as np
+import pytest
+import pandas as pd
+from external_merge import merge_recordings_csv
+
+
+def make_recordings(start: str, count: int, first_id: int) -> pd.DataFrame:
+    """Makes count recordings a minute apart, newest to oldest, with the
+    newest taken at start."""
+    recording_taken = pd.date_range(end=start, periods=count, freq='min')[::-1]
+
+    return pd.DataFrame({
+        'recording_id': np.arange(first_id + count, first_id, -1),
+        'plant_id': np.arange(count) % 50,
+        'last_watered': "2024-11-27 14:35:45",
+        'soil_moisture': np.linspace(10, 90, count),
+        'temperature': np.linspace(5, 25, count),
+        'recording_taken': recording_taken.strftime("%Y-%m-%d %H:%M:%S")
+    })
+
+
+def peak_merge_memory(tmp_path, archive_rows: int) -> int:
+    """Returns the peak traced memory of merging a day of recordings
+    into an archive of archive_rows recordings."""
+    archive_path = tmp_path / f'archive_{archive_rows}.csv'
+    make_recordings("2024-11-01 00:00:00", archive_rows, 0).to_csv(
+        archive_path, index=False)
+    new_df = make_recordings("2024-11-02 00:00:00", 1440, archive_rows)
+
+    tracemalloc.start()
+    merge_recordings_csv(new_df, archive_path,
+                         tmp_path / 'merged.csv', chunksize=2000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak
+
+
+def test_merge_keeps_newest_to_oldest(tmp_path):
+    """Tests interleaved recordings are merged in order across chunks."""
+    archive_df = make_recordings("2024-11-01 00:00:00", 100, 0)
+    archive_df.iloc[::2].to_csv(tmp_path / 'archive.csv', index=False)
+
+    rows_written = merge_recordings_csv(archive_df.iloc[1::2], tmp_path / 'archive.csv',
+                                        tmp_path / 'merged.csv', chunksize=7)
+    merged_df = pd.read_csv(tmp_path / 'merged.csv')
+
+    assert rows_written == 100
+    assert merged_df['recording_id'].tolist() == list(range(100, 0, -1))
+
+
+def test_merge_skips_recordings_already_archived(tmp_path):
+    """Tests a backfilled recording archived again is only written once."""
+    archive_df = make_recordings("2024-11-01 00:00:00", 20, 0)
+    archive_df.to_csv(tmp_path / 'archive.csv', index=False)
+
+    rows_written = merge_recordings_csv(archive_df.iloc[5:8], tmp_path / 'archive.csv',
+                                        tmp_path / 'merged.csv', chunksize=6)
+    merged_df = pd.read_csv(tmp_path / 'merged.csv')
+
+    assert rows_written == 20
+    assert merged_df['recording_id'].tolist() == list(range(20, 0, -1))
+
+
+def test_merge_without_existing_archive(tmp_path):
+    """Tests the new recordings are written alone when there is no archive."""
+    new_df = make_recordings("2024-11-01 00:00:00", 10, 0).iloc[::-1]
+
+    rows_written = merge_recordings_csv(new_df, None, tmp_path / 'merged.csv')
+    merged_df = pd.read_csv(tmp_path / 'merged.csv')
+
+    assert rows_written == 10
+    assert merged_df['recording_id'].tolist() == list(range(10, 0, -1))
+
+
+def test_merge_drops_expired_recordings(tmp_path):
+    """Recordings taken before expire_before are left out of the merged
+    archive, from both the archive and the new recordings."""
+    archive_df = make_recordings("2024-11-01 00:00:00", 100, 0)
+    archive_df.iloc[10:].to_csv(tmp_path / 'archive.csv', index=False)
+
+    rows_written = merge_recordings_csv(
+        archive_df.iloc[:10], tmp_path / 'archive.csv', tmp_path / 'merged.csv',
+        chunksize=7, expire_before=pd.Timestamp("2024-10-31 23:00:00"))
+
+    merged_df = pd.read_csv(tmp_path / 'merged.csv')
+    assert rows_written == len(merged_df) == 61
+    assert pd.to_datetime(merged_df['recording_taken']).min() == pd.Timestamp(
+        "2024-10-31 23:00:00")
+
+
+def test_merge_memory_ceiling(tmp_path):
+    """Tests peak memory stays the same as the archive grows tenfold."""
+    small_peak = peak_merge_memory(tmp_path, 10000)
+    large_peak = peak_merge_memory(tmp_path, 100000)
+
+    assert large_peak < 8 * 1024 * 1024
+    assert large_peak == pytest.approx(small_peak, rel=0.5)
@@ -0,0 +1,64 @@
+"""Tests for the keyset pagination of recordings reads."""
+from datetime import datetime
+from unittest.mock import MagicMock
+from keyset import fetch_columns
+
+
+COLUMNS = {'recording_id': 'rec.recording_id', 'temperature': 'rec.temperature'}
+
+
+def fake_connection(pages: list[list[tuple]]) -> tuple[MagicMock, MagicMock]:
+    """Returns a connection whose tuple cursor returns the pages in turn."""
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = pages
+    return connection, cursor
+
+
+def test_fetch_columns_pages_by_last_key():
+    """Each page after the first starts after the last row's
+    (reading_taken, recording_id), and values arrive per column."""
+    newest, oldest = datetime(2024, 11, 27, 12), datetime(2024, 11, 27, 11)
+    connection, cursor = fake_connection([
+        [(3, 20.5, newest, 3), (2, 21.0, oldest, 2)],
+        [(1, 22.0, oldest, 1)]])
+
+    values = fetch_columns(connection, COLUMNS, "delta.Recordings AS rec",
+                           "rec.plant_id = %s", (7,), page_size=2)
+
+    assert values == {'recording_id': [3, 2, 1], 'temperature': [20.5, 21.0, 22.0]}
+    connection.cursor.assert_called_with(as_dict=False)
+    first_call, next_call = cursor.execute.call_args_list
+    assert first_call.args[1] == (2, 7)
+    assert "rec.recording_id < %s" not in first_call.args[0]
+    assert next_call.args[1] == (2, 7, oldest, oldest, 2)
+    assert "ORDER BY rec.reading_taken DESC, rec.recording_id DESC" in next_call.args[0]
+
+
+def test_fetch_columns_selects_only_the_columns_asked_for():
+    """Only the projected columns and the key are selected."""
+    connection, cursor = fake_connection([[]])
+
+    values = fetch_columns(connection, {'temperature': 'rec.temperature'},
+                           "delta.Recordings AS rec")
+
+    assert values == {'temperature': []}
+    assert cursor.execute.call_count == 1
+    assert ("SELECT TOP (%s) rec.temperature, rec.reading_taken, rec.recording_id"
+            in cursor.execute.call_args.args[0])
+
+
+def test_fetch_columns_reads_the_key_from_projected_columns():
+    """Key columns that are also asked for are selected once, and
+    the next page's key is read from their positions."""
+    taken = datetime(2024, 11, 27, 12)
+    connection, cursor = fake_connection([[(taken, 5)], []])
+
+    values = fetch_columns(connection, {'recording_taken': 'rec.reading_taken',
+                                        'recording_id': 'rec.recording_id'},
+                           "delta.Recordings AS rec", page_size=1)
+
+    assert values == {'recording_taken': [taken], 'recording_id': [5]}
+    assert ("SELECT TOP (%s) rec.reading_taken, rec.recording_id\n"
+            in cursor.execute.call_args_list[0].args[0])
+    assert cursor.execute.call_args_list[1].args[1] == (1, taken, taken, 5)
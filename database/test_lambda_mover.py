@@ -56,7 +56,7 @@ def test_set_up_test_table():
 CREATE TABLE delta.Test_Recordings (
     recording_id INT IDENTITY (1, 1) PRIMARY KEY,
     plant_id INT NOT NULL,
-    last_watered datetime2,
+    watering_event_id INT,
     soil_moisture FLOAT NOT NULL,
     temperature FLOAT NOT NULL,
     reading_taken datetime2 NOT NULL
@@ -70,9 +70,17 @@ def test_input_test_data_into_rds(test_recording_1, test_recording_2, test_recor
     test_recordings = [test_recording_1, test_recording_2, test_recording_3]
     with conn.cursor() as cur:
         for test_recording in test_recordings:
+            plant_id, last_watered, soil_moisture, temperature, reading_taken = test_recording
             cur.execute("""
-            INSERT INTO delta.Test_Recordings (plant_id, last_watered, soil_moisture, temperature, reading_taken)
-            VALUES (%s, %s, %s, %s, %s);""", test_recording)
+            IF NOT EXISTS (SELECT 1 FROM delta.Watering_Events
+                           WHERE plant_id = %s AND watered_at = %s)
+                INSERT INTO delta.Watering_Events (plant_id, watered_at) VALUES (%s, %s);
+            INSERT INTO delta.Test_Recordings
+                (plant_id, watering_event_id, soil_moisture, temperature, reading_taken)
+            SELECT plant_id, watering_event_id, %s, %s, %s FROM delta.Watering_Events
+            WHERE plant_id = %s AND watered_at = %s;""",
+                        (plant_id, last_watered, plant_id, last_watered, soil_moisture,
+                         temperature, reading_taken, plant_id, last_watered))
 
             conn.commit()
 
@@ -82,11 +90,8 @@ def test_query_database():
     returning what is expected, i.e. entries older than 24 hours
     in order of newest to oldest."""
     test_data_returned = query_database(conn, True)
-    recording_ids = []
-    reading_taken = []
-    for test_data in test_data_returned:
-        recording_ids.append(test_data['recording_id'])
-        reading_taken.append(test_data['reading_taken'])
+    recording_ids = test_data_returned['recording_id']
+    reading_taken = test_data_returned['recording_taken']
 
     assert recording_ids == [2, 1]
     assert reading_taken[0] > reading_taken[1]
@@ -0,0 +1,60 @@
+"""Tests for the per-stage instrumentation of the mover."""
+from unittest.mock import patch, MagicMock
+import pytest
+from mover_instrumentation import (
+    reset, count, stage, summary, report, CallCounter, CountingConnection,
+    profile_invocation
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_stages():
+    """Each test starts with no recorded stages."""
+    reset()
+    yield
+    reset()
+
+
+def test_stage_records_counters():
+    """Counts made inside a stage are recorded against it."""
+    with stage("merge"):
+        count("rows", 100)
+        count("http_calls")
+
+    assert summary()[0]["stage"] == "merge"
+    assert summary()[0]["rows"] == 100
+    assert summary()[0]["http_calls"] == 1
+
+
+def test_counting_connection_and_client():
+    """Cursor queries count as DB calls and client calls as HTTP calls."""
+    connection = CountingConnection(MagicMock())
+    s3 = CallCounter(MagicMock(), "http_calls")
+
+    with stage("query"):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+            cursor.fetchall()
+        s3.upload_file("a.csv", "c14-gbu-storage", "a.csv")
+
+    assert summary()[0]["db_calls"] == 1
+    assert summary()[0]["http_calls"] == 1
+
+
+def test_report_prints_json_summary(capsys):
+    """The report prints a JSON summary line for metric filters."""
+    with stage("query"):
+        pass
+    report("mover")
+
+    assert 'STAGE_METRICS {"invocation": "mover"' in capsys.readouterr().out
+
+
+@patch.dict("mover_instrumentation.environ", {"PROFILE_INVOCATION": "1"}, clear=True)
+def test_profile_invocation_saves_files(tmp_path):
+    """With PROFILE_INVOCATION set, the profile files are written."""
+    with patch("mover_instrumentation.PROFILE_DIR", str(tmp_path)):
+        with profile_invocation("mover"):
+            sum(range(1000))
+
+    assert len(list(tmp_path.iterdir())) == 3
@@ -0,0 +1,29 @@
+"""Tests for the run lock shared with the ETL."""
+from unittest.mock import MagicMock
+from mover_run_lock import run_lock
+
+
+def test_run_lock_waits_with_timeout(capsys):
+    """The mover's lock request waits up to its timeout, and the
+    lock is released afterwards."""
+    connection = MagicMock()
+    connection.cursor.return_value.fetchone.return_value = {"lock_result": 1}
+
+    with run_lock(connection, "mover", 120) as acquired:
+        assert acquired
+
+    calls = connection.cursor.return_value.execute.call_args_list
+    assert calls[0].args[1] == ("delta.Recordings", 120000)
+    assert "sp_releaseapplock" in calls[1].args[0]
+    assert '"job": "mover"' in capsys.readouterr().out
+
+
+def test_run_lock_timed_out():
+    """A lock timeout tells the mover to skip its run."""
+    connection = MagicMock()
+    connection.cursor.return_value.fetchone.return_value = {"lock_result": -1}
+
+    with run_lock(connection, "mover", 120) as acquired:
+        assert not acquired
+
+    assert connection.cursor.return_value.execute.call_count == 1
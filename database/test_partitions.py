@@ -0,0 +1,77 @@
+"""Test file for the partitioned layout in partitions.py"""
+
+from datetime import date, datetime
+from unittest.mock import MagicMock
+import pytest
+from partitions import (partitioned_recordings_ddl, missing_boundaries,
+                        remove_recordings_before, add_boundaries)
+from reset_db import reset_db
+
+
+def make_connection(fetchone=None, fetchall=None) -> MagicMock:
+    """Returns a mock connection whose cursor returns the given rows."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = fetchone
+    cursor.fetchall.return_value = fetchall or []
+    return conn
+
+
+def executed(conn: MagicMock) -> list[str]:
+    """Returns the queries run on the mock connection."""
+    cursor = conn.cursor.return_value.__enter__.return_value
+    return [" ".join(call.args[0].split()) for call in cursor.execute.call_args_list]
+
+
+def test_partitioned_ddl_aligns_indexes():
+    """Tests the table and its indexes are all on the partition scheme."""
+    ddl = partitioned_recordings_ddl()
+
+    assert ddl.count("ON ps_recordings_reading_taken (reading_taken)") == 3
+    assert "PRIMARY KEY CLUSTERED (reading_taken, recording_id)" in ddl
+    assert "COLUMNSTORE" not in ddl
+    assert "COLUMNSTORE" in partitioned_recordings_ddl(columnstore=True)
+
+
+def test_missing_boundaries_from_yesterday():
+    """Tests boundaries are added from yesterday to days_ahead, skipping existing ones."""
+    boundaries = missing_boundaries([datetime(2024, 11, 28)], date(2024, 11, 28), 2)
+
+    assert boundaries == [datetime(2024, 11, 27), datetime(2024, 11, 29),
+                          datetime(2024, 11, 30)]
+
+
+def test_add_boundaries_splits_each_missing_day():
+    """Tests a split is run for each missing day."""
+    conn = make_connection(fetchall=[{'boundary': datetime(2024, 11, 27)}])
+
+    assert add_boundaries(conn, date(2024, 11, 28), 1) == 2
+    assert sum("SPLIT RANGE" in query for query in executed(conn)) == 2
+
+
+def test_remove_recordings_truncates_whole_partitions():
+    """Tests partitions before the cut-off are truncated, the rest deleted,
+    and the emptied boundaries merged, keeping the cut-off's own boundary."""
+    conn = make_connection(fetchone={'partition_number': 4}, fetchall=[
+        {'boundary': datetime(2024, 11, 25)}, {'boundary': datetime(2024, 11, 26)},
+        {'boundary': datetime(2024, 11, 27)}, {'boundary': datetime(2024, 11, 28)}])
+
+    assert remove_recordings_before(conn, datetime(2024, 11, 27, 13)) == 3
+    queries = executed(conn)
+    assert "TRUNCATE TABLE delta.Recordings WITH (PARTITIONS (1 TO 3));" in queries
+    assert any(query.startswith("DELETE FROM delta.Recordings") for query in queries)
+    assert sum("MERGE RANGE" in query for query in queries) == 2
+
+
+def test_remove_recordings_in_first_partition_only_deletes():
+    """Tests nothing is truncated when the cut-off is in the first partition."""
+    conn = make_connection(fetchone={'partition_number': 1})
+
+    assert remove_recordings_before(conn, datetime(2024, 11, 27, 13)) == 0
+    assert not any("TRUNCATE" in query for query in executed(conn))
+
+
+def test_reset_db_columnstore_needs_partitioning():
+    """Tests the columnstore index is only offered with the partitioned layout."""
+    with pytest.raises(ValueError):
+        reset_db(MagicMock(), columnstore=True)
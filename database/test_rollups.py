@@ -0,0 +1,73 @@
+"""Test file for the rollups built by rollups.py"""
+
+import pytest
+import pandas as pd
+from rollups import (make_rollup, replace_rollup_days, make_all_rollups,
+                     HOURLY_PLANT_ROLLUP, DAILY_PLANT_ROLLUP, HOURLY_CONTINENT_ROLLUP)
+
+
+@pytest.fixture(name='test_recordings')
+def test_recordings_df():
+    return pd.DataFrame({
+        'recording_id': [4, 3, 2, 1],
+        'plant_id': [10, 11, 10, 10],
+        'last_watered': ["2024-11-27 14:35:45"] * 4,
+        'soil_moisture': [40.0, 30.0, 20.0, 60.0],
+        'temperature': [20.0, 10.0, 22.0, 18.0],
+        'recording_taken': ["2024-11-28 13:59:00", "2024-11-28 13:10:00",
+                            "2024-11-28 13:05:00", "2024-11-28 12:59:00"]
+    })
+
+
+@pytest.fixture(name='test_continents')
+def test_continents_df():
+    return pd.DataFrame({'plant_id': [10, 11], 'continent_name': ['Europe', 'Asia']})
+
+
+def test_make_rollup_hourly(test_recordings):
+    """Tests readings are grouped per plant per hour."""
+    rollup_df = make_rollup(test_recordings, 'plant_id', 'h')
+    plant_10 = rollup_df[rollup_df['plant_id'] == 10].set_index('bucket_start')
+
+    one_pm = plant_10.loc[pd.Timestamp("2024-11-28 13:00:00")]
+    assert one_pm['reading_count'] == 2
+    assert one_pm['soil_moisture_mean'] == 30.0
+    assert one_pm['soil_moisture_min'] == 20.0
+    assert one_pm['temperature_max'] == 22.0
+    assert len(rollup_df) == 3
+
+
+def test_make_rollup_empty():
+    """Tests an empty batch makes an empty rollup with the expected columns."""
+    rollup_df = make_rollup(pd.DataFrame(columns=['plant_id', 'soil_moisture',
+                                                  'temperature', 'recording_taken']),
+                            'plant_id', 'D')
+
+    assert rollup_df.empty
+    assert 'soil_moisture_mean' in rollup_df.columns
+
+
+def test_replace_rollup_days_is_idempotent(test_recordings):
+    """Tests the rebuilt days replace the stored ones, so rebuilding a day
+    twice does not count its recordings twice."""
+    rollup_df = make_rollup(test_recordings, 'plant_id', 'h')
+    days = set(pd.to_datetime(test_recordings['recording_taken']).dt.floor('D'))
+
+    replaced_df = replace_rollup_days(rollup_df, rollup_df, days, 'plant_id')
+    replaced_df = replace_rollup_days(replaced_df, rollup_df, days, 'plant_id')
+
+    assert replaced_df['reading_count'].sum() == len(test_recordings)
+    replaced_df = replaced_df.sort_values(['plant_id', 'bucket_start']).reset_index(drop=True)
+    rollup_df = rollup_df.sort_values(['plant_id', 'bucket_start']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(replaced_df, rollup_df, check_dtype=False)
+
+
+def test_make_all_rollups(test_recordings, test_continents):
+    """Tests every rollup is produced, including per continent."""
+    rollups = make_all_rollups(test_recordings, test_continents)
+
+    assert set(rollups) == {HOURLY_PLANT_ROLLUP,
+                            DAILY_PLANT_ROLLUP, HOURLY_CONTINENT_ROLLUP}
+    assert set(rollups[HOURLY_CONTINENT_ROLLUP]['continent_name']) == {
+        'Europe', 'Asia'}
+    assert rollups[DAILY_PLANT_ROLLUP]['reading_count'].sum() == 4
@@ -0,0 +1,33 @@
+"""Tests for the retention tiers in tiering.py"""
+
+from datetime import datetime
+import pandas as pd
+from rollups import HOURLY_PLANT_ROLLUP, DAILY_PLANT_ROLLUP
+from tiering import retention_cutoff, warm_cutoff, expire_rollup
+
+
+NOW = datetime(2024, 11, 28, 12)
+
+
+def test_retention_cutoff_of_zero_keeps_forever():
+    """A retention of 0 days never expires anything."""
+    assert retention_cutoff(NOW, 0) is None
+    assert retention_cutoff(NOW, 2) == datetime(2024, 11, 26, 12)
+
+
+def test_warm_cutoff_starts_after_hot_tier():
+    """The warm tier's retention counts from the end of the hot tier."""
+    assert warm_cutoff(NOW, hot_hours=24, warm_days=7) == datetime(2024, 11, 20)
+    assert warm_cutoff(NOW, hot_hours=24, warm_days=0) is None
+
+
+def test_expire_rollup_per_tier():
+    """Hourly buckets past the hourly retention are dropped, while daily
+    buckets are kept forever by default."""
+    rollup_df = pd.DataFrame({
+        'plant_id': [1, 1],
+        'bucket_start': ["2024-11-27 00:00:00", "2022-01-01 00:00:00"],
+        'reading_count': [60, 60]})
+
+    assert len(expire_rollup(rollup_df, HOURLY_PLANT_ROLLUP, NOW)) == 1
+    assert len(expire_rollup(rollup_df, DAILY_PLANT_ROLLUP, NOW)) == 2
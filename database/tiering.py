@@ -0,0 +1,57 @@
+"""Retention tiers of the recordings, each configured on its own:
+
+- hot: raw recordings in delta.Recordings, for HOT_TIER_HOURS;
+- warm: raw recordings in the archive on the S3 bucket (the .csv and the
+  columnar .rec), for WARM_TIER_DAYS after they leave the RDS;
+- cold: only the rollups. Hourly rollups are kept for
+  COLD_HOURLY_RETENTION_DAYS and daily rollups for COLD_DAILY_RETENTION_DAYS.
+
+A retention of 0 days keeps a tier forever. Recordings are rolled up as they
+enter the warm tier, so recordings expiring from it are already summarised
+in the cold tier and are simply dropped when the mover rewrites the archive."""
+
+from os import environ
+from datetime import datetime, timedelta
+import pandas as pd
+from rollups import HOURLY_PLANT_ROLLUP, DAILY_PLANT_ROLLUP, HOURLY_CONTINENT_ROLLUP
+
+
+HOT_TIER_HOURS = int(environ.get("HOT_TIER_HOURS", "24"))
+WARM_TIER_DAYS = float(environ.get("WARM_TIER_DAYS", "90"))
+COLD_HOURLY_RETENTION_DAYS = float(environ.get("COLD_HOURLY_RETENTION_DAYS", "365"))
+COLD_DAILY_RETENTION_DAYS = float(environ.get("COLD_DAILY_RETENTION_DAYS", "0"))
+
+ROLLUP_RETENTION_DAYS = {
+    HOURLY_PLANT_ROLLUP: COLD_HOURLY_RETENTION_DAYS,
+    HOURLY_CONTINENT_ROLLUP: COLD_HOURLY_RETENTION_DAYS,
+    DAILY_PLANT_ROLLUP: COLD_DAILY_RETENTION_DAYS
+}
+
+
+def retention_cutoff(now: datetime, days: float) -> datetime:
+    """Returns the time before which data kept for days has expired,
+    or None if it is kept forever."""
+    if days <= 0:
+        return None
+    return now - timedelta(days=days)
+
+
+def warm_cutoff(now: datetime, hot_hours: int = HOT_TIER_HOURS,
+                warm_days: float = WARM_TIER_DAYS) -> datetime:
+    """Returns the time before which raw recordings are dropped from the
+    archive, or None if the archive keeps them forever. The warm tier
+    starts where the hot tier ends, rounded down to midnight so the archive
+    always holds whole days to rebuild the rollups from."""
+    cutoff = retention_cutoff(now - timedelta(hours=hot_hours), warm_days)
+    if cutoff is None:
+        return None
+    return cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def expire_rollup(rollup_df: pd.DataFrame, filename: str, now: datetime) -> pd.DataFrame:
+    """Returns the rollup without the buckets past its tier's retention."""
+    cutoff = retention_cutoff(now, ROLLUP_RETENTION_DAYS.get(filename, 0))
+    if cutoff is None:
+        return rollup_df
+
+    return rollup_df[pd.to_datetime(rollup_df['bucket_start']) >= cutoff]
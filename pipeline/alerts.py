@@ -0,0 +1,245 @@
+"""This is the alerting stage of the ETL pipeline.
+
+Each plant keeps a small row of rolling statistics (an exponentially weighted
+mean and variance per measurement, plus its previous reading), so every run
+checks the new readings in one vectorised pass without querying any history.
+The row also holds when each alert rule last fired for the plant, so an alert
+is not raised again on every reading while its condition lasts: it repeats
+only once the condition has cleared or ALERT_COOLDOWN_HOURS have passed.
+The statistics are stored in /tmp between runs, which a warm Lambda keeps;
+after a cold start they are rebuilt from the following readings."""
+from os import environ
+import logging
+import boto3
+import numpy as np
+import pandas as pd
+
+
+MEASUREMENTS = ["soil_moisture", "temperature"]
+
+ALERT_RULES = [(alert, measurement) for measurement in MEASUREMENTS
+               for alert in ("too_low", "too_high", "anomaly", "rapid_change")
+               ] + [("not_watered", "last_watered")]
+
+STATE_COLUMNS = ["plant_id", "reading_count", "last_reading"] + [
+    f"{measurement}_{stat}" for measurement in MEASUREMENTS
+    for stat in ("mean", "var", "last")] + [
+    f"{alert}_{measurement}_alerted" for alert, measurement in ALERT_RULES]
+
+ALERT_COLUMNS = ["plant_id", "recording_taken", "alert", "measurement", "value",
+                 "plant_name", "botanist_email"]
+
+ALERT_STATE_PATH = environ.get("ALERT_STATE_PATH", "/tmp/ALERT_STATE.csv")
+EWMA_ALPHA = float(environ.get("ALERT_EWMA_ALPHA", "0.1"))
+Z_SCORE_LIMIT = float(environ.get("ALERT_Z_SCORE_LIMIT", "4"))
+WARM_UP_READINGS = int(environ.get("ALERT_WARM_UP_READINGS", "10"))
+NOT_WATERED_HOURS = float(environ.get("ALERT_NOT_WATERED_HOURS", "24"))
+COOLDOWN_HOURS = float(environ.get("ALERT_COOLDOWN_HOURS", "24"))
+
+THRESHOLDS = {
+    "soil_moisture": (float(environ.get("ALERT_SOIL_MOISTURE_MIN", "15")),
+                      float(environ.get("ALERT_SOIL_MOISTURE_MAX", "100"))),
+    "temperature": (float(environ.get("ALERT_TEMPERATURE_MIN", "5")),
+                    float(environ.get("ALERT_TEMPERATURE_MAX", "35")))
+}
+
+MAX_CHANGE_PER_MINUTE = {
+    "soil_moisture": float(environ.get("ALERT_SOIL_MOISTURE_RATE", "10")),
+    "temperature": float(environ.get("ALERT_TEMPERATURE_RATE", "3"))
+}
+
+
+def empty_state() -> pd.DataFrame:
+    """Returns a state table with no plants in it."""
+    return pd.DataFrame(columns=STATE_COLUMNS).astype(float).astype({"plant_id": "int64"})
+
+
+def load_state(path: str = ALERT_STATE_PATH) -> pd.DataFrame:
+    """Returns the rolling statistics saved by the previous run,
+    or an empty table if there are none."""
+    try:
+        return pd.read_csv(path)[STATE_COLUMNS]
+    except (FileNotFoundError, KeyError, pd.errors.EmptyDataError):
+        logging.info("No alert state found, starting from empty statistics.")
+        return empty_state()
+
+
+def save_state(state_df: pd.DataFrame, path: str = ALERT_STATE_PATH) -> None:
+    """Saves the rolling statistics for the next run."""
+    state_df.to_csv(path, index=False)
+
+
+def prepare_readings(plant_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns one numeric reading per plant from the transformed plant data,
+    dropping plants that have no reading."""
+    readings_df = pd.DataFrame({
+        "plant_id": pd.to_numeric(plant_df["plant_id"], errors="coerce"),
+        "recording_taken": pd.to_datetime(
+            plant_df["recording_taken"], format="%Y-%m-%d %H:%M:%S", errors="coerce"),
+        "last_watered": pd.to_datetime(
+            plant_df["last_watered"], format="%a, %d %b %Y %H:%M:%S %Z",
+            errors="coerce").dt.tz_localize(None),
+        "plant_name": plant_df.get("name"),
+        "botanist_email": plant_df.get("botanist.email")
+    })
+
+    for measurement in MEASUREMENTS:
+        readings_df[measurement] = pd.to_numeric(plant_df[measurement], errors="coerce")
+
+    readings_df = readings_df.dropna(subset=["plant_id", "recording_taken"])
+    readings_df["plant_id"] = readings_df["plant_id"].astype("int64")
+    readings_df = readings_df.sort_values("recording_taken")
+
+    return readings_df.drop_duplicates("plant_id", keep="last")
+
+
+def epoch_seconds(timestamps: pd.Series) -> pd.Series:
+    """Returns timestamps as seconds since the epoch, NaN where missing."""
+    return (timestamps - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+
+def check_rules(merged_df: pd.DataFrame, reading_seconds: pd.Series) -> list[tuple]:
+    """Checks each reading against the thresholds, its plant's rolling
+    z-score and rate of change, and how long ago the plant was watered.
+    Returns an (alert, measurement, broken, value) tuple per alert rule."""
+    minutes_since = (reading_seconds - merged_df["last_reading"]) / 60
+
+    checks = []
+    for measurement in MEASUREMENTS:
+        values = merged_df[measurement]
+        low, high = THRESHOLDS[measurement]
+        checks.append(("too_low", measurement, values < low))
+        checks.append(("too_high", measurement, values > high))
+
+        spread = np.sqrt(merged_df[f"{measurement}_var"])
+        z_scores = (values - merged_df[f"{measurement}_mean"]) / spread.where(spread > 0)
+        checks.append(("anomaly", measurement,
+                       (merged_df["reading_count"] >= WARM_UP_READINGS)
+                       & (z_scores.abs() > Z_SCORE_LIMIT)))
+
+        change_rate = (values - merged_df[f"{measurement}_last"]) / minutes_since
+        checks.append(("rapid_change", measurement,
+                       (minutes_since > 0)
+                       & (change_rate.abs() > MAX_CHANGE_PER_MINUTE[measurement])))
+
+    hours_dry = (merged_df["recording_taken"]
+                 - merged_df["last_watered"]) / pd.Timedelta(hours=1)
+    checks.append(("not_watered", "last_watered", hours_dry > NOT_WATERED_HOURS))
+
+    return [(alert, measurement, broken.fillna(False).astype(bool),
+             hours_dry if measurement == "last_watered" else merged_df[measurement])
+            for alert, measurement, broken in checks]
+
+
+def is_repeat(merged_df: pd.DataFrame, reading_seconds: pd.Series,
+              alert: str, measurement: str) -> pd.Series:
+    """Returns whether the rule last fired for each plant within the cooldown
+    and has not cleared since."""
+    last_alerted = merged_df[f"{alert}_{measurement}_alerted"]
+    return (reading_seconds - last_alerted) < COOLDOWN_HOURS * 3600
+
+
+def find_alerts(readings_df: pd.DataFrame, state_df: pd.DataFrame) -> pd.DataFrame:
+    """Checks each new reading against the alert rules, leaving out repeats
+    of alerts already raised for the plant. Returns one row per alert raised."""
+    merged_df = readings_df.merge(state_df, on="plant_id", how="left")
+    reading_seconds = epoch_seconds(merged_df["recording_taken"])
+    is_new = ~(reading_seconds <= merged_df["last_reading"])
+
+    alerts = []
+    for alert, measurement, broken, value in check_rules(merged_df, reading_seconds):
+        raised = broken & is_new & ~is_repeat(merged_df, reading_seconds, alert, measurement)
+        if not raised.any():
+            continue
+        alert_df = merged_df.loc[raised, ["plant_id", "recording_taken",
+                                          "plant_name", "botanist_email"]]
+        alerts.append(alert_df.assign(alert=alert, measurement=measurement,
+                                      value=value[raised]))
+
+    if not alerts:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    return pd.concat(alerts, ignore_index=True)[ALERT_COLUMNS]
+
+
+def update_state(readings_df: pd.DataFrame, state_df: pd.DataFrame) -> pd.DataFrame:
+    """Folds each plant's new reading into its rolling statistics in O(1)
+    per plant, and records when each alert rule fired, or that it cleared.
+    Readings no newer than the plant's last one are ignored, so a repeated
+    reading is not counted twice."""
+    merged_df = readings_df.merge(state_df, on="plant_id", how="outer")
+    reading_seconds = epoch_seconds(merged_df["recording_taken"])
+    is_new = merged_df["recording_taken"].notna() & ~(
+        reading_seconds <= merged_df["last_reading"])
+
+    # Checked before the statistics below take in the new readings,
+    # the same way find_alerts checks them.
+    for alert, measurement, broken, _ in check_rules(merged_df, reading_seconds):
+        alerted = f"{alert}_{measurement}_alerted"
+        raised = broken & is_new & ~is_repeat(merged_df, reading_seconds, alert, measurement)
+        merged_df[alerted] = np.select(
+            [raised, is_new & ~broken], [reading_seconds, np.nan], merged_df[alerted])
+
+    for measurement in MEASUREMENTS:
+        values = merged_df[measurement]
+        mean, var = merged_df[f"{measurement}_mean"], merged_df[f"{measurement}_var"]
+        has_value = is_new & values.notna()
+
+        diff = values - mean
+        new_mean = mean + EWMA_ALPHA * diff
+        new_var = (1 - EWMA_ALPHA) * (var + EWMA_ALPHA * diff ** 2)
+        first_value = has_value & mean.isna()
+
+        merged_df[f"{measurement}_mean"] = np.select(
+            [first_value, has_value], [values, new_mean], mean)
+        merged_df[f"{measurement}_var"] = np.select(
+            [first_value, has_value], [0.0, new_var], var)
+        merged_df[f"{measurement}_last"] = values.where(
+            has_value, merged_df[f"{measurement}_last"])
+
+    merged_df["reading_count"] = merged_df["reading_count"].fillna(0) + is_new
+    merged_df["last_reading"] = reading_seconds.where(is_new, merged_df["last_reading"])
+
+    return merged_df[STATE_COLUMNS].sort_values("plant_id", ignore_index=True)
+
+
+def publish_alerts(alerts_df: pd.DataFrame) -> None:
+    """Logs each alert and, if ALERT_TOPIC_ARN is set, publishes them
+    to that SNS topic as one message."""
+    for alert in alerts_df.itertuples():
+        logging.warning("Alert %s for plant %s (%s): %s = %s, botanist %s",
+                        alert.alert, alert.plant_id, alert.plant_name,
+                        alert.measurement, alert.value, alert.botanist_email)
+
+    topic_arn = environ.get("ALERT_TOPIC_ARN")
+    if alerts_df.empty or not topic_arn:
+        return
+
+    sns = boto3.client("sns")
+    sns.publish(TopicArn=topic_arn,
+                Subject=f"{len(alerts_df)} plant alerts",
+                Message=alerts_df.to_string(index=False))
+    logging.info("Published %s alerts to %s.", len(alerts_df), topic_arn)
+
+
+def check_for_alerts(plant_df: pd.DataFrame = None) -> pd.DataFrame:
+    """Checks the latest transformed plant data for alerts, publishes them
+    and saves the updated rolling statistics. Returns the alerts raised."""
+    if plant_df is None:
+        plant_df = pd.read_csv("/tmp/PLANT_DATA.csv")
+
+    readings_df = prepare_readings(plant_df)
+    state_df = load_state()
+
+    alerts_df = find_alerts(readings_df, state_df)
+    save_state(update_state(readings_df, state_df))
+    publish_alerts(alerts_df)
+
+    logging.info("Checked %s readings, %s alerts raised.",
+                 len(readings_df), len(alerts_df))
+
+    return alerts_df
+
+
+if __name__ == "__main__":
+    pass
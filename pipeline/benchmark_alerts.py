@@ -0,0 +1,59 @@
+"""Benchmarks the alerting stage on synthetic per-minute streams, timing the
+alert checks and state update for one run at increasing numbers of plants.
+
+Run with: python benchmark_alerts.py"""
+
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from alerts import empty_state, prepare_readings, find_alerts, update_state
+
+
+PLANT_COUNTS = [50, 1000, 10000, 100000]
+MINUTES = 30
+
+
+def make_minute(plant_count: int, minute: pd.Timestamp,
+                rng: np.random.Generator) -> pd.DataFrame:
+    """Makes one minute of transformed plant data for every plant, with a
+    few readings pushed out of their usual range."""
+    soil_moisture = rng.normal(50, 2, plant_count)
+    spikes = rng.random(plant_count) < 0.001
+    soil_moisture[spikes] -= 40
+
+    return pd.DataFrame({
+        "plant_id": np.arange(1, plant_count + 1),
+        "name": "Asclepias Curassavica",
+        "botanist.email": "gertrude.jekyll@lnhm.co.uk",
+        "soil_moisture": soil_moisture,
+        "temperature": rng.normal(20, 0.5, plant_count),
+        "recording_taken": minute.strftime("%Y-%m-%d %H:%M:%S"),
+        "last_watered": "Wed, 27 Nov 2024 13:37:24 GMT"
+    })
+
+
+def run_benchmark() -> None:
+    """Prints the mean time per run and the alerts raised for each stream."""
+    print(f"{'plants':>8}{'ms per run':>12}{'readings/s':>14}{'alerts':>9}")
+
+    rng = np.random.default_rng(0)
+    minutes = pd.date_range("2024-11-27 14:00", periods=MINUTES, freq="min")
+
+    for plant_count in PLANT_COUNTS:
+        plant_dfs = [make_minute(plant_count, minute, rng) for minute in minutes]
+        state_df = empty_state()
+        alert_count = 0
+
+        start = perf_counter()
+        for plant_df in plant_dfs:
+            readings_df = prepare_readings(plant_df)
+            alert_count += len(find_alerts(readings_df, state_df))
+            state_df = update_state(readings_df, state_df)
+        per_run = (perf_counter() - start) / MINUTES
+
+        print(f"{plant_count:>8}{per_run * 1000:>12.1f}"
+              f"{plant_count / per_run:>14.0f}{alert_count:>9}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,51 @@
+"""This is the carry-over queue of the ETL pipeline.
+
+When a run reaches its deadline, the plants it did not fetch and the plant
+data it fetched but could not load are saved here, and the next run handles
+them first. The queue is a small JSON file in /tmp, which a warm Lambda and
+the long-running service both keep between runs."""
+from os import environ
+import json
+import logging
+
+
+CARRY_OVER_PATH = environ.get("CARRY_OVER_PATH", "/tmp/CARRY_OVER.json")
+MAX_CARRIED_READINGS = int(environ.get("MAX_CARRIED_READINGS", "500"))
+
+
+def load_carry_over(path: str = CARRY_OVER_PATH) -> tuple[list[int], list[dict]]:
+    """Returns the plant ids and the unloaded plant data carried over
+    from the previous run, or empty lists if there are none."""
+    try:
+        with open(path, encoding="utf-8") as carry_over_file:
+            carry_over = json.load(carry_over_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return [], []
+
+    return carry_over.get("plant_ids", []), carry_over.get("plant_data", [])
+
+
+def save_carry_over(plant_ids: list[int], plant_data: list[dict],
+                    path: str = CARRY_OVER_PATH) -> None:
+    """Saves the plant ids and plant data left for the next run. Only the
+    newest MAX_CARRIED_READINGS plant readings are kept, so a run of missed
+    deadlines cannot grow the queue without limit."""
+    if len(plant_data) > MAX_CARRIED_READINGS:
+        logging.warning("Dropping %s carried over readings beyond the limit of %s.",
+                        len(plant_data) - MAX_CARRIED_READINGS, MAX_CARRIED_READINGS)
+        plant_data = plant_data[-MAX_CARRIED_READINGS:]
+
+    with open(path, "w", encoding="utf-8") as carry_over_file:
+        json.dump({"plant_ids": plant_ids, "plant_data": plant_data}, carry_over_file)
+
+    if plant_ids or plant_data:
+        logging.info("Carried over %s plants to fetch and %s readings to load.",
+                     len(plant_ids), len(plant_data))
+
+
+def order_plant_ids(plant_ids: list[int], carried_ids: list[int]) -> list[int]:
+    """Returns every plant id, with those carried over from the previous run
+    first, so a plant that was left behind is not left behind again."""
+    carried = set(carried_ids)
+    return list(carried_ids) + [plant_id for plant_id in plant_ids
+                                if plant_id not in carried]
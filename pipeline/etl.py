@@ -1,17 +1,93 @@
 """This is the full ETL script to be hosted on the lambda"""
-from extract import get_all_plant_data
+from os import environ
+from time import monotonic
+import logging
+from extract import PLANT_IDS, get_plant_data_until
 from transform import fully_transform_data
-from load import load_data_into_database
+from alerts import check_for_alerts
+from load import load_data_into_database, get_connection
+from etl_run_lock import run_lock
+from carry_over import load_carry_over, save_carry_over, order_plant_ids
+from etl_instrumentation import reset, stage, count, report, profile_invocation
 from dotenv import load_dotenv
 
 
-def run_etl():
-    """Runs the entire ETL pipeline in sequence"""
+TIME_BUDGET_SECONDS = float(environ.get("ETL_TIME_BUDGET_SECONDS", "50"))
+LOAD_RESERVE_SECONDS = float(environ.get("ETL_LOAD_RESERVE_SECONDS", "15"))
+LAMBDA_SAFETY_SECONDS = 5
+
+
+def run_deadline(context=None) -> float:
+    """Returns the time.monotonic deadline of a run starting now: the time
+    budget, cut short if the Lambda has less time than that remaining"""
+    budget = TIME_BUDGET_SECONDS
+    if context is not None:
+        budget = min(budget, context.get_remaining_time_in_millis() / 1000
+                     - LAMBDA_SAFETY_SECONDS)
+    return monotonic() + budget
+
+
+def run_etl(session=None, connection=None, dimension_cache: set = None,
+            deadline: float = None):
+    """Runs the entire ETL pipeline in sequence under the run lock,
+    skipping the run if another job holds it.
+    The service passes its persistent HTTP session,
+    DB connection and dimension cache"""
     load_dotenv()
-    plant_data = get_all_plant_data()
-    fully_transform_data(plant_data)
-    load_data_into_database()
+    reset()
+    deadline = deadline or run_deadline()
+    own_connection = connection is None
+    connection = connection or get_connection()
+
+    try:
+        with run_lock(connection, "etl") as acquired:
+            if acquired:
+                run_stages(session, connection, dimension_cache, deadline)
+    finally:
+        if own_connection:
+            connection.close()
+
+    report("etl")
+
+
+def run_stages(session, connection, dimension_cache: set, deadline: float):
+    """Runs each stage of the ETL, timing and counting its work.
+    Work left when the deadline passes is carried over to the next run,
+    which handles it first. The fetched plant data stays in the queue until
+    it is loaded, so a failed load does not lose it"""
+    carried_ids, carried_data = load_carry_over()
+
+    with profile_invocation("etl"):
+        with stage("extract"):
+            plant_data, unfetched_ids = get_plant_data_until(
+                order_plant_ids(PLANT_IDS, carried_ids),
+                deadline - LOAD_RESERVE_SECONDS, session)
+            plant_data = carried_data + plant_data
+            count("rows", len(plant_data))
+
+        if not plant_data:
+            save_carry_over(unfetched_ids, [])
+            return
+
+        with stage("transform"):
+            fully_transform_data(plant_data)
+            count("rows", len(plant_data))
+
+        save_carry_over(unfetched_ids, plant_data)
+
+        with stage("alerts"):
+            count("rows", len(check_for_alerts()))
+
+        if monotonic() >= deadline:
+            logging.warning("Deadline passed before loading, carrying over %s readings.",
+                            len(plant_data))
+            return
+
+        with stage("load"):
+            load_data_into_database(connection, dimension_cache)
+            count("rows", len(plant_data))
+        save_carry_over(unfetched_ids, [])
 
 
 def lambda_handler(event=None, context=None):
-    run_etl()
+    run_etl(deadline=run_deadline(context))
@@ -0,0 +1,181 @@
+"""Per-stage timing and profiling for the ETL Lambda.
+
+Each stage of an invocation is timed with the stage context manager, and
+database calls, HTTP calls and rows are counted against the stage running at
+the time. report logs one line per stage and a JSON summary that CloudWatch
+metric filters can read.
+
+Setting PROFILE_INVOCATION to 1 also captures a cProfile and a tracemalloc
+snapshot of the invocation to /tmp, and uploads them to the PROFILE_S3_BUCKET
+bucket if one is set, so hot spots can be found without redeploying."""
+from os import environ, path
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+import cProfile
+import json
+import logging
+import threading
+import tracemalloc
+import boto3
+
+
+COUNTERS = ["db_calls", "http_calls", "rows"]
+DB_METHODS = {"execute", "executemany", "callproc"}
+PROFILE_DIR = environ.get("PROFILE_DIR", "/tmp")
+TOP_ALLOCATIONS = 25
+
+_stages = []
+_current = {}
+_counter_lock = threading.Lock()
+
+
+def reset() -> None:
+    """Clears the stages recorded by a previous invocation,
+    as a warm Lambda keeps module state between invocations."""
+    _stages.clear()
+    _current.clear()
+
+
+def count(counter: str, amount: int = 1) -> None:
+    """Adds to a counter of the stage that is running, if there is one.
+    Stages may count from several threads, such as the extract's requests."""
+    with _counter_lock:
+        if _current:
+            _current[counter] = _current.get(counter, 0) + amount
+
+
+def gauge(name: str, value: float) -> None:
+    """Records a value, such as a limit, on the stage that is running."""
+    with _counter_lock:
+        if _current:
+            _current[name] = value
+
+
+@contextmanager
+def stage(name: str):
+    """Times the code inside it as one stage, recording its counters."""
+    outer = dict(_current)
+    _current.clear()
+    _current.update({"stage": name, **{counter: 0 for counter in COUNTERS}})
+    start = perf_counter()
+
+    try:
+        yield
+    finally:
+        record = {**_current, "seconds": round(perf_counter() - start, 4)}
+        _stages.append(record)
+        _current.clear()
+        _current.update(outer)
+
+
+def summary() -> list[dict]:
+    """Returns the stages recorded so far in this invocation."""
+    return list(_stages)
+
+
+def report(name: str) -> None:
+    """Logs the time and counters of each stage of the invocation."""
+    for record in _stages:
+        logging.info("Stage %s took %.3fs: %s DB calls, %s HTTP calls, %s rows.",
+                     record["stage"], record["seconds"], record["db_calls"],
+                     record["http_calls"], record["rows"])
+
+    logging.info("STAGE_METRICS %s", json.dumps({"invocation": name, "stages": _stages}))
+
+
+class CallCounter:
+    """Wraps an object, counting calls to its methods (or only the named
+    ones) against the running stage under the given counter."""
+
+    def __init__(self, target, counter: str, methods: set = None):
+        self._target = target
+        self._counter = counter
+        self._methods = methods
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+
+        if not callable(attribute) or (self._methods is not None
+                                       and name not in self._methods):
+            return attribute
+
+        @wraps(attribute)
+        def counted(*args, **kwargs):
+            count(self._counter)
+            return attribute(*args, **kwargs)
+
+        return counted
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self._target.__exit__(*args)
+
+
+class CountingConnection(CallCounter):
+    """Wraps a database connection so its cursors count their queries."""
+
+    def __init__(self, connection):
+        super().__init__(connection, "db_calls", set())
+
+    def cursor(self, *args, **kwargs) -> CallCounter:
+        """Returns a cursor that counts each query as a DB call."""
+        return CallCounter(self._target.cursor(*args, **kwargs), "db_calls", DB_METHODS)
+
+
+def save_profile(name: str, profiler: cProfile.Profile,
+                 snapshot: tracemalloc.Snapshot) -> list[str]:
+    """Writes the cProfile stats, the top allocations and the stage summary
+    of an invocation to the profile folder. Returns the written paths."""
+    prefix = path.join(PROFILE_DIR, f"{name}_{datetime.now():%Y%m%d_%H%M%S}")
+
+    profiler.dump_stats(f"{prefix}.prof")
+
+    with open(f"{prefix}_memory.txt", "w", encoding="utf-8") as memory_file:
+        for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            memory_file.write(f"{statistic}\n")
+
+    with open(f"{prefix}_stages.json", "w", encoding="utf-8") as stages_file:
+        json.dump(_stages, stages_file, indent=2)
+
+    return [f"{prefix}.prof", f"{prefix}_memory.txt", f"{prefix}_stages.json"]
+
+
+def upload_profile(paths: list[str]) -> None:
+    """Uploads profile files to PROFILE_S3_BUCKET, if it is set."""
+    bucket = environ.get("PROFILE_S3_BUCKET")
+    if not bucket:
+        return
+
+    s3 = boto3.client("s3")
+    for profile_path in paths:
+        s3.upload_file(profile_path, bucket, f"profiles/{path.basename(profile_path)}")
+    logging.info("Uploaded %s profile files to %s.", len(paths), bucket)
+
+
+@contextmanager
+def profile_invocation(name: str):
+    """Profiles the code inside it with cProfile and tracemalloc when
+    PROFILE_INVOCATION is set to 1, and does nothing otherwise."""
+    if environ.get("PROFILE_INVOCATION") != "1":
+        yield
+        return
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        paths = save_profile(name, profiler, snapshot)
+        logging.info("Saved profile of %s to %s.", name, paths[0])
+        upload_profile(paths)
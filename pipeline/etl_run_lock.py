@@ -0,0 +1,90 @@
+"""This is the run lock shared by the ETL and the mover.
+
+Both jobs write to delta.Recordings, so each holds an exclusive SQL Server
+application lock on it while it works. The lock is owned by the database
+session, so it is released when the job finishes or, if the job dies, when
+its connection closes. An ETL run that finds the lock taken skips at once,
+as the next run will fetch the latest readings anyway. The mover and the
+backfill wait for a running job to finish, and skip if it does not finish
+in time.
+
+Every attempt logs a RUN_LOCK JSON line for CloudWatch metric filters, and
+if METRICS_NAMESPACE is set a ContendedRuns metric is also published.
+
+database/mover_run_lock.py is the same lock for the other deployable. Keep the
+two in step: they only differ in how they report, as this one logs its output."""
+from os import environ
+from contextlib import contextmanager
+from time import monotonic
+import json
+import logging
+import boto3
+
+
+LOCK_RESOURCE = "delta.Recordings"
+
+
+def fetch_value(cursor):
+    """Returns the first value of the next row, whichever row type the
+    connection returns."""
+    row = cursor.fetchone()
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+def acquire_run_lock(connection, timeout_seconds: float = 0) -> bool:
+    """Tries to take the run lock, waiting up to timeout_seconds.
+    Returns whether it was taken."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        DECLARE @lock_result INT;
+        EXEC @lock_result = sp_getapplock @Resource = %s, @LockMode = 'Exclusive',
+            @LockOwner = 'Session', @LockTimeout = %s;
+        SELECT @lock_result AS lock_result;
+    """, (LOCK_RESOURCE, int(timeout_seconds * 1000)))
+
+    return fetch_value(cursor) >= 0
+
+
+def release_run_lock(connection) -> None:
+    """Releases the run lock held by this connection."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        EXEC sp_releaseapplock @Resource = %s, @LockOwner = 'Session';
+    """, (LOCK_RESOURCE,))
+
+
+def record_lock_attempt(job: str, acquired: bool, waited: float) -> None:
+    """Logs the outcome of a lock attempt, publishing a ContendedRuns
+    metric if METRICS_NAMESPACE is set."""
+    logging.info("RUN_LOCK %s", json.dumps({"job": job, "acquired": acquired,
+                                             "waited_seconds": round(waited, 3)}))
+
+    namespace = environ.get("METRICS_NAMESPACE")
+    if not namespace:
+        return
+
+    boto3.client("cloudwatch").put_metric_data(
+        Namespace=namespace,
+        MetricData=[{"MetricName": "ContendedRuns",
+                     "Dimensions": [{"Name": "Job", "Value": job}],
+                     "Value": 0 if acquired else 1, "Unit": "Count"}])
+
+
+@contextmanager
+def run_lock(connection, job: str, timeout_seconds: float = 0):
+    """Holds the run lock for the code inside it, yielding whether it was
+    taken. When it was not, the caller should skip its work."""
+    start = monotonic()
+    acquired = acquire_run_lock(connection, timeout_seconds)
+    record_lock_attempt(job, acquired, monotonic() - start)
+
+    if not acquired:
+        logging.warning("Run lock on %s is held by another job, %s skipped.",
+                        LOCK_RESOURCE, job)
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        release_run_lock(connection)
@@ -1,6 +1,20 @@
 """This is the script for the Extract portion of the ETL pipeline."""
+from os import environ
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 import requests
 import logging
+from etl_instrumentation import count
+from rate_control import AdaptiveLimiter, parse_retry_after, report_limit
+
+
+PLANT_IDS = list(range(0, 51))
+REQUEST_TIMEOUT = 100
+SLOW_PLANT_TIMEOUT = float(environ.get("PLANT_REQUEST_TIMEOUT", "10"))
+OVERLOADED_STATUSES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 3
+
+API_LIMITER = AdaptiveLimiter()
 
 
 def config_log() -> None:
@@ -13,25 +27,95 @@ def config_log() -> None:
     )
 
 
-def fetch_api_plant_data(plant_id: int) -> dict:
+def fetch_api_plant_data(plant_id: int, session: requests.Session = None,
+                         timeout: float = REQUEST_TIMEOUT) -> dict:
     """Gets plant data for a plant with given id,
-    returning the data as a dictionary."""
-    response = requests.get(
-        f"https://data-eng-plants-api.herokuapp.com/plants/{str(plant_id)}", timeout=100)
+    returning the data as a dictionary. A session keeps
+    the connection to the API open between requests.
+    Raises an HTTPError if the API is rate limiting or failing."""
+    count("http_calls")
+    response = (session or requests).get(
+        f"https://data-eng-plants-api.herokuapp.com/plants/{str(plant_id)}", timeout=timeout)
+    if response.status_code in OVERLOADED_STATUSES:
+        raise requests.exceptions.HTTPError(
+            f"Plant API returned {response.status_code} for plant id {plant_id}.",
+            response=response)
     logging.info("Gathering Data for plant id %s.", plant_id)
     return response.json()
 
 
-def get_all_plant_data() -> list[dict]:
-    """Returns all plant data for all 50 plants as
-    a list of dictionaries."""
+def fetch_with_limiter(plant_id: int, limiter: AdaptiveLimiter, deadline: float,
+                       session: requests.Session = None) -> dict:
+    """Fetches a plant once the limiter has a free request slot, retrying
+    up to MAX_ATTEMPTS times when the API is rate limiting or failing.
+    Every attempt frees its slot, whatever it raises. Returns None if the
+    plant could not be fetched before the deadline, or failed otherwise."""
+    for _ in range(MAX_ATTEMPTS):
+        if not limiter.acquire(deadline):
+            return None
+
+        started = monotonic()
+        try:
+            plant_data = fetch_api_plant_data(
+                plant_id, session, min(SLOW_PLANT_TIMEOUT, deadline - started))
+        except requests.exceptions.HTTPError as error:
+            limiter.release(started, overloaded=True, retry_after=parse_retry_after(
+                error.response.headers.get("Retry-After")))
+            logging.warning("Plant API overloaded (%s) fetching plant id %s.",
+                            error.response.status_code, plant_id)
+            continue
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            limiter.release(started, overloaded=True)
+            logging.warning("Plant id %s did not respond in time, carrying it over.",
+                            plant_id)
+            return None
+        except Exception:  # pylint: disable=broad-exception-caught
+            limiter.release(started)
+            logging.exception("Fetching plant id %s failed, carrying it over.", plant_id)
+            return None
+
+        limiter.release(started)
+        return plant_data
+
+    return None
+
+
+def get_plant_data_until(plant_ids: list[int], deadline: float,
+                         session: requests.Session = None,
+                         limiter: AdaptiveLimiter = None) -> tuple[list[dict], list[int]]:
+    """Fetches the given plants in parallel until the deadline (a time.monotonic
+    value) passes, keeping as many requests in flight as the limiter allows.
+    Each request may take at most PLANT_REQUEST_TIMEOUT seconds, or the
+    time left if that is shorter, so one slow plant cannot use up the run.
+    Returns the plant data gathered, in the order of plant_ids, and the ids
+    of the plants not fetched, including any whose request timed out,
+    failed to connect or was rate limited on every attempt."""
     config_log()
+    limiter = limiter or API_LIMITER
     data_list = []
-    for i in range(0, 51):
-        plant_data = fetch_api_plant_data(i)
-        if "error" in plant_data.keys():
-            continue
-        data_list.append(plant_data)
+    unfetched_ids = []
+
+    with ThreadPoolExecutor(max_workers=limiter.maximum) as executor:
+        results = executor.map(
+            lambda plant_id: fetch_with_limiter(plant_id, limiter, deadline, session),
+            plant_ids)
+
+        for plant_id, plant_data in zip(plant_ids, results):
+            if plant_data is None:
+                unfetched_ids.append(plant_id)
+            elif "error" not in plant_data.keys():
+                data_list.append(plant_data)
+
+    report_limit(limiter)
+    logging.info("Gathered %s plants, %s left for the next run.",
+                 len(data_list), len(unfetched_ids))
+    return data_list, unfetched_ids
+
+
+def get_all_plant_data(session: requests.Session = None) -> list[dict]:
+    """Returns all plant data for all 50 plants as
+    a list of dictionaries."""
+    data_list, _ = get_plant_data_until(PLANT_IDS, monotonic() + REQUEST_TIMEOUT, session)
     logging.info("All plant information gathered.")
     return data_list
 
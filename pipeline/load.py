@@ -5,6 +5,12 @@ import logging
 import pandas as pd
 import pymssql
 from dotenv import load_dotenv
+from etl_instrumentation import CountingConnection
+
+
+DIMENSION_COLUMNS = ["plant_id", "name", "scientific_name", "images.original_url",
+                     "First Name", "Last Name", "botanist.email", "botanist.phone",
+                     "Latitude", "Longitude", "Town", "Country_Code", "Continent", "City"]
 
 
 def config_log() -> None:
@@ -259,8 +265,35 @@ def insert_plants(cursor, plant_df: pd.DataFrame) -> None:
             )
 
 
+def find_watering_event_id(cursor, plant_id: int, watered_datetime: datetime) -> int:
+    """Returns the id of the plant's watering event at watered_datetime.
+    last_watered only changes when a plant is watered, so a new event is
+    only inserted when it differs from every event already stored."""
+    cursor.execute("""
+        SELECT watering_event_id
+        FROM delta.Watering_Events
+        WHERE plant_id = %s AND watered_at = %s;
+    """, (plant_id, watered_datetime))
+
+    event = cursor.fetchone()
+
+    if event:
+        return event[0]
+
+    cursor.execute("""
+        INSERT INTO delta.Watering_Events (plant_id, watered_at)
+        OUTPUT INSERTED.watering_event_id
+        VALUES (%s, %s);
+    """, (plant_id, watered_datetime))
+    logging.info("Inserted watering event: (Plant ID: %s, Watered At: %s)",
+                 plant_id, watered_datetime)
+
+    return cursor.fetchone()[0]
+
+
 def insert_recording(cursor,  plant_df: pd.DataFrame) -> None:
-    """Inserts a recording of plant status into the database."""
+    """Inserts a recording of plant status into the database,
+    referencing the watering event of its last_watered time."""
     for _, row in plant_df.iterrows():
         plant_id = row["plant_id"]
         last_watered = row["last_watered"]
@@ -274,20 +307,22 @@ def insert_recording(cursor,  plant_df: pd.DataFrame) -> None:
         recording_datetime = datetime.strptime(
             reading_taken, "%Y-%m-%d %H:%M:%S")
 
+        watering_event_id = find_watering_event_id(cursor, plant_id, watered_datetime)
+
         cursor.execute("""
             SELECT COUNT(*)
             FROM delta.Recordings
-            WHERE plant_id = %s AND last_watered = %s AND soil_moisture = %s AND temperature = %s
-                    AND reading_taken = %s;
-        """, (plant_id, watered_datetime, soil_moisture, temperature, recording_datetime))
+            WHERE plant_id = %s AND watering_event_id = %s AND soil_moisture = %s
+                    AND temperature = %s AND reading_taken = %s;
+        """, (plant_id, watering_event_id, soil_moisture, temperature, recording_datetime))
 
         count = cursor.fetchone()[0]
 
         if not count:
-            insert_query = """INSERT INTO delta.Recordings (plant_id, last_watered,
+            insert_query = """INSERT INTO delta.Recordings (plant_id, watering_event_id,
                        soil_moisture, temperature, reading_taken)
                        VALUES (%s, %s, %s, %s, %s);"""
-            cursor.execute(insert_query, (plant_id, watered_datetime,
+            cursor.execute(insert_query, (plant_id, watering_event_id,
                            soil_moisture, temperature, reading_taken))
             logging.info(
                 """Inserted recording: (Plant ID: %s, Last Watered: %s, 
@@ -303,6 +338,83 @@ def insert_recording(cursor,  plant_df: pd.DataFrame) -> None:
             )
 
 
+def update_continent_hourly_moisture(cursor, plant_df: pd.DataFrame) -> None:
+    """Recomputes the hourly soil moisture summary per continent for every hour
+    touched by this batch of recordings, so the dashboard can read hot data
+    as a few hundred pre-aggregated rows."""
+    if plant_df.empty:
+        return
+
+    earliest_hour = pd.to_datetime(
+        plant_df["recording_taken"]).min().floor("h").to_pydatetime()
+
+    cursor.execute("""
+        MERGE delta.Continent_Hourly_Moisture AS summary
+        USING (
+            SELECT loc.continent_id,
+                DATEADD(HOUR, DATEDIFF(HOUR, 0, rec.reading_taken), 0) AS hour_start,
+                COUNT(*) AS reading_count,
+                SUM(rec.soil_moisture) AS total_soil_moisture
+            FROM delta.Recordings AS rec
+            JOIN delta.Plants AS plants ON rec.plant_id = plants.plant_id
+            JOIN delta.Locations AS loc ON plants.location_id = loc.location_id
+            WHERE rec.reading_taken >= %s
+            GROUP BY loc.continent_id, DATEADD(HOUR, DATEDIFF(HOUR, 0, rec.reading_taken), 0)
+        ) AS hourly
+        ON summary.continent_id = hourly.continent_id AND summary.hour_start = hourly.hour_start
+        WHEN MATCHED THEN
+            UPDATE SET reading_count = hourly.reading_count,
+                total_soil_moisture = hourly.total_soil_moisture
+        WHEN NOT MATCHED THEN
+            INSERT (continent_id, hour_start, reading_count, total_soil_moisture)
+            VALUES (hourly.continent_id, hourly.hour_start,
+                hourly.reading_count, hourly.total_soil_moisture);
+    """, (earliest_hour,))
+    logging.info("Updated continent hourly moisture summary from %s.", earliest_hour)
+
+
+def upsert_current_state(cursor, plant_df: pd.DataFrame) -> None:
+    """Keeps one row per plant in delta.Plant_Current_State holding its
+    latest reading, last watered time, botanist and location, so live
+    views can read the current state without aggregating the history."""
+    for _, row in plant_df.iterrows():
+        if pd.isna(row["plant_id"]):
+            continue
+
+        watered_datetime = datetime.strptime(
+            row["last_watered"], "%a, %d %b %Y %H:%M:%S %Z")
+        recording_datetime = datetime.strptime(
+            row["recording_taken"], "%Y-%m-%d %H:%M:%S")
+
+        cursor.execute("""
+            MERGE delta.Plant_Current_State AS state
+            USING (
+                SELECT plants.plant_id, %s AS soil_moisture, %s AS temperature,
+                    %s AS last_watered, %s AS reading_taken, plants.location_id,
+                    (SELECT botanist_id FROM delta.Botanists WHERE email = %s) AS botanist_id
+                FROM delta.Plants AS plants
+                WHERE plants.plant_id = %s
+            ) AS latest
+            ON state.plant_id = latest.plant_id
+            WHEN MATCHED AND latest.reading_taken >= state.reading_taken THEN
+                UPDATE SET soil_moisture = latest.soil_moisture,
+                    temperature = latest.temperature,
+                    last_watered = latest.last_watered,
+                    reading_taken = latest.reading_taken,
+                    botanist_id = latest.botanist_id,
+                    location_id = latest.location_id
+            WHEN NOT MATCHED THEN
+                INSERT (plant_id, soil_moisture, temperature, last_watered,
+                    reading_taken, botanist_id, location_id)
+                VALUES (latest.plant_id, latest.soil_moisture, latest.temperature,
+                    latest.last_watered, latest.reading_taken,
+                    latest.botanist_id, latest.location_id);
+        """, (row["soil_moisture"], row["temperature"], watered_datetime,
+              recording_datetime, row["botanist.email"], row["plant_id"]))
+
+    logging.info("Updated current state of %s plants.", len(plant_df))
+
+
 def insert_assignments(cursor, plant_df: pd.DataFrame) -> None:
     """Inserts the Botanist/Plant Assignment into the database."""
     for _, row in plant_df.iterrows():
@@ -366,21 +478,43 @@ def insert_assignments(cursor, plant_df: pd.DataFrame) -> None:
         )
 
 
-def load_data_into_database() -> None:
-    """Loads data from the PLANT_DATA.csv into the database"""
-    connection = get_connection()
+def dimension_keys(plant_df: pd.DataFrame) -> pd.Series:
+    """Returns a key per row made of its botanist, scientific name,
+    location, plant and assignment details."""
+    return pd.Series(list(plant_df[DIMENSION_COLUMNS].astype(str).itertuples(
+        index=False, name=None)), index=plant_df.index, dtype=object)
+
+
+def load_data_into_database(connection: pymssql.Connection = None,
+                            dimension_cache: set = None) -> None:
+    """Loads data from the PLANT_DATA.csv into the database.
+    A long-running service passes its open connection and a cache of the
+    dimension rows it has already loaded, which are then not looked up again."""
+    connection = CountingConnection(connection or get_connection())
     cursor = connection.cursor()
     plant_data = load_csv()
     config_log()
 
-    insert_botanists(cursor, plant_data)
-    insert_scientific_name(cursor, plant_data)
-    insert_location(cursor, plant_data)
-    insert_plants(cursor, plant_data)
+    dimension_data = plant_data
+    if dimension_cache is not None:
+        keys = dimension_keys(plant_data)
+        dimension_data = plant_data[~keys.isin(dimension_cache)]
+
+    if not dimension_data.empty:
+        insert_botanists(cursor, dimension_data)
+        insert_scientific_name(cursor, dimension_data)
+        insert_location(cursor, dimension_data)
+        insert_plants(cursor, dimension_data)
     insert_recording(cursor, plant_data)
-    insert_assignments(cursor, plant_data)
+    update_continent_hourly_moisture(cursor, plant_data)
+    if not dimension_data.empty:
+        insert_assignments(cursor, dimension_data)
+    upsert_current_state(cursor, plant_data)
     connection.commit()
 
+    if dimension_cache is not None:
+        dimension_cache.update(keys[dimension_data.index])
+
 
 def lambda_handler(event=None, context=None):
     load_dotenv()
@@ -0,0 +1,132 @@
+"""This is the adaptive concurrency control of the Plant API client.
+
+The Plant API is a shared Heroku app, so the extract fetches plants in
+parallel but adjusts how many requests it keeps in flight to how the API
+responds (additive increase, multiplicative decrease):
+
+- each fast, successful response raises the limit by 1/limit, so the limit
+  grows by about one request per round trip;
+- a 429 or 5xx response, a timeout, or a response slower than
+  API_LATENCY_TARGET_SECONDS halves the limit, at most once per round trip;
+- a Retry-After header pauses every new request until it has passed.
+
+The limiter is kept between runs of a warm Lambda or the service, so each
+run starts from the limit the last one settled on."""
+from os import environ
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic
+import json
+import logging
+import threading
+import boto3
+from etl_instrumentation import gauge
+
+
+INITIAL_CONCURRENCY = int(environ.get("API_INITIAL_CONCURRENCY", "2"))
+MAX_CONCURRENCY = int(environ.get("API_MAX_CONCURRENCY", "10"))
+MIN_CONCURRENCY = 1
+LATENCY_TARGET_SECONDS = float(environ.get("API_LATENCY_TARGET_SECONDS", "2"))
+DECREASE_FACTOR = 0.5
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+class AdaptiveLimiter:
+    """Limits the number of requests in flight, raising the limit while the
+    API keeps up and cutting it when the API shows it is overloaded."""
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY,
+                 latency_target: float = LATENCY_TARGET_SECONDS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.peak_limit = self.limit
+        self.in_flight = 0
+        self.decreases = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline: float) -> bool:
+        """Waits for a free request slot and for any Retry-After pause to
+        pass. Returns False if the deadline passes first."""
+        with self._condition:
+            while True:
+                now = monotonic()
+                if now >= deadline:
+                    return False
+
+                pause = self.paused_until - now
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return True
+
+                self._condition.wait(min(deadline - now, pause) if pause > 0
+                                     else deadline - now)
+
+    def release(self, started: float, overloaded: bool = False,
+                retry_after: float = None) -> None:
+        """Frees the slot of a request sent at started (a time.monotonic
+        value), adjusting the limit to how the API responded."""
+        now = monotonic()
+        with self._condition:
+            self.in_flight -= 1
+
+            if retry_after:
+                self.paused_until = max(self.paused_until,
+                                        now + min(retry_after, MAX_RETRY_AFTER_SECONDS))
+
+            if overloaded or now - started > self.latency_target:
+                # Requests sent before the last cut were part of the round
+                # trip that caused it, so they do not cut the limit again.
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                    self.last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+
+            self._condition.notify_all()
+
+
+def parse_retry_after(value: str) -> float:
+    """Returns the seconds to wait from a Retry-After header, which is
+    either a number of seconds or an HTTP date, or None if there is none."""
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        # A date without a zone, or with -0000, parses as naive, and
+        # HTTP dates are always in UTC.
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def report_limit(limiter: AdaptiveLimiter) -> None:
+    """Records the current concurrency limit on the running stage and logs it,
+    publishing an ApiConcurrencyLimit metric if METRICS_NAMESPACE is set."""
+    gauge("concurrency_limit", round(limiter.limit, 2))
+    logging.info("API_CONCURRENCY %s", json.dumps({
+        "limit": round(limiter.limit, 2), "peak_limit": round(limiter.peak_limit, 2),
+        "decreases": limiter.decreases}))
+
+    namespace = environ.get("METRICS_NAMESPACE")
+    if not namespace:
+        return
+
+    boto3.client("cloudwatch").put_metric_data(
+        Namespace=namespace,
+        MetricData=[{"MetricName": "ApiConcurrencyLimit",
+                     "Value": limiter.limit, "Unit": "Count"}])
@@ -0,0 +1,114 @@
+"""This is the long-running service mode of the ETL pipeline, for the ECS
+task, running the ETL on a fixed interval instead of once per Lambda call.
+
+The HTTP session, the DB connection and the cache of already loaded
+dimension rows are kept between cycles. Each cycle's deadline is at most
+one interval, so a cycle's leftover work is carried over to the next. When
+a cycle overruns the interval, the ticks it missed are skipped rather than
+run back to back, so a slow API never builds a backlog. SIGTERM and SIGINT stop the service once the
+current cycle has finished."""
+from os import environ
+from time import monotonic
+import logging
+import signal
+import threading
+import requests
+from dotenv import load_dotenv
+from etl import run_etl, TIME_BUDGET_SECONDS
+from load import get_connection
+
+
+INTERVAL_SECONDS = float(environ.get("ETL_INTERVAL_SECONDS", "60"))
+
+stop_event = threading.Event()
+
+
+def config_log() -> None:
+    """Terminal logs configuration"""
+    logging.basicConfig(
+        format="{asctime} - {levelname} - {message}",
+        style="{",
+        datefmt="%Y-%m-%d %H:%M",
+        level=logging.INFO,
+    )
+
+
+def request_stop(signal_number: int, frame=None) -> None:
+    """Signal handler asking the service to stop after the current cycle."""
+    logging.info("Received signal %s, stopping after the current cycle.", signal_number)
+    stop_event.set()
+
+
+def next_tick(started: float, now: float, interval: float) -> tuple[float, int]:
+    """Returns the time of the next tick on the interval grid from started,
+    and the number of ticks skipped because the last cycle overran."""
+    ticks_passed = int((now - started) // interval)
+    return started + (ticks_passed + 1) * interval, ticks_passed
+
+
+def close_quietly(resource) -> None:
+    """Closes a connection or session, ignoring errors from one that
+    has already failed."""
+    try:
+        resource.close()
+    except Exception:  # pylint: disable=broad-exception-caught
+        pass
+
+
+def run_service(interval: float = INTERVAL_SECONDS, max_cycles: int = None) -> int:
+    """Runs the ETL every interval seconds until stopped, returning the
+    number of cycles run. A failed cycle is logged, and the DB connection
+    is reopened for the next one in case it was the cause."""
+    session = requests.Session()
+    connection = None
+    dimension_cache = set()
+    cycles = 0
+    tick = monotonic()
+
+    try:
+        while not stop_event.is_set():
+            cycle_start = monotonic()
+
+            try:
+                if connection is None:
+                    connection = get_connection()
+                run_etl(session, connection, dimension_cache,
+                        cycle_start + min(TIME_BUDGET_SECONDS, interval))
+            except Exception:  # pylint: disable=broad-exception-caught
+                logging.exception("ETL cycle failed, reconnecting next cycle.")
+                if connection is not None:
+                    close_quietly(connection)
+                connection = None
+
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+
+            now = monotonic()
+            logging.info("ETL cycle took %.2fs.", now - cycle_start)
+            tick, skipped = next_tick(tick, now, interval)
+            if skipped:
+                logging.warning("ETL cycle overran the %ss interval, skipped %s ticks.",
+                                interval, skipped)
+
+            stop_event.wait(max(tick - monotonic(), 0))
+    finally:
+        session.close()
+        if connection is not None:
+            close_quietly(connection)
+
+    logging.info("ETL service stopped after %s cycles.", cycles)
+    return cycles
+
+
+def main() -> None:
+    """Starts the service, stopping cleanly on SIGTERM or SIGINT."""
+    load_dotenv()
+    config_log()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    run_service()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""This file is for tests relating to the alerts script."""
+from unittest.mock import patch
+import pytest
+import pandas as pd
+from alerts import (
+    empty_state, load_state, save_state, prepare_readings, find_alerts,
+    update_state, publish_alerts, check_for_alerts
+)
+
+
+def make_plant_df(readings: list[tuple]) -> pd.DataFrame:
+    """Makes transformed plant data from (plant_id, soil_moisture,
+    temperature, recording_taken, last_watered) tuples."""
+    return pd.DataFrame({
+        "plant_id": [reading[0] for reading in readings],
+        "name": "Asclepias Curassavica",
+        "botanist.email": "gertrude.jekyll@lnhm.co.uk",
+        "soil_moisture": [reading[1] for reading in readings],
+        "temperature": [reading[2] for reading in readings],
+        "recording_taken": [reading[3] for reading in readings],
+        "last_watered": [reading[4] for reading in readings]
+    })
+
+
+WATERED = "Wed, 27 Nov 2024 13:37:24 GMT"
+
+
+def run_minutes(minutes: list[list[tuple]]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Runs each minute's readings through the alert checks in turn,
+    returning the last minute's alerts and the final state."""
+    state_df = empty_state()
+    alerts_df = None
+    for readings in minutes:
+        readings_df = prepare_readings(make_plant_df(readings))
+        alerts_df = find_alerts(readings_df, state_df)
+        state_df = update_state(readings_df, state_df)
+    return alerts_df, state_df
+
+
+def steady_minutes(count: int, plant_id: int = 1) -> list[list[tuple]]:
+    """Returns count minutes of steady readings for one plant."""
+    return [[(plant_id, 50 + (minute % 2), 20 + (minute % 2) * 0.5,
+              f"2024-11-27 14:{minute:02d}:00", WATERED)]
+            for minute in range(count)]
+
+
+def test_prepare_readings_drops_missing_and_parses():
+    """Plants without a reading are dropped and values become numeric."""
+    plant_df = make_plant_df([
+        (1, "50.5", "20.1", "2024-11-27 14:00:00", WATERED),
+        (2, "None", "None", "None", "None")
+    ])
+    readings_df = prepare_readings(plant_df)
+
+    assert readings_df["plant_id"].tolist() == [1]
+    assert readings_df["soil_moisture"].iloc[0] == 50.5
+    assert readings_df["last_watered"].iloc[0] == pd.Timestamp("2024-11-27 13:37:24")
+
+
+def test_threshold_alerts():
+    """Readings outside the thresholds raise too_low and too_high alerts."""
+    alerts_df, _ = run_minutes([[
+        (1, 5, 20, "2024-11-27 14:00:00", WATERED),
+        (2, 50, 40, "2024-11-27 14:00:00", WATERED)
+    ]])
+
+    raised = set(zip(alerts_df["plant_id"], alerts_df["alert"], alerts_df["measurement"]))
+    assert raised == {(1, "too_low", "soil_moisture"), (2, "too_high", "temperature")}
+
+
+def test_no_alerts_for_steady_readings():
+    """A plant with steady, in range readings raises nothing."""
+    alerts_df, state_df = run_minutes(steady_minutes(20))
+
+    assert alerts_df.empty
+    assert state_df["reading_count"].iloc[0] == 20
+
+
+def test_anomaly_after_warm_up():
+    """A reading far from the plant's rolling mean raises an anomaly."""
+    minutes = steady_minutes(20)
+    minutes.append([(1, 80, 20, "2024-11-27 14:20:00", WATERED)])
+    alerts_df, _ = run_minutes(minutes)
+
+    assert ("anomaly", "soil_moisture") in set(zip(alerts_df["alert"],
+                                                   alerts_df["measurement"]))
+
+
+def test_no_anomaly_during_warm_up():
+    """The z-score check waits until enough readings have been seen."""
+    minutes = steady_minutes(3)
+    minutes.append([(1, 80, 20, "2024-11-27 14:03:00", WATERED)])
+    alerts_df, _ = run_minutes(minutes)
+
+    assert "anomaly" not in alerts_df["alert"].tolist()
+
+
+def test_rapid_change_alert():
+    """A large change since the previous reading raises rapid_change."""
+    alerts_df, _ = run_minutes([
+        [(1, 70, 20, "2024-11-27 14:00:00", WATERED)],
+        [(1, 30, 20, "2024-11-27 14:01:00", WATERED)]
+    ])
+
+    assert alerts_df["alert"].tolist() == ["rapid_change"]
+    assert alerts_df["value"].iloc[0] == 30
+
+
+def test_not_watered_alert():
+    """A plant not watered for longer than the limit raises not_watered."""
+    alerts_df, _ = run_minutes([[
+        (1, 50, 20, "2024-11-29 14:00:00", WATERED)
+    ]])
+
+    assert alerts_df["alert"].tolist() == ["not_watered"]
+    assert alerts_df["value"].iloc[0] == pytest.approx(48.38, abs=0.01)
+
+
+def test_not_watered_alert_is_raised_once():
+    """A plant still not watered in the next batch does not alert again."""
+    state_df = empty_state()
+    alerts = []
+    for recording_taken in ("2024-11-29 14:00:00", "2024-11-29 14:01:00"):
+        readings_df = prepare_readings(make_plant_df([(1, 50, 20, recording_taken, WATERED)]))
+        alerts.append(find_alerts(readings_df, state_df))
+        state_df = update_state(readings_df, state_df)
+
+    assert pd.concat(alerts)["alert"].tolist() == ["not_watered"]
+    assert state_df["not_watered_last_watered_alerted"].notna().all()
+
+
+def test_alert_repeats_after_clearing_or_cooldown():
+    """An alert is raised again once its condition has cleared,
+    or once the cooldown has passed."""
+    cleared_df, _ = run_minutes([
+        [(1, 5, 20, "2024-11-27 14:00:00", WATERED)],
+        [(1, 8, 20, "2024-11-27 14:01:00", WATERED)],
+        [(1, 50, 20, "2024-11-27 14:10:00", WATERED)],
+        [(1, 5, 20, "2024-11-27 14:30:00", WATERED)]
+    ])
+    cooled_down_df, _ = run_minutes([
+        [(1, 50, 20, "2024-11-29 14:00:00", WATERED)],
+        [(1, 50, 20, "2024-11-30 14:00:00", WATERED)]
+    ])
+
+    assert "too_low" in cleared_df["alert"].tolist()
+    assert cooled_down_df["alert"].tolist() == ["not_watered"]
+
+
+def test_repeated_reading_is_ignored():
+    """A reading already seen neither alerts again nor updates the state."""
+    minutes = [[(1, 5, 20, "2024-11-27 14:00:00", WATERED)]] * 2
+    alerts_df, state_df = run_minutes(minutes)
+
+    assert alerts_df.empty
+    assert state_df["reading_count"].iloc[0] == 1
+
+
+def test_update_state_keeps_plants_without_readings():
+    """Plants missing from a run keep their statistics."""
+    _, state_df = run_minutes([
+        [(1, 50, 20, "2024-11-27 14:00:00", WATERED),
+         (2, 60, 21, "2024-11-27 14:00:00", WATERED)],
+        [(1, 52, 20, "2024-11-27 14:01:00", WATERED)]
+    ])
+
+    assert state_df["plant_id"].tolist() == [1, 2]
+    assert state_df["reading_count"].tolist() == [2, 1]
+    assert state_df["soil_moisture_mean"].tolist() == [pytest.approx(50.2), 60]
+
+
+def test_save_and_load_state(tmp_path):
+    """Saved state is loaded back unchanged, and a missing file is empty."""
+    _, state_df = run_minutes(steady_minutes(5))
+    path = tmp_path / "state.csv"
+
+    assert load_state(path).empty
+    save_state(state_df, path)
+    pd.testing.assert_frame_equal(load_state(path), state_df, check_dtype=False)
+
+
+@patch.dict("alerts.environ", {"ALERT_TOPIC_ARN": "arn:aws:sns:eu-west-2:1:plants"})
+@patch("alerts.boto3.client")
+def test_publish_alerts_to_sns(mock_client):
+    """Alerts are published as one message when a topic is set."""
+    alerts_df, _ = run_minutes([[(1, 5, 20, "2024-11-27 14:00:00", WATERED)]])
+    publish_alerts(alerts_df)
+
+    mock_client.return_value.publish.assert_called_once()
+    assert "too_low" in mock_client.return_value.publish.call_args.kwargs["Message"]
+
+
+@patch.dict("alerts.environ", {}, clear=True)
+@patch("alerts.boto3.client")
+def test_publish_alerts_without_topic(mock_client):
+    """Without a topic, alerts are only logged."""
+    alerts_df, _ = run_minutes([[(1, 5, 20, "2024-11-27 14:00:00", WATERED)]])
+    publish_alerts(alerts_df)
+
+    mock_client.assert_not_called()
+
+
+@patch("alerts.publish_alerts")
+@patch("alerts.save_state")
+@patch("alerts.load_state")
+@patch("alerts.pd.read_csv")
+def test_check_for_alerts(mock_read_csv, mock_load_state, mock_save_state,
+                          mock_publish_alerts):
+    """Reads the transformed data, saves the new state and publishes alerts."""
+    mock_read_csv.return_value = make_plant_df(
+        [(1, 5, 20, "2024-11-27 14:00:00", WATERED)])
+    mock_load_state.return_value = empty_state()
+
+    alerts_df = check_for_alerts()
+
+    mock_read_csv.assert_called_once_with("/tmp/PLANT_DATA.csv")
+    assert mock_save_state.call_args.args[0]["reading_count"].tolist() == [1]
+    mock_publish_alerts.assert_called_once()
+    assert alerts_df["alert"].tolist() == ["too_low"]
+    assert isinstance(mock_publish_alerts.call_args.args[0], pd.DataFrame)
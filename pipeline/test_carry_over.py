@@ -0,0 +1,30 @@
+"""This file is for tests relating to the carry over script."""
+from unittest.mock import patch
+from carry_over import load_carry_over, save_carry_over, order_plant_ids
+
+
+def test_load_carry_over_missing(tmp_path):
+    """With no saved queue there is nothing carried over."""
+    assert load_carry_over(tmp_path / "missing.json") == ([], [])
+
+
+def test_save_and_load_carry_over(tmp_path):
+    """Saved plant ids and plant data are loaded back by the next run."""
+    path = tmp_path / "carry_over.json"
+    save_carry_over([4, 7], [{"plant_id": 1}], path)
+
+    assert load_carry_over(path) == ([4, 7], [{"plant_id": 1}])
+
+
+@patch("carry_over.MAX_CARRIED_READINGS", 2)
+def test_save_carry_over_keeps_newest(tmp_path):
+    """Only the newest readings are kept beyond the limit."""
+    path = tmp_path / "carry_over.json"
+    save_carry_over([], [{"plant_id": 1}, {"plant_id": 2}, {"plant_id": 3}], path)
+
+    assert load_carry_over(path)[1] == [{"plant_id": 2}, {"plant_id": 3}]
+
+
+def test_order_plant_ids():
+    """Carried over plants come first, then the rest in order."""
+    assert order_plant_ids([0, 1, 2, 3], [3, 1]) == [3, 1, 0, 2]
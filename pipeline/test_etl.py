@@ -0,0 +1,101 @@
+"""This file is for tests relating to the etl script."""
+from time import monotonic
+from unittest.mock import patch, MagicMock
+import pytest
+from etl import run_etl, run_deadline
+
+
+PLANT = {"name": "Cordyline Fruticosa", "plant_id": 1}
+
+
+@pytest.fixture(name="etl_stages")
+def etl_stages_fixture():
+    """Patches every stage of the ETL and the carry over queue"""
+    with patch("etl.get_plant_data_until") as mock_extract, \
+            patch("etl.fully_transform_data") as mock_transform, \
+            patch("etl.check_for_alerts") as mock_alerts, \
+            patch("etl.load_data_into_database") as mock_load, \
+            patch("etl.load_carry_over") as mock_load_carry_over, \
+            patch("etl.save_carry_over") as mock_save_carry_over, \
+            patch("etl.get_connection") as mock_get_connection, \
+            patch("etl.run_lock") as mock_run_lock:
+        mock_alerts.return_value = []
+        mock_load_carry_over.return_value = ([], [])
+        mock_run_lock.return_value.__enter__.return_value = True
+        yield {"connection": mock_get_connection.return_value, "run_lock": mock_run_lock,
+               "extract": mock_extract, "transform": mock_transform,
+               "load": mock_load, "load_carry_over": mock_load_carry_over,
+               "save_carry_over": mock_save_carry_over}
+
+
+def test_run_etl_loads_and_carries_over_unfetched(etl_stages):
+    """Test unfetched plants are saved for the next run"""
+    etl_stages["extract"].return_value = ([PLANT], [7])
+
+    run_etl(deadline=monotonic() + 60)
+
+    etl_stages["load"].assert_called_once()
+    etl_stages["save_carry_over"].assert_called_with([7], [])
+
+
+def test_run_etl_handles_carried_over_work_first(etl_stages):
+    """Test carried over plants are fetched first and carried data is loaded"""
+    carried = {"name": "Euphorbia Cotinifolia", "plant_id": 2}
+    etl_stages["load_carry_over"].return_value = ([5], [carried])
+    etl_stages["extract"].return_value = ([PLANT], [])
+
+    run_etl(deadline=monotonic() + 60)
+
+    assert etl_stages["extract"].call_args.args[0][0] == 5
+    etl_stages["transform"].assert_called_once_with([carried, PLANT])
+
+
+def test_run_etl_carries_over_unloaded_data(etl_stages):
+    """Test plant data is carried over when the deadline passes before loading"""
+    etl_stages["extract"].return_value = ([PLANT], [])
+
+    run_etl(deadline=monotonic() - 1)
+
+    etl_stages["load"].assert_not_called()
+    etl_stages["save_carry_over"].assert_called_once_with([], [PLANT])
+
+
+def test_run_etl_keeps_data_queued_when_load_fails(etl_stages):
+    """Test fetched plant data stays carried over if the load raises"""
+    etl_stages["extract"].return_value = ([PLANT], [7])
+    etl_stages["load"].side_effect = ConnectionError
+
+    with pytest.raises(ConnectionError):
+        run_etl(deadline=monotonic() + 60)
+
+    etl_stages["save_carry_over"].assert_called_once_with([7], [PLANT])
+
+
+def test_run_deadline_uses_lambda_remaining_time():
+    """Test the deadline is cut short by the Lambda's remaining time"""
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 20000
+
+    assert run_deadline(context) - monotonic() == pytest.approx(15, abs=1)
+
+
+def test_run_etl_skips_when_locked(etl_stages):
+    """Test nothing is fetched or loaded while another job holds the run lock"""
+    etl_stages["run_lock"].return_value.__enter__.return_value = False
+
+    run_etl(deadline=monotonic() + 60)
+
+    etl_stages["extract"].assert_not_called()
+    etl_stages["load"].assert_not_called()
+    etl_stages["connection"].close.assert_called_once()
+
+
+def test_run_etl_keeps_service_connection(etl_stages):
+    """Test a connection passed in by the service is used and left open"""
+    connection = MagicMock()
+    etl_stages["extract"].return_value = ([PLANT], [])
+
+    run_etl(connection=connection, deadline=monotonic() + 60)
+
+    assert etl_stages["load"].call_args.args[0] is connection
+    connection.close.assert_not_called()
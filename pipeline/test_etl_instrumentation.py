@@ -0,0 +1,135 @@
+"""This file is for tests relating to the instrumentation script."""
+from os import path
+from unittest.mock import patch, MagicMock
+import pytest
+import etl_instrumentation
+from etl_instrumentation import (
+    reset, count, stage, summary, report, CallCounter, CountingConnection,
+    profile_invocation
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_stages():
+    """Each test starts with no recorded stages."""
+    reset()
+    yield
+    reset()
+
+
+def test_stage_records_time_and_counters():
+    """A stage records its name, time and the counts made inside it."""
+    with stage("extract"):
+        count("http_calls")
+        count("http_calls")
+        count("rows", 50)
+
+    record = summary()[0]
+    assert record["stage"] == "extract"
+    assert record["http_calls"] == 2
+    assert record["rows"] == 50
+    assert record["db_calls"] == 0
+    assert record["seconds"] >= 0
+
+
+def test_count_outside_stage_is_ignored():
+    """Counts made when no stage is running are not recorded."""
+    count("rows", 10)
+    with stage("load"):
+        pass
+
+    assert summary()[0]["rows"] == 0
+
+
+def test_stage_recorded_on_error():
+    """A stage that raises is still recorded."""
+    with pytest.raises(ValueError):
+        with stage("transform"):
+            raise ValueError
+
+    assert summary()[0]["stage"] == "transform"
+
+
+def test_reset_clears_stages():
+    """Stages from a previous invocation are cleared by reset."""
+    with stage("extract"):
+        pass
+    reset()
+
+    assert summary() == []
+
+
+def test_call_counter_counts_named_methods():
+    """Only the named methods are counted, and calls are passed through."""
+    target = MagicMock()
+    target.execute.return_value = "result"
+    wrapped = CallCounter(target, "db_calls", {"execute"})
+
+    with stage("load"):
+        assert wrapped.execute("SELECT 1;") == "result"
+        wrapped.fetchone()
+
+    target.execute.assert_called_once_with("SELECT 1;")
+    assert summary()[0]["db_calls"] == 1
+
+
+def test_counting_connection_counts_cursor_queries():
+    """Queries made through the connection's cursors are counted."""
+    connection = CountingConnection(MagicMock())
+
+    with stage("load"):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+            cursor.executemany("INSERT;", [(1,), (2,)])
+        connection.commit()
+
+    assert summary()[0]["db_calls"] == 2
+
+
+@patch("etl_instrumentation.logging.info")
+def test_report_logs_json_summary(mock_info):
+    """The report ends with a JSON summary of every stage."""
+    with stage("extract"):
+        count("http_calls")
+    report("etl")
+
+    assert mock_info.call_args.args[0] == "STAGE_METRICS %s"
+    assert '"invocation": "etl"' in mock_info.call_args.args[1]
+
+
+@patch.dict("etl_instrumentation.environ", {}, clear=True)
+@patch("etl_instrumentation.save_profile")
+def test_profile_invocation_off_by_default(mock_save_profile):
+    """Without PROFILE_INVOCATION nothing is profiled."""
+    with profile_invocation("etl"):
+        pass
+
+    mock_save_profile.assert_not_called()
+
+
+@patch.dict("etl_instrumentation.environ", {"PROFILE_INVOCATION": "1"}, clear=True)
+@patch("etl_instrumentation.boto3.client")
+def test_profile_invocation_saves_files(mock_client, tmp_path):
+    """With PROFILE_INVOCATION set, the profile files are written to the
+    profile folder and not uploaded without a bucket."""
+    with patch.object(etl_instrumentation, "PROFILE_DIR", str(tmp_path)):
+        with profile_invocation("etl"):
+            with stage("extract"):
+                sum(range(1000))
+
+    written = sorted(path.basename(str(file)) for file in tmp_path.iterdir())
+    assert len(written) == 3
+    assert written[0].endswith(".prof")
+    mock_client.assert_not_called()
+
+
+@patch.dict("etl_instrumentation.environ", {"PROFILE_INVOCATION": "1",
+                                        "PROFILE_S3_BUCKET": "c14-gbu-storage"}, clear=True)
+@patch("etl_instrumentation.boto3.client")
+def test_profile_invocation_uploads_to_bucket(mock_client, tmp_path):
+    """With PROFILE_S3_BUCKET set, the profile files are uploaded."""
+    with patch.object(etl_instrumentation, "PROFILE_DIR", str(tmp_path)):
+        with profile_invocation("etl"):
+            pass
+
+    assert mock_client.return_value.upload_file.call_count == 3
@@ -0,0 +1,63 @@
+"""This file is for tests relating to the run lock script."""
+from unittest.mock import patch, MagicMock
+import pytest
+from etl_run_lock import acquire_run_lock, run_lock, fetch_value
+
+
+@pytest.fixture(name="mock_connection")
+def mock_connection_fixture():
+    """Mock database connection fixture"""
+    return MagicMock()
+
+
+def lock_result(mock_connection, result):
+    """Makes sp_getapplock return the given result"""
+    mock_connection.cursor.return_value.fetchone.return_value = (result,)
+
+
+def test_acquire_run_lock_taken(mock_connection):
+    """Test a non-negative sp_getapplock result takes the lock"""
+    lock_result(mock_connection, 0)
+    assert acquire_run_lock(mock_connection, 2.5)
+    query, params = mock_connection.cursor.return_value.execute.call_args.args
+    assert "sp_getapplock" in query
+    assert params == ("delta.Recordings", 2500)
+
+
+def test_acquire_run_lock_contended(mock_connection):
+    """Test a lock timeout result means the lock was not taken"""
+    lock_result(mock_connection, -1)
+    assert not acquire_run_lock(mock_connection)
+
+
+def test_fetch_value_dict_rows():
+    """Test connections returning dict rows are supported"""
+    cursor = MagicMock()
+    cursor.fetchone.return_value = {"lock_result": 1}
+    assert fetch_value(cursor) == 1
+
+
+@patch("etl_run_lock.logging.info")
+def test_run_lock_releases(mock_info, mock_connection):
+    """Test the lock is released after the work, and the attempt logged"""
+    lock_result(mock_connection, 0)
+    with run_lock(mock_connection, "etl") as acquired:
+        assert acquired
+
+    query = mock_connection.cursor.return_value.execute.call_args.args[0]
+    assert "sp_releaseapplock" in query
+    assert '"acquired": true' in mock_info.call_args.args[1]
+
+
+@patch.dict("etl_run_lock.environ", {"METRICS_NAMESPACE": "Plants"})
+@patch("etl_run_lock.boto3.client")
+def test_run_lock_contended_skips(mock_client, mock_connection):
+    """Test a contended run is told to skip and counted as a metric"""
+    lock_result(mock_connection, -1)
+    with run_lock(mock_connection, "etl") as acquired:
+        assert not acquired
+
+    assert mock_connection.cursor.return_value.execute.call_count == 1
+    metric = mock_client.return_value.put_metric_data.call_args.kwargs["MetricData"][0]
+    assert metric["MetricName"] == "ContendedRuns"
+    assert metric["Value"] == 1
@@ -1,8 +1,11 @@
 """This file is for tests relating to the extract script."""
 import unittest
-from unittest.mock import patch
+from time import monotonic
+from unittest.mock import patch, MagicMock
 import requests
-from extract import fetch_api_plant_data, get_all_plant_data
+from extract import (fetch_api_plant_data, fetch_with_limiter,
+                     get_all_plant_data, get_plant_data_until)
+from rate_control import AdaptiveLimiter
 
 
 @patch("extract.requests.get")
@@ -39,11 +42,10 @@ def test_fetch_api_plant_data_invalid(mock_get):
 @patch("extract.fetch_api_plant_data")
 def test_get_all_plant_data(mock_fetch):
     """Test get_all_plant_data with a mix of valid and invalid responses"""
-    mock_fetch.side_effect = [
-        {"name": "Cordyline Fruticosa", "plant_id": 1},
-        {"error": "plant not found"},
-        {"name": "Euphorbia Cotinifolia", "plant_id": 2},
-    ] + [{"error": "plant not found"}] * 48
+    plants = {0: {"name": "Cordyline Fruticosa", "plant_id": 0},
+              2: {"name": "Euphorbia Cotinifolia", "plant_id": 2}}
+    mock_fetch.side_effect = lambda plant_id, *args: plants.get(
+        plant_id, {"error": "plant not found"})
 
     result = get_all_plant_data()
     assert len(result) == 2
@@ -63,5 +65,94 @@ def test_fetch_api_plant_data_timeout(mock_get):
         assert False, "Timeout exception not raised"
 
 
+@patch("extract.fetch_api_plant_data")
+def test_get_plant_data_until_carries_over_slow_plants(mock_fetch):
+    """Test get_plant_data_until returns the plants that timed out"""
+    responses = {1: {"name": "Cordyline Fruticosa", "plant_id": 1},
+                 2: requests.exceptions.Timeout(),
+                 3: {"error": "plant not found"}}
+
+    def fetch(plant_id, *args):
+        if isinstance(responses[plant_id], Exception):
+            raise responses[plant_id]
+        return responses[plant_id]
+    mock_fetch.side_effect = fetch
+
+    result, unfetched = get_plant_data_until([1, 2, 3], monotonic() + 60,
+                                             limiter=AdaptiveLimiter())
+    assert result == [{"name": "Cordyline Fruticosa", "plant_id": 1}]
+    assert unfetched == [2]
+    assert all(call.args[2] <= 10 for call in mock_fetch.call_args_list)
+
+
+@patch("extract.fetch_api_plant_data")
+def test_get_plant_data_until_stops_at_deadline(mock_fetch):
+    """Test get_plant_data_until fetches nothing once the deadline has passed"""
+    result, unfetched = get_plant_data_until([1, 2], monotonic() - 1,
+                                             limiter=AdaptiveLimiter())
+    assert result == []
+    assert unfetched == [1, 2]
+    mock_fetch.assert_not_called()
+
+
+
+@patch("extract.fetch_api_plant_data")
+def test_get_plant_data_until_keeps_plant_order(mock_fetch):
+    """Test get_plant_data_until returns plants in the order asked for"""
+    mock_fetch.side_effect = lambda plant_id, *args: {"plant_id": plant_id}
+
+    result, unfetched = get_plant_data_until(list(range(20)), monotonic() + 60,
+                                             limiter=AdaptiveLimiter(initial=5))
+    assert [plant["plant_id"] for plant in result] == list(range(20))
+    assert unfetched == []
+
+
+@patch("extract.requests.get")
+def test_fetch_api_plant_data_raises_when_rate_limited(mock_get):
+    """Test fetch_api_plant_data raises an HTTPError on a 429 response"""
+    mock_get.return_value.status_code = 429
+    try:
+        fetch_api_plant_data(8)
+    except requests.exceptions.HTTPError as error:
+        assert error.response.status_code == 429
+    else:
+        assert False, "HTTPError not raised"
+
+
+@patch("extract.requests.get")
+def test_fetch_with_limiter_retries_after_rate_limit(mock_get):
+    """Test fetch_with_limiter retries a rate limited plant, cutting the limit"""
+    limited = MagicMock(status_code=429, headers={"Retry-After": "0"})
+    success = MagicMock(status_code=200)
+    success.json.return_value = {"plant_id": 8}
+    mock_get.side_effect = [limited, success]
+    limiter = AdaptiveLimiter(initial=4)
+
+    assert fetch_with_limiter(8, limiter, monotonic() + 60) == {"plant_id": 8}
+    assert mock_get.call_count == 2
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+
+
+@patch("extract.requests.get")
+def test_fetch_with_limiter_gives_up_after_max_attempts(mock_get):
+    """Test fetch_with_limiter returns None for a plant rate limited every time"""
+    mock_get.return_value = MagicMock(status_code=503, headers={})
+
+    assert fetch_with_limiter(8, AdaptiveLimiter(), monotonic() + 60) is None
+    assert mock_get.call_count == 3
+
+
+@patch("extract.requests.get")
+def test_fetch_with_limiter_frees_slot_on_bad_body(mock_get):
+    """Test a response that is not JSON frees its slot and carries the plant over"""
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.json.side_effect = ValueError("Expecting value")
+    limiter = AdaptiveLimiter(initial=4)
+
+    assert fetch_with_limiter(8, limiter, monotonic() + 60) is None
+    assert limiter.in_flight == 0
+
+
 if __name__ == "__main__":
     unittest.main()
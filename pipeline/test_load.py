@@ -1,4 +1,5 @@
 """This file is for tests relating to the load script."""
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 import pytest
 import pandas as pd
@@ -7,7 +8,9 @@ from load import (
     load_csv, get_connection, get_continents, find_location_id,
     find_botanist_id, find_plant_id, find_scientific_name_id,
     insert_botanists, insert_scientific_name, insert_location,
-    insert_plants, insert_recording, insert_assignments
+    insert_plants, insert_recording, insert_assignments, find_watering_event_id,
+    update_continent_hourly_moisture, upsert_current_state,
+    load_data_into_database
 )
 
 
@@ -149,6 +152,22 @@ def test_insert_recording(mock_cursor):
     mock_cursor.execute.assert_called()
 
 
+def test_find_watering_event_id_existing(mock_cursor):
+    """Test find_watering_event_id returns a stored event without inserting"""
+    event_id = find_watering_event_id(mock_cursor, 1, datetime(2024, 11, 27, 13, 37, 24))
+    assert event_id == 1
+    assert mock_cursor.execute.call_count == 1
+
+
+def test_find_watering_event_id_new_event():
+    """Test find_watering_event_id inserts an event when last_watered changes"""
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [None, [7]]
+    event_id = find_watering_event_id(cursor, 1, datetime(2024, 11, 28, 9, 0))
+    assert event_id == 7
+    assert "INSERT INTO delta.Watering_Events" in cursor.execute.call_args.args[0]
+
+
 @patch("load.find_botanist_id")
 @patch("load.find_plant_id")
 def test_insert_assignments(mock_find_plant_id, mock_find_botanist_id, mock_cursor):
@@ -157,3 +176,48 @@ def test_insert_assignments(mock_find_plant_id, mock_find_botanist_id, mock_curs
     mock_find_botanist_id.return_value = 1
     insert_assignments(mock_cursor, MOCK_DF)
     mock_cursor.execute.assert_called()
+
+
+def test_update_continent_hourly_moisture(mock_cursor):
+    """Test the update_continent_hourly_moisture function"""
+    update_continent_hourly_moisture(mock_cursor, MOCK_DF)
+    mock_cursor.execute.assert_called_once()
+    query, params = mock_cursor.execute.call_args[0]
+    assert "MERGE delta.Continent_Hourly_Moisture" in query
+    assert params == (datetime(2024, 11, 27, 16, 0),)
+
+
+def test_update_continent_hourly_moisture_empty(mock_cursor):
+    """Test the update_continent_hourly_moisture function skips an empty batch"""
+    update_continent_hourly_moisture(mock_cursor, MOCK_DF.iloc[0:0])
+    mock_cursor.execute.assert_not_called()
+
+
+def test_upsert_current_state(mock_cursor):
+    """Test the upsert_current_state function"""
+    upsert_current_state(mock_cursor, MOCK_DF)
+    mock_cursor.execute.assert_called_once()
+    query, params = mock_cursor.execute.call_args[0]
+    assert "MERGE delta.Plant_Current_State" in query
+    assert params[2] == datetime(2024, 11, 27, 13, 37, 24)
+    assert params[3] == datetime(2024, 11, 27, 16, 47, 53)
+    assert params[5] == 1
+
+
+@patch("load.insert_botanists")
+@patch("load.insert_recording")
+@patch("load.load_csv")
+def test_load_data_into_database_skips_cached_dimensions(mock_load_csv, mock_insert_recording,
+                                                         mock_insert_botanists, mock_cursor):
+    """Test dimension rows loaded by an earlier cycle are not loaded again"""
+    mock_load_csv.return_value = MOCK_DF
+    connection = MagicMock()
+    connection.cursor.return_value = mock_cursor
+    dimension_cache = set()
+
+    load_data_into_database(connection, dimension_cache)
+    load_data_into_database(connection, dimension_cache)
+
+    assert mock_insert_botanists.call_count == 1
+    assert mock_insert_recording.call_count == 2
+    assert len(dimension_cache) == 1
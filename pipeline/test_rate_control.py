@@ -0,0 +1,93 @@
+"""This file is for tests relating to the rate control script."""
+from time import monotonic
+from unittest.mock import patch
+from rate_control import AdaptiveLimiter, parse_retry_after, report_limit
+
+
+def test_limit_increases_on_fast_responses():
+    """Test each fast response raises the limit by 1/limit"""
+    limiter = AdaptiveLimiter(initial=2, maximum=10, latency_target=5)
+    assert limiter.acquire(monotonic() + 1)
+    limiter.release(monotonic())
+    assert limiter.limit == 2.5
+    assert limiter.in_flight == 0
+
+
+def test_limit_never_exceeds_maximum():
+    """Test the limit stops growing at the maximum"""
+    limiter = AdaptiveLimiter(initial=3, maximum=3, latency_target=5)
+    limiter.acquire(monotonic() + 1)
+    limiter.release(monotonic())
+    assert limiter.limit == 3
+
+
+def test_limit_halves_once_per_round_trip():
+    """Test overloaded responses sent before the last cut do not cut again"""
+    limiter = AdaptiveLimiter(initial=8, maximum=10)
+    started = monotonic()
+    for _ in range(3):
+        limiter.acquire(monotonic() + 1)
+    for _ in range(3):
+        limiter.release(started, overloaded=True)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+
+
+def test_slow_response_cuts_limit():
+    """Test a response slower than the latency target halves the limit"""
+    limiter = AdaptiveLimiter(initial=4, latency_target=1)
+    limiter.acquire(monotonic() + 1)
+    limiter.release(monotonic() - 2)
+    assert limiter.limit == 2
+
+
+def test_limit_never_below_minimum():
+    """Test the limit does not fall below the minimum"""
+    limiter = AdaptiveLimiter(initial=1, minimum=1)
+    limiter.acquire(monotonic() + 1)
+    limiter.release(monotonic(), overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_acquire_times_out_when_full():
+    """Test acquire gives up at the deadline when every slot is in use"""
+    limiter = AdaptiveLimiter(initial=1)
+    assert limiter.acquire(monotonic() + 1)
+    assert not limiter.acquire(monotonic() + 0.05)
+
+
+def test_retry_after_pauses_requests():
+    """Test a Retry-After pause blocks new requests until it passes"""
+    limiter = AdaptiveLimiter(initial=4)
+    limiter.acquire(monotonic() + 1)
+    limiter.release(monotonic(), overloaded=True, retry_after=10)
+    assert not limiter.acquire(monotonic() + 0.05)
+
+
+def test_parse_retry_after_seconds():
+    """Test parse_retry_after reads a number of seconds"""
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after(None) is None
+
+
+def test_parse_retry_after_date():
+    """Test parse_retry_after reads an HTTP date in the past as no wait"""
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_date_without_zone():
+    """Test an HTTP date with no zone, or -0000, is read as UTC"""
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 -0000") == 0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00") == 0
+    assert 0 < parse_retry_after("Fri, 01 Jan 2100 00:00:00 -0000")
+
+
+@patch("rate_control.boto3.client")
+def test_report_limit_publishes_metric(mock_client, monkeypatch):
+    """Test report_limit publishes the limit when METRICS_NAMESPACE is set"""
+    monkeypatch.setenv("METRICS_NAMESPACE", "Plants")
+    report_limit(AdaptiveLimiter(initial=3))
+    metric = mock_client.return_value.put_metric_data.call_args.kwargs["MetricData"][0]
+    assert metric["MetricName"] == "ApiConcurrencyLimit"
+    assert metric["Value"] == 3
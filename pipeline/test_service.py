@@ -0,0 +1,58 @@
+"""This file is for tests relating to the service script."""
+from unittest.mock import patch, MagicMock
+import pytest
+import service
+from service import next_tick, request_stop, run_service
+
+
+@pytest.fixture(autouse=True)
+def clear_stop_event():
+    """Each test starts with the service not asked to stop."""
+    service.stop_event.clear()
+    yield
+    service.stop_event.clear()
+
+
+def test_next_tick_on_time():
+    """A cycle shorter than the interval waits for the next tick."""
+    assert next_tick(100, 130, 60) == (160, 0)
+
+
+def test_next_tick_skips_missed_ticks():
+    """A cycle that overran skips the ticks it missed."""
+    assert next_tick(100, 250, 60) == (280, 2)
+
+
+@patch("service.get_connection")
+@patch("service.run_etl")
+def test_run_service_reuses_session_and_connection(mock_run_etl, mock_get_connection):
+    """Every cycle gets the same session, connection and dimension cache."""
+    cycles = run_service(interval=0.01, max_cycles=3)
+
+    assert cycles == 3
+    mock_get_connection.assert_called_once()
+    first_call, last_call = mock_run_etl.call_args_list[0], mock_run_etl.call_args_list[-1]
+    assert first_call.args[0] is last_call.args[0]
+    assert first_call.args[1] is mock_get_connection.return_value
+    assert first_call.args[2] is last_call.args[2]
+
+
+@patch("service.get_connection")
+@patch("service.run_etl")
+def test_run_service_reconnects_after_failure(mock_run_etl, mock_get_connection):
+    """A failed cycle closes the connection and the next opens a new one."""
+    mock_run_etl.side_effect = [Exception("connection lost"), None]
+    mock_get_connection.side_effect = [MagicMock(), MagicMock()]
+
+    assert run_service(interval=0.01, max_cycles=2) == 2
+    assert mock_get_connection.call_count == 2
+
+
+@patch("service.get_connection")
+@patch("service.run_etl")
+def test_stop_request_ends_after_current_cycle(mock_run_etl, mock_get_connection):
+    """A stop requested during a cycle lets it finish, then stops."""
+    mock_run_etl.side_effect = lambda *args: request_stop(15)
+
+    assert run_service(interval=60) == 1
+    mock_get_connection.return_value.close.assert_called_once()
@@ -2,7 +2,8 @@
 from unittest.mock import patch
 import pytest
 import pandas as pd
-from transform import insert_in_dataframe, clean_data, fully_transform_data
+from transform import (insert_in_dataframe, clean_data, fully_transform_data,
+                       validate_data, export_quarantine, QUARANTINE_COLUMNS)
 
 
 @pytest.fixture(name='sample_plant_data')
@@ -89,6 +90,52 @@ def test_clean_data(sample_dataframe):
     assert "None" not in cleaned_data.values
 
 
+def test_validate_data_keeps_valid_readings(sample_dataframe):
+    """A well formed reading passes every rule."""
+    clean_df, quarantine_df = validate_data(sample_dataframe)
+
+    assert len(clean_df) == 1
+    assert quarantine_df.empty
+
+
+def test_validate_data_quarantines_invalid_readings(sample_plant_data):
+    """Readings breaking any rule are quarantined, naming every rule they broke."""
+    future_reading = {**sample_plant_data[0], "plant_id": 24, "soil_moisture": -5.0,
+                      "recording_taken": "2099-01-01 00:00:00"}
+    no_botanist = {**sample_plant_data[0], "plant_id": 25, "temperature": 500.0,
+                   "botanist": {"name": "Eliza Andrews", "email": None, "phone": None}}
+    plant_df = insert_in_dataframe(sample_plant_data + [future_reading, no_botanist])
+
+    clean_df, quarantine_df = validate_data(plant_df)
+
+    assert clean_df["plant_id"].tolist() == [23]
+    assert quarantine_df["failed_rules"].tolist() == [
+        "soil_moisture_out_of_range;future_recording_taken",
+        "temperature_out_of_range;missing_botanist"]
+
+
+@patch("transform.boto3.client")
+def test_export_quarantine_appends_with_fixed_columns(mock_client, sample_plant_data,
+                                                      tmp_path):
+    """Batches with different columns are appended under one fixed header,
+    keeping the readings quarantined earlier, and each run is uploaded."""
+    quarantine_file = tmp_path / "QUARANTINE.csv"
+    invalid_reading = {**sample_plant_data[0], "soil_moisture": "not a number"}
+    _, first_df = validate_data(insert_in_dataframe([invalid_reading]))
+    _, second_df = validate_data(insert_in_dataframe([invalid_reading]))
+
+    export_quarantine(first_df, quarantine_file, "bucket")
+    export_quarantine(second_df.drop(columns=["images.license"]), quarantine_file, "bucket")
+
+    exported_data = pd.read_csv(quarantine_file)
+    assert list(exported_data.columns) == QUARANTINE_COLUMNS
+    assert exported_data["failed_rules"].tolist() == ["soil_moisture_out_of_range"] * 2
+    uploads = mock_client.return_value.put_object.call_args_list
+    assert len(uploads) == 2
+    assert uploads[0].kwargs["Key"].startswith("quarantine/")
+    assert uploads[0].kwargs["Key"] != uploads[1].kwargs["Key"]
+
+
 def test_export_as_csv(sample_dataframe, tmp_path):
     """Test export_as_csv function"""
     test_file = tmp_path / "test_plant_data.csv"
@@ -1,7 +1,32 @@
 """This is the Transform portion of the ETL script"""
+from os import environ
+from os.path import exists, getsize
+from datetime import datetime, timezone
+from uuid import uuid4
+import json
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
 import pandas as pd
 
 import logging
+from etl_instrumentation import count
+
+
+QUARANTINE_PATH = environ.get("QUARANTINE_PATH", "/tmp/QUARANTINE.csv")
+QUARANTINE_S3_BUCKET = environ.get("QUARANTINE_S3_BUCKET", "c14-gbu-storage")
+# Every quarantined batch is written with these columns, whichever
+# columns json_normalize gave that batch.
+QUARANTINE_COLUMNS = ["quarantined_at", "plant_id", "name", "recording_taken",
+                      "last_watered", "soil_moisture", "temperature",
+                      "botanist.email", "failed_rules"]
+SOIL_MOISTURE_RANGE = (float(environ.get("VALID_SOIL_MOISTURE_MIN", "0")),
+                       float(environ.get("VALID_SOIL_MOISTURE_MAX", "100")))
+TEMPERATURE_RANGE = (float(environ.get("VALID_TEMPERATURE_MIN", "-30")),
+                     float(environ.get("VALID_TEMPERATURE_MAX", "60")))
+# Readings are timestamped by the API, whose clock may be ahead of ours
+# or on British Summer Time, so only readings further ahead are future.
+FUTURE_TOLERANCE = pd.Timedelta(minutes=float(
+    environ.get("VALID_FUTURE_TOLERANCE_MINUTES", "60")))
 
 
 def config_log() -> None:
@@ -44,6 +69,98 @@ def insert_in_dataframe(plant_data: list[dict]) -> pd.DataFrame:
     return plant_df
 
 
+def parse_readings(plant_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the columns the validation rules check, parsed once into
+    numeric and datetime columns, with unparseable values as NaN or NaT."""
+    return pd.DataFrame({
+        "plant_id": pd.to_numeric(plant_df["plant_id"], errors="coerce"),
+        "soil_moisture": pd.to_numeric(plant_df["soil_moisture"], errors="coerce"),
+        "temperature": pd.to_numeric(plant_df["temperature"], errors="coerce"),
+        "recording_taken": pd.to_datetime(
+            plant_df["recording_taken"], format="%Y-%m-%d %H:%M:%S", errors="coerce"),
+        "last_watered": pd.to_datetime(
+            plant_df["last_watered"], format="%a, %d %b %Y %H:%M:%S %Z",
+            errors="coerce").dt.tz_localize(None),
+        "botanist_email": plant_df.get("botanist.email")
+    })
+
+
+def out_of_range(values: pd.Series, limits: tuple[float, float]) -> pd.Series:
+    """Returns the mask of values that are missing or outside the limits."""
+    return ~values.between(*limits)
+
+
+RULES = {
+    "missing_plant_id": lambda readings, now: readings["plant_id"].isna(),
+    "soil_moisture_out_of_range": lambda readings, now: out_of_range(
+        readings["soil_moisture"], SOIL_MOISTURE_RANGE),
+    "temperature_out_of_range": lambda readings, now: out_of_range(
+        readings["temperature"], TEMPERATURE_RANGE),
+    "invalid_recording_taken": lambda readings, now: readings["recording_taken"].isna(),
+    "future_recording_taken": lambda readings, now: (
+        readings["recording_taken"] > now + FUTURE_TOLERANCE),
+    "invalid_last_watered": lambda readings, now: readings["last_watered"].isna(),
+    "missing_botanist": lambda readings, now: readings["botanist_email"].isna()
+}
+
+
+def validate_data(plant_df: pd.DataFrame,
+                  now: pd.Timestamp = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Checks every reading against every rule, each rule a vectorised mask
+    over the whole batch. Returns the clean readings and the quarantined
+    ones, which get a failed_rules column naming the rules they broke."""
+    now = now if now is not None else pd.Timestamp.now(tz="UTC").tz_localize(None)
+    readings = parse_readings(plant_df)
+
+    failures = pd.DataFrame({name: rule(readings, now) for name, rule in RULES.items()},
+                            index=plant_df.index)
+    failed = failures.any(axis=1)
+
+    quarantine_df = plant_df[failed].assign(
+        failed_rules=failures[failed].dot(failures.columns + ";").str.rstrip(";"))
+
+    return plant_df[~failed], quarantine_df
+
+
+def quarantine_key(quarantined_at: datetime) -> str:
+    """Returns a new S3 key for the quarantine object of one run."""
+    return f"quarantine/{quarantined_at:%Y/%m/%d/%H%M%S}-{uuid4().hex[:8]}.csv"
+
+
+def export_quarantine(quarantine_df: pd.DataFrame, path: str = QUARANTINE_PATH,
+                      bucket: str = QUARANTINE_S3_BUCKET,
+                      quarantined_at: datetime = None) -> None:
+    """Logs how many quarantined readings broke each rule, and writes them
+    with the fixed QUARANTINE_COLUMNS. They are appended to the local
+    quarantine file and, if a bucket is set, uploaded as one S3 object
+    per run, as /tmp does not outlive the Lambda."""
+    if quarantine_df.empty:
+        return
+
+    quarantined_at = quarantined_at or datetime.now(timezone.utc)
+    quarantine_df = quarantine_df.assign(
+        quarantined_at=quarantined_at.strftime("%Y-%m-%d %H:%M:%S")
+    ).reindex(columns=QUARANTINE_COLUMNS)
+
+    rule_counts = quarantine_df["failed_rules"].str.split(";").explode().value_counts()
+    logging.warning("QUARANTINE %s", json.dumps({
+        "readings": len(quarantine_df),
+        "rules": {rule: int(total) for rule, total in rule_counts.items()}}))
+
+    write_header = not exists(path) or getsize(path) == 0
+    quarantine_df.to_csv(path, mode="a", header=write_header, index=False)
+
+    if not bucket:
+        return
+
+    try:
+        boto3.client("s3").put_object(Bucket=bucket, Key=quarantine_key(quarantined_at),
+                                      Body=quarantine_df.to_csv(index=False))
+    except (BotoCoreError, ClientError):
+        logging.exception("Could not upload %s quarantined readings to %s.",
+                          len(quarantine_df), bucket)
+
+
 def clean_data(plant_df: pd.DataFrame) -> pd.DataFrame:
     """Cleans dataframe of unnecessary data
         Removes unwanted columns"""
@@ -68,9 +185,12 @@ def export_as_csv(plant_df: pd.DataFrame) -> None:
 
 def fully_transform_data(plant_data: list[dict]) -> None:
     """Fully transforms the given plant data and also
-        Exports it to a csv file"""
+        Exports it to a csv file, quarantining invalid readings"""
     config_log()
     plant_df = insert_in_dataframe(plant_data)
+    plant_df, quarantine_df = validate_data(plant_df)
+    export_quarantine(quarantine_df)
+    count("quarantined", len(quarantine_df))
     plant_df = clean_data(plant_df)
     export_as_csv(plant_df)
     logging.info("PLANT_DATA.csv created.")
@@ -8,44 +8,153 @@ import boto3
 import pymssql
 from dotenv import load_dotenv
 import pandas as pd
+from s3_cache import load_archive_csv
+from dashboard_keyset import fetch_columns
+
+
+# The recordings columns and the RDS expression each is read from. Recordings
+# store a reference to their watering event rather than the last_watered
+# time itself, which is joined back in only when it is asked for.
+RECORDING_COLUMNS = {
+    'recording_id': 'rec.recording_id',
+    'plant_id': 'rec.plant_id',
+    'last_watered': 'events.watered_at',
+    'soil_moisture': 'rec.soil_moisture',
+    'temperature': 'rec.temperature',
+    'recording_taken': 'rec.reading_taken'
+}
+
+# The columns of the shared recordings df: the charts use plant_id and the
+# measurements over time, and the recordings store its recording_id watermark.
+DASHBOARD_COLUMNS = ['recording_id', 'plant_id', 'soil_moisture',
+                     'temperature', 'recording_taken']
+
+# The columns of one plant's readings, deduplicated on recording_id.
+READING_COLUMNS = ['recording_id', 'soil_moisture', 'temperature', 'recording_taken']
+
+
+def query_recordings(conn: pymssql.Connection, columns: list[str], where: str = "1 = 1",
+                     params: tuple = ()) -> dict[str, list]:
+    """Fetches the named columns of the short-term recordings matching where,
+    newest to oldest reading_taken, as a list of values per column."""
+    source = "delta.Recordings AS rec"
+    if 'last_watered' in columns:
+        source += """
+            LEFT JOIN delta.Watering_Events AS events
+            ON rec.watering_event_id = events.watering_event_id"""
+
+    recording_data = fetch_columns(
+        conn, {column: RECORDING_COLUMNS[column] for column in columns},
+        source, where, params)
+    conn.commit()
 
+    return recording_data
 
-def download_csv_from_s3(s3: boto3.client) -> bool:
-    """Attempts to download .csv file from S3 bucket."""
-    filename = 'updated_recordings_data.csv'
 
-    try:
-        for object_name in s3.list_objects(Bucket='c14-gbu-storage')['Contents']:
-            object_key = object_name['Key']
+def query_database(conn: pymssql.Connection,
+                   columns: list[str] = None) -> dict[str, list]:
+    """Fetches the given columns, by default the DASHBOARD_COLUMNS, of all
+    short-term data from the RDS, in order of newest to oldest reading_taken."""
+    return query_recordings(conn, columns or DASHBOARD_COLUMNS)
 
-            if object_key == filename:
-                s3.download_file('c14-gbu-storage', object_key,
-                                 'existing_recordings.csv')
-                return True
-    except KeyError:
-        return False
 
-    return False
+def query_plant_readings(conn: pymssql.Connection, plant_id: int, start: datetime,
+                         end: datetime, columns: list[str] = None) -> dict[str, list]:
+    """Fetches the given columns, by default the READING_COLUMNS, of the
+    short-term data for one plant between start and end, in order of newest
+    to oldest reading_taken. Served by the ix_recordings_plant_reading_taken index."""
+    return query_recordings(
+        conn, columns or READING_COLUMNS,
+        "rec.plant_id = %s AND rec.reading_taken BETWEEN %s AND %s", (plant_id, start, end))
 
 
-def query_database(conn: pymssql.Connection) -> list[dict]:
-    """Fetches all short-term data from the RDS, returning in order
-    of newest to oldest reading_taken."""
+def get_s3_client() -> boto3.client:
+    """Creates and returns a client for the S3 bucket."""
+    return boto3.client('s3', aws_access_key_id=environ.get(
+        "aws_access_key_id"), aws_secret_access_key=environ.get("aws_secret_access_key"))
+
+
+def query_new_recordings(conn: pymssql.Connection, last_recording_id: int,
+                         columns: list[str] = None) -> dict[str, list]:
+    """Fetches the given columns, by default the DASHBOARD_COLUMNS, of only
+    the short-term data added after the recording with last_recording_id,
+    in order of newest to oldest reading_taken."""
+    return query_recordings(conn, columns or DASHBOARD_COLUMNS, "rec.recording_id > %s",
+                            (last_recording_id,))
+
+
+def query_time_range(conn: pymssql.Connection) -> dict:
+    """Fetches the earliest and latest reading_taken of the short-term data,
+    as earliest and latest, both None if there is none."""
     with conn.cursor() as cur:
-        cur.execute(
-            """SELECT * FROM delta.Recordings ORDER BY reading_taken DESC;""")
-        recording_data = cur.fetchall()
+        cur.execute("""
+            SELECT MIN(reading_taken) AS earliest, MAX(reading_taken) AS latest
+            FROM delta.Recordings;""")
+        time_range = cur.fetchone()
 
     conn.commit()
 
-    return recording_data
+    return time_range
+
+
+def query_current_state(conn: pymssql.Connection) -> list[dict]:
+    """Fetches the one row per plant current state table kept up by the ETL."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT state.plant_id, state.soil_moisture, state.temperature,
+                state.last_watered, state.reading_taken,
+                bot.first_name + ' ' + bot.last_name AS botanist,
+                loc.town, loc.country_code
+            FROM delta.Plant_Current_State AS state
+            LEFT JOIN delta.Botanists AS bot
+            ON state.botanist_id = bot.botanist_id
+            JOIN delta.Locations AS loc
+            ON state.location_id = loc.location_id
+            ORDER BY state.plant_id;""")
+        state_data = cur.fetchall()
 
+    conn.commit()
+
+    return state_data
 
-def merge_with_existing_recordings(recordings_df: pd.DataFrame) -> pd.DataFrame:
+
+def query_last_watered(conn: pymssql.Connection) -> list[dict]:
+    """Fetches the latest watering time of every plant from the watering
+    events, one index seek per plant on (plant_id, watered_at)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT plant_id, MAX(watered_at) AS last_watered
+            FROM delta.Watering_Events
+            GROUP BY plant_id
+            ORDER BY plant_id;""")
+        watered_data = cur.fetchall()
+
+    conn.commit()
+
+    return watered_data
+
+
+def query_continent_hourly_moisture(conn: pymssql.Connection) -> list[dict]:
+    """Fetches the hourly soil moisture summary per continent kept
+    up by the ETL for the short-term data."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT cont.continent_name, summary.hour_start,
+                summary.reading_count, summary.total_soil_moisture
+            FROM delta.Continent_Hourly_Moisture AS summary
+            JOIN delta.Continents AS cont
+            ON summary.continent_id = cont.continent_id;""")
+        summary_data = cur.fetchall()
+
+    conn.commit()
+
+    return summary_data
+
+
+def merge_with_existing_recordings(recordings_df: pd.DataFrame,
+                                   long_term_df: pd.DataFrame) -> pd.DataFrame:
     """Merges RDS df with S3 bucket df to form one df in order
     of newest to oldest reading_taken."""
-    long_term_df = pd.read_csv('./existing_recordings.csv')
-
     merged_recordings_df = pd.concat(
         [recordings_df, long_term_df], ignore_index=True)
 
@@ -58,20 +167,14 @@ def merge_with_existing_recordings(recordings_df: pd.DataFrame) -> pd.DataFrame:
     return sorted_merged_df
 
 
-def convert_data_to_df(recording_data: list[dict]) -> pd.DataFrame:
-    """Converts data queried from RDS into a pandas df."""
-    recordings_df = pd.DataFrame(columns=['recording_id', 'plant_id', 'last_watered',
-                                          'soil_moisture', 'temperature', 'recording_taken'])
-    rows_added = 0
+def convert_data_to_df(recording_data: dict[str, list]) -> pd.DataFrame:
+    """Converts the columns queried from RDS into a pandas df,
+    with datetime64 timestamps."""
+    recordings_df = pd.DataFrame(recording_data)
 
-    for row in recording_data:
-        last_watered = row['last_watered'].strftime("%Y-%m-%d %H:%M:%S")
-        reading_taken = row['reading_taken'].strftime("%Y-%m-%d %H:%M:%S")
-
-        recordings_df.loc[rows_added] = [row['recording_id'], row['plant_id'], last_watered,
-                                         row['soil_moisture'], row['temperature'], reading_taken]
-
-        rows_added += 1
+    for column in ('last_watered', 'recording_taken'):
+        if column in recordings_df:
+            recordings_df[column] = pd.to_datetime(recordings_df[column])
 
     return recordings_df
 
@@ -101,12 +204,15 @@ def return_merged_df() -> pd.DataFrame:
     rds_data = query_database(conn)
     rds_df = convert_data_to_df(rds_data)
 
-    s3 = boto3.client('s3', aws_access_key_id=environ.get(
-        "aws_access_key_id"), aws_secret_access_key=environ.get("aws_secret_access_key"))
+    s3 = get_s3_client()
 
-    download_csv_from_s3(s3)
+    long_term_df = load_archive_csv(s3)
+    if long_term_df is None:
+        long_term_df = pd.DataFrame(columns=rds_df.columns)
+    else:
+        long_term_df = long_term_df[list(rds_df.columns)]
 
-    merged_df = merge_with_existing_recordings(rds_df)
+    merged_df = merge_with_existing_recordings(rds_df, long_term_df)
 
     return merged_df
 
@@ -0,0 +1,60 @@
+"""Benchmarks the payload size and build time of a two-series line chart,
+sending raw one-minute data against LTTB and min/max downsampled data.
+
+Run with: python benchmark_downsample.py"""
+
+from time import perf_counter
+import altair as alt
+import numpy as np
+import pandas as pd
+from downsample import downsample
+
+
+RANGES_IN_DAYS = [1, 7, 30]
+
+
+def make_long_df(days: int) -> pd.DataFrame:
+    """Makes one soil moisture and one temperature reading per minute."""
+    minutes = pd.date_range(end="2024-12-01", periods=days * 24 * 60, freq='min')
+    rng = np.random.default_rng(0)
+    wide_df = pd.DataFrame({
+        'recording_taken': minutes,
+        'soil_moisture': 50 + 30 * np.sin(np.arange(len(minutes)) / 600)
+        + rng.normal(0, 2, len(minutes)),
+        'temperature': 15 + 5 * np.sin(np.arange(len(minutes)) / 1440)
+        + rng.normal(0, 0.5, len(minutes))
+    })
+
+    return wide_df.melt(id_vars='recording_taken', var_name='Measurement',
+                        value_name='Value')
+
+
+def render(long_df: pd.DataFrame) -> str:
+    """Builds the chart and serialises it to the JSON sent to the browser."""
+    return alt.Chart(long_df).mark_line().encode(
+        x='recording_taken:T', y='Value:Q', color='Measurement:N'
+    ).properties(width=800, height=400).to_json()
+
+
+def run_benchmark() -> None:
+    """Prints payload size and time to downsample and render each range."""
+    alt.data_transformers.disable_max_rows()
+
+    print(f"{'range':<8}{'method':<8}{'points':>9}{'payload (KB)':>14}{'time (s)':>10}")
+
+    for days in RANGES_IN_DAYS:
+        long_df = make_long_df(days)
+
+        for method in ['raw', 'lttb', 'minmax']:
+            start = perf_counter()
+            chart_df = long_df if method == 'raw' else downsample(
+                long_df, 'recording_taken', 'Value', 'Measurement', method=method)
+            payload = render(chart_df)
+            elapsed = perf_counter() - start
+
+            print(f"{f'{days}d':<8}{method:<8}{len(chart_df):>9}"
+                  f"{len(payload) / 1024:>14.1f}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
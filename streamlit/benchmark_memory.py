@@ -0,0 +1,69 @@
+"""Benchmarks the memory held by the dashboard's recordings df, comparing the
+raw .csv dtypes, the previous normalised dtypes and the compact dtypes.
+
+Run with: python benchmark_memory.py"""
+
+from io import StringIO
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from data_layer import normalise_types
+from compact import compact_recordings, expand_recordings
+
+
+PLANT_COUNT = 50
+RANGES_IN_DAYS = [1, 7, 30]
+
+
+def make_recordings_df(days: int) -> pd.DataFrame:
+    """Makes one reading per plant per minute, parsed from a .csv as
+    return_merged_df does, with each plant watered about twice a day."""
+    minutes = pd.date_range(end="2024-12-01", periods=days * 24 * 60, freq='min')
+    rng = np.random.default_rng(0)
+    row_count = len(minutes) * PLANT_COUNT
+
+    recording_taken = np.repeat(minutes, PLANT_COUNT)
+    watered = recording_taken.floor('12h') + pd.to_timedelta(
+        np.tile(np.arange(PLANT_COUNT), len(minutes)), unit='min')
+
+    csv_df = pd.DataFrame({
+        'recording_id': np.arange(row_count, 0, -1),
+        'plant_id': np.tile(np.arange(1, PLANT_COUNT + 1), len(minutes)),
+        'last_watered': watered.strftime('%Y-%m-%d %H:%M:%S'),
+        'soil_moisture': rng.uniform(10, 90, row_count),
+        'temperature': rng.uniform(5, 30, row_count),
+        'recording_taken': recording_taken.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+    return pd.read_csv(StringIO(csv_df.to_csv(index=False)))
+
+
+def megabytes(df: pd.DataFrame) -> float:
+    """Returns the deep memory usage of a df in MB."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def run_benchmark() -> None:
+    """Prints the memory of each representation and the conversion time."""
+    print(f"{'range':<8}{'rows':>10}{'raw (MB)':>11}{'normalised (MB)':>17}"
+          f"{'compact (MB)':>14}{'compact (s)':>13}{'expand (s)':>12}")
+
+    for days in RANGES_IN_DAYS:
+        raw_df = make_recordings_df(days)
+        normalised_df = normalise_types(raw_df)
+
+        start = perf_counter()
+        compact_df = compact_recordings(raw_df)
+        compact_time = perf_counter() - start
+
+        start = perf_counter()
+        expand_recordings(compact_df)
+        expand_time = perf_counter() - start
+
+        print(f"{f'{days}d':<8}{len(raw_df):>10}{megabytes(raw_df):>11.1f}"
+              f"{megabytes(normalised_df):>17.1f}{megabytes(compact_df):>14.1f}"
+              f"{compact_time:>13.3f}{expand_time:>12.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,105 @@
+"""Shared time-bucketing engine for the dashboard's aggregations.
+
+Timestamps are bucketed as integer epoch nanoseconds, so any bucket width can
+be used, and every requested aggregate is computed from a single sort of the
+bucket keys. Results are not cached here: the data layer already caches the
+frames they are computed from, and one pass over them is cheap."""
+
+import numpy as np
+import pandas as pd
+
+
+REDUCERS = {
+    "sum": np.add.reduceat,
+    "min": np.fmin.reduceat,
+    "max": np.fmax.reduceat
+}
+
+def aggregate_sorted(values: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                     aggregation: str) -> np.ndarray:
+    """Aggregates values already sorted by bucket, where each bucket begins at
+    the matching index in starts. NaN values are ignored."""
+    valid = ~np.isnan(values)
+
+    if aggregation == "count":
+        return np.add.reduceat(valid.astype(np.int64), starts)
+    if aggregation == "mean":
+        totals = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        valid_counts = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(valid_counts > 0, totals / valid_counts, np.nan)
+    if aggregation == "size":
+        return counts
+    if aggregation in ("min", "max"):
+        return REDUCERS[aggregation](values, starts)
+
+    return REDUCERS[aggregation](np.where(valid, values, 0.0), starts)
+
+
+def compute_buckets(df: pd.DataFrame, time_column: str, width: pd.Timedelta,
+                    aggregations: dict, group_column: str, start, end,
+                    fill_empty: bool) -> pd.DataFrame:
+    """Buckets and aggregates df, see bucket_aggregate."""
+    epoch = pd.to_datetime(df[time_column]).to_numpy().astype(
+        "datetime64[ns]").astype(np.int64)
+    in_range = epoch != np.iinfo(np.int64).min
+
+    if start is not None:
+        in_range &= epoch >= pd.Timestamp(start).value
+    if end is not None:
+        in_range &= epoch <= pd.Timestamp(end).value
+
+    if group_column is not None:
+        group_codes, group_names = pd.factorize(df[group_column].to_numpy(), sort=True)
+        # Rows without a group are coded -1, which would fall into the last
+        # group of the bucket before, so they are left out.
+        in_range &= group_codes >= 0
+        group_codes = group_codes[in_range]
+    else:
+        group_codes, group_names = np.zeros(int(in_range.sum()), dtype=np.int64), [None]
+
+    width_ns = width.value
+    buckets = epoch[in_range] // width_ns
+
+    keys = buckets * max(len(group_names), 1) + group_codes
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) \
+        if len(sorted_keys) else np.array([], dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(sorted_keys)])
+
+    result = {time_column: pd.to_datetime(
+        (buckets[order][starts] * width_ns).astype("datetime64[ns]"))}
+    if group_column is not None:
+        result[group_column] = np.asarray(group_names)[group_codes[order][starts]]
+
+    for output_column, (column, aggregation) in aggregations.items():
+        values = df[column].to_numpy(dtype=np.float64)[in_range][order]
+        result[output_column] = aggregate_sorted(values, starts, counts, aggregation) \
+            if len(starts) else np.array([], dtype=np.float64)
+
+    bucketed_df = pd.DataFrame(result)
+
+    if fill_empty and group_column is None and not bucketed_df.empty:
+        every_bucket = pd.date_range(bucketed_df[time_column].iloc[0],
+                                     bucketed_df[time_column].iloc[-1], freq=width)
+        bucketed_df = bucketed_df.set_index(time_column).reindex(every_bucket) \
+            .rename_axis(time_column).reset_index()
+
+    return bucketed_df
+
+
+def bucket_aggregate(df: pd.DataFrame, time_column: str, width, aggregations: dict,
+                     group_column: str = None, start=None, end=None,
+                     fill_empty: bool = False) -> pd.DataFrame:
+    """Groups df into epoch-aligned buckets of the given width (a Timedelta or
+    a string such as "1min", "30min" or "1h"), optionally per group_column and
+    only between start and end, computing every aggregation in one pass.
+
+    aggregations maps output column names to (column, aggregation) pairs, like
+    pandas named aggregation, with aggregation one of "mean", "sum", "min",
+    "max", "count" or "size". The bucket start is returned in time_column,
+    sorted oldest first. With fill_empty, buckets without readings are
+    included as NaN rows when no group_column is given."""
+    return compute_buckets(df, time_column, pd.Timedelta(width), aggregations,
+                           group_column, start, end, fill_empty)
@@ -1,22 +1,22 @@
 """Creates combined trends (soil moisture, temperature)
 line chart over time."""
 import altair as alt
-import pandas as pd
-from base_script import return_merged_df
+from data_layer import get_recordings
+from bucketing import bucket_aggregate
+from downsample import downsample
 
 
 def combined_trends_graph() -> alt.Chart:
     """Makes the line chart and returns it to dashboard
     script."""
-    merged_df = return_merged_df()
+    merged_df = get_recordings()
 
-    alt.data_transformers.disable_max_rows()
-    merged_df = merged_df.drop(
-        columns=['recording_id', 'plant_id', 'last_watered'])
-
-    merged_df.set_index('recording_taken', inplace=True)
-    grouped_df = merged_df.resample('30min').mean()
-    grouped_df = grouped_df.interpolate(method='linear').reset_index()
+    grouped_df = bucket_aggregate(
+        merged_df, 'recording_taken', '30min',
+        {'soil_moisture': ('soil_moisture', 'mean'),
+         'temperature': ('temperature', 'mean')},
+        fill_empty=True)
+    grouped_df = grouped_df.interpolate(method='linear')
 
     long_df = grouped_df.melt(
         id_vars='recording_taken',
@@ -24,6 +24,7 @@ def combined_trends_graph() -> alt.Chart:
         var_name='Measurement',
         value_name='Value'
     )
+    long_df = downsample(long_df, 'recording_taken', 'Value', 'Measurement')
 
     # Create the Altair line chart
     combined_trends_chart = alt.Chart(long_df).mark_line().encode(
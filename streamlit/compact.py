@@ -0,0 +1,132 @@
+"""Compact in-memory representation of the dashboard's recordings.
+
+The merged recordings are held with int32 recording_id, int16 plant_id,
+float32 measurements and datetime64 timestamps. last_watered only changes
+when a plant is watered, so it is held as a categorical, storing each
+distinct time once plus a small integer code per row, when the read
+selected it at all. expand_recordings converts back to the standard dtypes
+for any code that needs them.
+
+RecordingsBuffer holds the recordings newest first in one array per column,
+with free rows kept in front of them. New recordings are written into the
+free rows, and the df handed out is a view of the filled rows, so adding
+recordings costs time in the number of new rows rather than all rows held.
+The arrays are only reallocated when the free rows run out, with as many
+free rows again as rows held, so that copy is spread over many appends."""
+
+import numpy as np
+import pandas as pd
+
+
+COMPACT_DTYPES = {
+    'recording_id': np.int32,
+    'plant_id': np.int16,
+    'soil_moisture': np.float32,
+    'temperature': np.float32
+}
+
+HEADROOM_ROWS = 10000
+
+STANDARD_DTYPES = {
+    'recording_id': np.int64,
+    'plant_id': np.int64,
+    'soil_moisture': np.float64,
+    'temperature': np.float64
+}
+
+
+def compact_recordings(recordings_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the recordings with compact column dtypes."""
+    compact_df = recordings_df.astype(COMPACT_DTYPES)
+    compact_df['recording_taken'] = pd.to_datetime(compact_df['recording_taken'])
+    if 'last_watered' in compact_df:
+        compact_df['last_watered'] = pd.to_datetime(
+            compact_df['last_watered']).astype('category')
+
+    return compact_df
+
+
+def codes_dtype(category_count: int) -> np.dtype:
+    """Returns the dtype pandas keeps the codes of that many categories in,
+    so a Categorical can be built on the codes without copying them."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if category_count < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class RecordingsBuffer:
+    """Compact recordings, newest first, that new recordings can be put in
+    front of without copying the recordings already held."""
+
+    def __init__(self, compact_df: pd.DataFrame):
+        self.columns = list(compact_df.columns)
+        self.categories = compact_df['last_watered'].cat.categories \
+            if 'last_watered' in compact_df else None
+        self.arrays = {}
+        self.start = 0
+        self.allocate(compact_df, max(len(compact_df), HEADROOM_ROWS))
+
+    def allocate(self, compact_df: pd.DataFrame, free_rows: int) -> None:
+        """Copies compact_df into new arrays with free_rows in front of it."""
+        arrays = {}
+        for column in self.columns:
+            if column == 'last_watered':
+                values = compact_df[column].array.codes
+                dtype = codes_dtype(len(self.categories))
+            else:
+                values = compact_df[column].to_numpy()
+                dtype = values.dtype
+
+            arrays[column] = np.empty(free_rows + len(values), dtype=dtype)
+            arrays[column][free_rows:] = values
+
+        self.arrays, self.start = arrays, free_rows
+
+    def frame(self) -> pd.DataFrame:
+        """Returns the recordings held, as a read-only view of the arrays."""
+        columns = {}
+        for column, array in self.arrays.items():
+            values = array[self.start:]
+            if column == 'last_watered':
+                values = pd.Categorical.from_codes(values, categories=self.categories,
+                                                   validate=False)
+            columns[column] = values
+
+        return pd.DataFrame(columns, copy=False)
+
+    def prepend(self, new_df: pd.DataFrame) -> None:
+        """Puts newly fetched recordings, newest first, in front of those
+        held, extending the last_watered categories instead of rebuilding them."""
+        new_df = compact_recordings(new_df)[self.columns]
+        new_rows = len(new_df)
+
+        if 'last_watered' in new_df:
+            unseen = new_df['last_watered'].cat.categories.difference(self.categories)
+            widen = codes_dtype(len(self.categories) + len(unseen)) \
+                != self.arrays['last_watered'].dtype
+            held_df = self.frame() if widen else None
+            self.categories = self.categories.append(unseen)
+            if widen:
+                self.allocate(held_df, self.start)
+
+        if new_rows > self.start:
+            self.allocate(self.frame(), new_rows + max(len(self.arrays[self.columns[0]])
+                                                       - self.start, HEADROOM_ROWS))
+
+        for column in self.columns:
+            values = self.categories.get_indexer(new_df[column].astype(self.categories.dtype)) \
+                if column == 'last_watered' else new_df[column].to_numpy()
+            self.arrays[column][self.start - new_rows:self.start] = values
+
+        self.start -= new_rows
+
+
+def expand_recordings(compact_df: pd.DataFrame) -> pd.DataFrame:
+    """Converts compact recordings back to the standard dtypes, with
+    last_watered as a datetime64 column."""
+    expanded_df = compact_df.astype(STANDARD_DTYPES)
+    if 'last_watered' in expanded_df:
+        expanded_df['last_watered'] = expanded_df['last_watered'].astype('datetime64[ns]')
+
+    return expanded_df
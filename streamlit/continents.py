@@ -1,70 +1,42 @@
-# pylint: disable=no-member
 """Script for creating and returning
 continents line chart to be used on streamlit dash."""
 
-from os import environ
 import altair as alt
 import pandas as pd
-import pymssql
-from base_script import return_merged_df
+from data_layer import get_continent_hourly_moisture, get_continent_rollup
+from downsample import downsample
 
 
-def continents() -> alt.Chart:
-    """Creates and returns the continents chart
-    to be used on the streamlit dashboard."""
-    alt.data_transformers.disable_max_rows()
-
-    return_merged_df()
-
-    def get_connection() -> pymssql.Connection:
-        conn = pymssql.connect(
-            server=environ["DB_HOST"],
-            port=environ["DB_PORT"],
-            user=environ["DB_USER"],
-            password=environ["DB_PASSWORD"],
-            database=environ["DB_NAME"],
-            as_dict=True
-        )
-
-        return conn
-
-    connection = get_connection()
-    cursor = connection.cursor()
-    print("connected")
-    merged_df = return_merged_df()
+def combine_continent_hours(summary_df: pd.DataFrame, rollup_df: pd.DataFrame) -> pd.DataFrame:
+    """Combines the RDS summary of recent hours with the archive rollup of
+    older hours into one average soil moisture per continent per hour. Hours
+    in both are taken from the summary, which holds every reading of the hour."""
+    hot_df = pd.DataFrame({
+        "recording_taken": pd.to_datetime(summary_df["hour_start"]),
+        "continent_name": summary_df["continent_name"],
+        "avg_soil_moisture": (summary_df["total_soil_moisture"].astype(float)
+                              / summary_df["reading_count"].astype(float))
+    })
+    cold_df = pd.DataFrame({
+        "recording_taken": pd.to_datetime(rollup_df["bucket_start"]),
+        "continent_name": rollup_df["continent_name"],
+        "avg_soil_moisture": rollup_df["soil_moisture_mean"].astype(float)
+    })
 
-    def get_continent(cursor):
-        """Returns the continent of a given plant ID"""
-        cursor.execute("""
-            SELECT plants.plant_id, cont.continent_name 
-            FROM delta.Continents AS cont
-            JOIN delta.Locations AS loc
-            ON cont.continent_id = loc.continent_id
-            JOIN delta.Plants AS plants
-            ON plants.location_id = loc.location_id
-            ORDER BY plants.plant_id
-        """)
+    hot_keys = pd.MultiIndex.from_frame(hot_df[["recording_taken", "continent_name"]])
+    cold_keys = pd.MultiIndex.from_frame(cold_df[["recording_taken", "continent_name"]])
+    cold_df = cold_df[~cold_keys.isin(hot_keys)]
 
-        results = cursor.fetchall()
-        if results:
-            return results
-        else:
-            print("No results")
-            return None
+    return pd.concat([cold_df, hot_df], ignore_index=True).sort_values("recording_taken")
 
-    continent_data = get_continent(cursor)
 
-    continent_df = pd.DataFrame(continent_data)
-
-    all_data = pd.merge(merged_df, continent_df, how="left", on=["plant_id"])
-
-    all_data["recording_taken"] = pd.to_datetime(all_data["recording_taken"])
-
-    all_data["recording_taken"] = all_data["recording_taken"].dt.floor("H")
-
-    grouped_df = all_data.groupby(["recording_taken", "continent_name"]).agg(
-        avg_soil_moisture=("soil_moisture", "mean")
-    ).reset_index()
+def continents() -> alt.Chart:
+    """Creates and returns the continents chart
+    to be used on the streamlit dashboard."""
+    grouped_df = combine_continent_hours(get_continent_hourly_moisture(),
+                                         get_continent_rollup())
+    grouped_df = downsample(grouped_df, "recording_taken",
+                            "avg_soil_moisture", "continent_name")
 
     print("Making Graph")
 
@@ -72,7 +44,7 @@ def continents() -> alt.Chart:
         x=alt.X("recording_taken:T", title="Time (Hour)"),
         y=alt.Y("avg_soil_moisture:Q", title="Average Soil Moisture"),
         color="continent_name:N",
-        tooltip=["reading_taken:T", "continent_name:N", "avg_soil_moisture:Q"]
+        tooltip=["recording_taken:T", "continent_name:N", "avg_soil_moisture:Q"]
     ).properties(
         title="Average Soil Moisture Per Continent Over Time",
         width=800,
@@ -4,57 +4,47 @@ from datetime import datetime
 import altair as alt
 import pandas as pd
 import streamlit as st
-from base_script import return_merged_df
+from data_layer import (get_readings, get_current_state, get_latest_watering,
+                        get_plant_ids, get_time_range, invalidate_cache)
 from combined_trends import combined_trends_graph
 from continents import continents
+from downsample import downsample
+from bucketing import bucket_aggregate
 
 
-def load_data() -> pd.DataFrame:
-    """Load the dataset from the base script."""
-    return return_merged_df()
-
-
-def filter_data(df: pd.DataFrame, plant_id: int, start_time: datetime,
+def filter_data(plant_id: int, start_time: datetime,
                 end_time: datetime) -> pd.DataFrame:
     """
-    Filter the dataframe for the selected plant and time range, grouping by minute.
+    Load the readings for the selected plant and time range from storage,
+    grouping by minute.
     """
-    df["recording_taken"] = pd.to_datetime(
-        df["recording_taken"], errors="coerce")
-    filtered_df = df.loc[
-        (df["plant_id"] == plant_id)
-        & (df["recording_taken"] >= start_time)
-        & (df["recording_taken"] <= end_time)
-    ].copy()
-    filtered_df["minute"] = filtered_df["recording_taken"].dt.strftime(
-        "%Y-%m-%d %H:%M")
-    average_readings = (
-        filtered_df.groupby("minute")
-        .agg({"soil_moisture": "mean", "temperature": "mean"})
-        .reset_index()
+    filtered_df = get_readings(plant_id, start_time, end_time)
+    average_readings = bucket_aggregate(
+        filtered_df, "recording_taken", "1min",
+        {"soil_moisture": ("soil_moisture", "mean"),
+         "temperature": ("temperature", "mean")}
     )
-    return average_readings
+    return average_readings.rename(columns={"recording_taken": "minute"})
 
 
-def get_last_watered(df: pd.DataFrame) -> pd.DataFrame:
+def get_last_watered() -> pd.DataFrame:
     """
-    Get the last watered timestamp for each plant.
+    Get the last watered timestamp for each plant from the watering events table.
     """
-    df["recording_taken"] = pd.to_datetime(
-        df["recording_taken"], errors="coerce")
-    last_watered = (
-        df.groupby("plant_id", as_index=False)
-        .agg({"recording_taken": "max"})
-        .rename(columns={"recording_taken": "last_watered"})
-    )
-    return last_watered
+    last_watered = get_latest_watering()
+    return last_watered.assign(last_watered=pd.to_datetime(last_watered["last_watered"]))
 
 
 def prepare_data_for_chart(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Melt the dataframe for chart compatibility.
+    Melt the dataframe for chart compatibility. When the range holds more
+    minutes than the chart's point budget, only the minutes with the lowest
+    and highest stacked reading in each time bucket are kept.
     """
-    return df.melt(id_vars="minute", var_name="Measurement", value_name="Value")
+    stacked_df = df.assign(stack_height=df["soil_moisture"] + df["temperature"])
+    sampled_df = downsample(stacked_df, "minute", "stack_height",
+                            method="minmax").drop(columns="stack_height")
+    return sampled_df.melt(id_vars="minute", var_name="Measurement", value_name="Value")
 
 
 def create_chart(data: pd.DataFrame) -> alt.Chart:
@@ -106,15 +96,12 @@ def main() -> None:
     """Main function to run the Streamlit app."""
     st.title("Plant Data Dashboard")
 
-    df = load_data()
+    if st.sidebar.button("Refresh data"):
+        invalidate_cache()
 
-    plant_id = st.selectbox("Select Plant ID:", df["plant_id"].unique())
+    plant_id = st.selectbox("Select Plant ID:", get_plant_ids())
 
-    df["recording_taken"] = pd.to_datetime(df["recording_taken"])
-
-    min_time = df["recording_taken"].min(
-    ).to_pydatetime()
-    max_time = df["recording_taken"].max().to_pydatetime()
+    min_time, max_time = get_time_range()
     start_time, end_time = st.slider(
         "Select Time Range:",
         min_value=min_time,
@@ -124,7 +111,7 @@ def main() -> None:
         step=pd.Timedelta(minutes=1).to_pytimedelta(),
     )
 
-    average_readings = filter_data(df, plant_id, start_time, end_time)
+    average_readings = filter_data(plant_id, start_time, end_time)
     if average_readings.empty:
         st.warning("No data available for the selected time range.")
         return
@@ -133,10 +120,13 @@ def main() -> None:
     chart = create_chart(chart_data)
     st.altair_chart(chart, use_container_width=True)
 
-    last_watered_data = get_last_watered(df)
+    last_watered_data = get_last_watered()
     last_watered_chart = create_last_watered_chart(last_watered_data)
     st.altair_chart(last_watered_chart, use_container_width=True)
 
+    st.subheader("Current Plant State")
+    st.dataframe(get_current_state(), hide_index=True)
+
     continents_chart = continents()
     st.altair_chart(continents_chart, use_container_width=True)
 
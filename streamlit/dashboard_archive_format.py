@@ -0,0 +1,136 @@
+"""Reader for the compact binary recordings archive written by the mover
+(see database/archive_format.py), used by the dashboard to read only the
+archive blocks covering a query. Each block header records the time and
+plant_id range the block covers, so blocks outside a query are skipped
+without being decompressed."""
+
+import gzip
+import io
+import struct
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RECORDING_COLUMNS = ['recording_id', 'plant_id', 'last_watered',
+                     'soil_moisture', 'temperature', 'recording_taken']
+
+ARCHIVE_MAGIC = b'PHRA'
+ARCHIVE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sBc')
+BLOCK_HEADER = struct.Struct('<IIqqhh')
+
+
+def decompress(payload: bytes, codec: bytes) -> bytes:
+    """Decompresses a block payload with the given codec."""
+    if codec == b'z':
+        if zstandard is None:
+            raise ValueError("Archive is zstd compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return gzip.decompress(payload)
+
+
+def from_epoch_seconds(epoch: np.ndarray) -> pd.Series:
+    """Converts int64 epoch seconds back to datetime64[ns] timestamps."""
+    return pd.Series(epoch.astype('datetime64[s]').astype('datetime64[ns]'))
+
+
+def decode_block(payload: bytes, codec: bytes) -> pd.DataFrame:
+    """Decodes a compressed block back into the archive's df columns."""
+    columns = np.load(io.BytesIO(decompress(payload, codec)))
+
+    watered_values = from_epoch_seconds(columns['last_watered_values'])
+    last_watered = watered_values.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+
+    return pd.DataFrame({
+        'recording_id': columns['recording_id'].astype(np.int64),
+        'plant_id': columns['plant_id'].astype(np.int64),
+        'last_watered': last_watered[columns['last_watered_codes']],
+        'soil_moisture': columns['soil_moisture'].astype(np.float64),
+        'temperature': columns['temperature'].astype(np.float64),
+        'recording_taken': from_epoch_seconds(columns['recording_taken'])
+    })
+
+
+def block_in_range(block_header: tuple, plant_id: int = None,
+                   start: pd.Timestamp = None, end: pd.Timestamp = None) -> bool:
+    """Returns whether a block could hold rows matching the filters,
+    using the time and plant_id range in its header."""
+    _, _, min_taken, max_taken, min_plant, max_plant = block_header
+
+    if plant_id is not None and not min_plant <= plant_id <= max_plant:
+        return False
+    if start is not None and max_taken < pd.Timestamp(start).timestamp():
+        return False
+    if end is not None and min_taken > pd.Timestamp(end).timestamp():
+        return False
+
+    return True
+
+
+def iter_archive(archive_path: str, plant_id: int = None,
+                 start: pd.Timestamp = None, end: pd.Timestamp = None):
+    """Yields the recordings in an archive file block by block, skipping
+    blocks outside the optional plant_id and recording_taken filters."""
+    with open(archive_path, 'rb') as archive_file:
+        magic, version, codec = FILE_HEADER.unpack(
+            archive_file.read(FILE_HEADER.size))
+
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{archive_path} is not a recordings archive.")
+
+        while header_bytes := archive_file.read(BLOCK_HEADER.size):
+            block_header = BLOCK_HEADER.unpack(header_bytes)
+
+            if not block_in_range(block_header, plant_id, start, end):
+                archive_file.seek(block_header[0], io.SEEK_CUR)
+                continue
+
+            block_df = decode_block(archive_file.read(block_header[0]), codec)
+
+            if plant_id is not None:
+                block_df = block_df[block_df['plant_id'] == plant_id]
+            if start is not None:
+                block_df = block_df[block_df['recording_taken'] >= start]
+            if end is not None:
+                block_df = block_df[block_df['recording_taken'] <= end]
+
+            yield block_df
+
+
+def archive_time_range(archive_path: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Returns the earliest and latest recording_taken in an archive file,
+    read from the block headers alone, or (None, None) if it has no blocks."""
+    earliest, latest = None, None
+
+    with open(archive_path, 'rb') as archive_file:
+        magic, version, _ = FILE_HEADER.unpack(archive_file.read(FILE_HEADER.size))
+
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{archive_path} is not a recordings archive.")
+
+        while header_bytes := archive_file.read(BLOCK_HEADER.size):
+            block_size, _, min_taken, max_taken, _, _ = BLOCK_HEADER.unpack(header_bytes)
+            earliest = min_taken if earliest is None else min(earliest, min_taken)
+            latest = max_taken if latest is None else max(latest, max_taken)
+            archive_file.seek(block_size, io.SEEK_CUR)
+
+    if earliest is None:
+        return None, None
+    return pd.Timestamp(earliest, unit='s'), pd.Timestamp(latest, unit='s')
+
+
+def read_archive(archive_path: str, plant_id: int = None,
+                 start: pd.Timestamp = None, end: pd.Timestamp = None) -> pd.DataFrame:
+    """Reads the recordings in an archive file into a single df, with the
+    same columns as the archive .csv file."""
+    blocks = list(iter_archive(archive_path, plant_id, start, end))
+
+    if not blocks:
+        return pd.DataFrame(columns=RECORDING_COLUMNS)
+
+    return pd.concat(blocks, ignore_index=True)
@@ -0,0 +1,315 @@
+"""Shared, cached data layer for the streamlit dashboard. Every chart reads
+through this module, so one render of the dashboard costs at most one fetch
+from the RDS and S3 bucket, however many charts use the data."""
+
+from os import environ
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from dotenv import load_dotenv
+import pandas as pd
+from base_script import (return_merged_df, get_connection, query_continent_hourly_moisture,
+                         query_current_state, query_last_watered, query_time_range,
+                         query_new_recordings, query_plant_readings, convert_data_to_df,
+                         get_s3_client, READING_COLUMNS)
+from s3_cache import cached_download, load_archive_csv
+from dashboard_archive_format import read_archive, archive_time_range
+from compact import compact_recordings, RecordingsBuffer
+
+
+RECORDINGS_TTL = float(environ.get("DASHBOARD_CACHE_TTL", 60))
+ARCHIVE_TTL = float(environ.get("DASHBOARD_ARCHIVE_TTL", 3600))
+
+
+def normalise_types(recordings_df: pd.DataFrame) -> pd.DataFrame:
+    """Gives the recordings columns that are present numeric and datetime
+    dtypes, as values read from the RDS can arrive as object columns."""
+    dtypes = {'recording_id': int, 'plant_id': int,
+              'soil_moisture': float, 'temperature': float}
+    recordings_df = recordings_df.astype(
+        {column: dtype for column, dtype in dtypes.items() if column in recordings_df})
+    recordings_df['recording_taken'] = pd.to_datetime(
+        recordings_df['recording_taken'])
+
+    return recordings_df
+
+
+class TimedCache:
+    """Process-wide cache holding one value per key until its time to live
+    expires. Each key is loaded under its own lock, so concurrent sessions
+    asking for an expired key wait for a single fetch instead of each
+    starting one, while a slow load never holds up the other keys. The
+    shared lock is only held to look up or create a key's lock."""
+
+    def __init__(self):
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = Lock()
+
+    def key_lock(self, key: str) -> Lock:
+        """Returns the lock loads of key are done under."""
+        with self._lock:
+            return self._key_locks.setdefault(key, Lock())
+
+    def get(self, key: str, ttl: float, loader):
+        """Returns the cached value for key, calling loader to
+        fetch it if it is missing or older than ttl seconds."""
+        with self.key_lock(key):
+            entry = self._entries.get(key)
+
+            if entry is None or monotonic() - entry[0] > ttl:
+                entry = (monotonic(), loader())
+                self._entries[key] = entry
+
+            return entry[1]
+
+    def invalidate(self, key: str = None) -> None:
+        """Drops the cached value for key, or every value if no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class RecordingsStore:
+    """Keeps the loaded recordings between refreshes. A refresh only fetches
+    the rows added to the RDS since the highest recording_id already held,
+    so its cost scales with new data rather than total data: the new rows are
+    written in front of the held ones without copying them. The full RDS and
+    S3 history is only reloaded every ARCHIVE_TTL seconds, which picks up the
+    nightly archive and drops rows the mover has removed from the RDS."""
+
+    def __init__(self):
+        self.buffer = None
+        self.last_recording_id = None
+        self.loaded_at = None
+
+    def full_load(self) -> None:
+        """Reloads the full history from the RDS and S3 bucket."""
+        compact_df = compact_recordings(return_merged_df())
+        self.buffer = RecordingsBuffer(compact_df)
+        self.last_recording_id = int(compact_df['recording_id'].max()) \
+            if not compact_df.empty else 0
+        self.loaded_at = monotonic()
+
+    def fetch_new_recordings(self) -> None:
+        """Appends the RDS rows past the recording_id watermark
+        to the front of the held, newest first, recordings."""
+        load_dotenv()
+        conn = get_connection()
+        new_recordings = query_new_recordings(conn, self.last_recording_id)
+        conn.close()
+
+        if not new_recordings['recording_id']:
+            return
+
+        new_df = normalise_types(convert_data_to_df(new_recordings))
+        new_df = new_df.sort_values(by='recording_taken', ascending=False)
+
+        self.buffer.prepend(new_df)
+        self.last_recording_id = int(new_df['recording_id'].max())
+
+    def refresh(self) -> pd.DataFrame:
+        """Brings the held recordings up to date and returns them."""
+        if self.buffer is None or monotonic() - self.loaded_at > ARCHIVE_TTL:
+            self.full_load()
+        else:
+            self.fetch_new_recordings()
+
+        return self.buffer.frame()
+
+    def clear(self) -> None:
+        """Drops the held recordings, so the next refresh is a full load."""
+        self.buffer = None
+
+
+cache = TimedCache()
+recordings_store = RecordingsStore()
+
+
+def load_continent_hourly_moisture() -> pd.DataFrame:
+    """Fetches the ETL's hourly soil moisture summary per continent."""
+    load_dotenv()
+    conn = get_connection()
+
+    summary_df = pd.DataFrame(query_continent_hourly_moisture(conn),
+                              columns=['continent_name', 'hour_start',
+                                       'reading_count', 'total_soil_moisture'])
+    conn.close()
+
+    return summary_df
+
+
+def load_current_state() -> pd.DataFrame:
+    """Fetches the latest reading, last watered time, botanist
+    and location of every plant."""
+    load_dotenv()
+    conn = get_connection()
+
+    state_df = pd.DataFrame(query_current_state(conn),
+                            columns=['plant_id', 'soil_moisture', 'temperature',
+                                     'last_watered', 'reading_taken', 'botanist',
+                                     'town', 'country_code'])
+    conn.close()
+
+    return state_df
+
+
+def load_last_watered() -> pd.DataFrame:
+    """Fetches the latest watering time of every plant."""
+    load_dotenv()
+    conn = get_connection()
+
+    watered_df = pd.DataFrame(query_last_watered(conn),
+                              columns=['plant_id', 'last_watered'])
+    conn.close()
+
+    return watered_df
+
+
+def load_continent_rollup() -> pd.DataFrame:
+    """Downloads the mover's hourly rollup per continent of the archive."""
+    load_dotenv()
+
+    rollup_path = cached_download(get_s3_client(), 'hourly_continent_rollup.csv')
+
+    if rollup_path is not None:
+        return pd.read_csv(rollup_path, parse_dates=['bucket_start'])
+
+    return pd.DataFrame(columns=['continent_name', 'bucket_start',
+                                 'reading_count', 'soil_moisture_mean'])
+
+
+def download_archive() -> str:
+    """Returns the local path of the compact .rec archive, only downloading
+    it if it has changed, or None if there is no archive on the S3 bucket yet."""
+    load_dotenv()
+
+    return cached_download(get_s3_client(), 'updated_recordings_data.rec')
+
+
+def load_archive_csv_df() -> pd.DataFrame:
+    """Loads the archive .csv, through its parsed feather copy, for when the
+    mover has not written a .rec archive yet. Returns None if there is no
+    archive on the S3 bucket at all."""
+    load_dotenv()
+
+    return load_archive_csv(get_s3_client())
+
+
+def read_archived_readings(plant_id: int, start: datetime, end: datetime) -> pd.DataFrame:
+    """Returns one plant's archived recordings between start and end, from
+    the .rec archive, or from the .csv archive if there is no .rec yet.
+    Returns None if there is no archive on the S3 bucket."""
+    archive_path = cache.get("archive_file", ARCHIVE_TTL, download_archive)
+    if archive_path is not None:
+        return read_archive(archive_path, plant_id, start, end)
+
+    archive_df = cache.get("archive_csv", ARCHIVE_TTL, load_archive_csv_df)
+    if archive_df is None:
+        return None
+
+    return archive_df[(archive_df['plant_id'] == plant_id)
+                      & archive_df['recording_taken'].between(start, end)]
+
+
+def get_readings(plant_id: int, start: datetime, end: datetime) -> pd.DataFrame:
+    """Returns one plant's recordings between start and end, newest to oldest.
+    The RDS is queried with the plant and time range as parameters, and only
+    the archive blocks that overlap the range are decompressed."""
+    load_dotenv()
+    conn = get_connection()
+    rds_df = convert_data_to_df(query_plant_readings(conn, int(plant_id), start, end))
+    conn.close()
+
+    readings_df = normalise_types(rds_df)
+    archive_df = read_archived_readings(int(plant_id), start, end)
+
+    if archive_df is not None:
+        readings_df = pd.concat([readings_df, archive_df[READING_COLUMNS]], ignore_index=True)
+
+    return readings_df.drop_duplicates(subset='recording_id').sort_values(
+        by='recording_taken', ascending=False)
+
+
+def load_rds_time_range() -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Fetches the earliest and latest reading_taken in the RDS."""
+    load_dotenv()
+    conn = get_connection()
+    time_range = query_time_range(conn)
+    conn.close()
+
+    return time_range['earliest'], time_range['latest']
+
+
+def load_archive_time_range() -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Returns the earliest and latest recording_taken in the archive, from
+    the .rec block headers, or the .csv archive if there is no .rec yet."""
+    archive_path = download_archive()
+    if archive_path is not None:
+        return archive_time_range(archive_path)
+
+    archive_df = load_archive_csv_df()
+    if archive_df is None or archive_df.empty:
+        return None, None
+
+    return archive_df['recording_taken'].min(), archive_df['recording_taken'].max()
+
+
+def get_time_range() -> tuple[datetime, datetime]:
+    """Returns the earliest and latest recording_taken across the RDS and the
+    archive, without loading any recordings. Both are the current minute if
+    there are no recordings yet."""
+    times = [*cache.get("rds_time_range", RECORDINGS_TTL, load_rds_time_range),
+             *cache.get("archive_time_range", ARCHIVE_TTL, load_archive_time_range)]
+    times = [pd.Timestamp(time) for time in times if time is not None and not pd.isna(time)]
+
+    if not times:
+        now = pd.Timestamp.now().floor('min')
+        return now.to_pydatetime(), now.to_pydatetime()
+
+    return min(times).to_pydatetime(), max(times).to_pydatetime()
+
+
+def get_plant_ids() -> list[int]:
+    """Returns the id of every plant, from the current state table."""
+    return get_current_state()['plant_id'].astype(int).tolist()
+
+
+def get_recordings() -> pd.DataFrame:
+    """Returns the merged short and long-term recordings, newest to oldest,
+    in the compact dtypes of compact.py. The df is shared between charts and
+    sessions, so treat it as read-only."""
+    return cache.get("recordings", RECORDINGS_TTL, recordings_store.refresh)
+
+
+def get_continent_hourly_moisture() -> pd.DataFrame:
+    """Returns the hourly soil moisture summary per continent for the
+    short-term data, as continent_name, hour_start, reading_count
+    and total_soil_moisture."""
+    return cache.get("continent_hourly_moisture", RECORDINGS_TTL,
+                     load_continent_hourly_moisture)
+
+
+def get_current_state() -> pd.DataFrame:
+    """Returns one row per plant with its latest reading, for live views."""
+    return cache.get("current_state", RECORDINGS_TTL, load_current_state)
+
+
+def get_latest_watering() -> pd.DataFrame:
+    """Returns the latest watering time of every plant, from the
+    watering events table."""
+    return cache.get("last_watered", RECORDINGS_TTL, load_last_watered)
+
+
+def get_continent_rollup() -> pd.DataFrame:
+    """Returns the hourly rollup per continent of the long-term data."""
+    return cache.get("continent_rollup", ARCHIVE_TTL, load_continent_rollup)
+
+
+def invalidate_cache() -> None:
+    """Forces the next read of every dataset to fetch fresh data,
+    including a full reload of the recordings history."""
+    recordings_store.clear()
+    cache.invalidate()
@@ -0,0 +1,105 @@
+"""Downsampling of chart data, so the dashboard sends the browser a bounded
+number of points per chart however long the selected time range is.
+
+Two methods are available: largest-triangle-three-buckets (LTTB), which keeps
+the visual shape of a line, and min/max bucketing, which keeps every peak and
+trough and suits bar charts."""
+
+import numpy as np
+import pandas as pd
+
+
+CHART_WIDTH = 800
+POINTS_PER_PIXEL = 2
+
+
+def point_budget(series_count: int = 1, width: int = CHART_WIDTH) -> int:
+    """Returns how many points each series of a chart may send,
+    sharing roughly POINTS_PER_PIXEL points per pixel between them."""
+    return max(width * POINTS_PER_PIXEL // max(series_count, 1), 4)
+
+
+def to_numeric_axis(values: pd.Series) -> np.ndarray:
+    """Returns x values as float64, converting timestamps to epoch nanoseconds."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+
+    return pd.to_datetime(values).to_numpy().astype('datetime64[ns]').astype(np.int64) \
+        .astype(np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Returns the indices of the points kept by largest-triangle-three-buckets.
+    x must be sorted ascending. The first and last points are always kept, and
+    every bucket in between keeps the point forming the largest triangle with
+    the point kept before it and the mean of the next bucket."""
+    point_count = len(x)
+
+    if threshold >= point_count or threshold < 3:
+        return np.arange(point_count)
+
+    edges = np.linspace(1, point_count - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, point_count - 1
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else point_count
+
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+
+    return kept
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Returns the indices of the minimum and maximum point of each of
+    threshold // 2 equal width x buckets, in x order."""
+    point_count = len(x)
+
+    if threshold >= point_count or threshold < 2:
+        return np.arange(point_count)
+
+    bucket_count = threshold // 2
+    span = x[-1] - x[0] or 1
+    buckets = np.minimum(((x - x[0]) / span * bucket_count).astype(np.int64),
+                         bucket_count - 1)
+
+    by_value = np.lexsort((y, buckets))
+    sorted_buckets = buckets[by_value]
+    first = np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]]
+    last = np.r_[sorted_buckets[1:] != sorted_buckets[:-1], True]
+
+    return np.unique(np.concatenate([by_value[first], by_value[last]]))
+
+
+def downsample(df: pd.DataFrame, x_column: str, y_column: str, series_column: str = None,
+               budget: int = None, method: str = "lttb") -> pd.DataFrame:
+    """Returns df reduced to at most budget points per series, keeping rows
+    whole. If budget is not given, the chart's point budget is shared between
+    its series, so short ranges are sent raw and long ranges downsampled."""
+    if df.empty:
+        return df
+
+    groups = [df] if series_column is None else [
+        group for _, group in df.groupby(series_column, sort=False)]
+    budget = budget or point_budget(len(groups))
+    pick = lttb_indices if method == "lttb" else minmax_indices
+
+    sampled = []
+    for group in groups:
+        group = group.sort_values(x_column)
+        y = group[y_column].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(y)
+        group, y = group[valid], y[valid]
+
+        kept = pick(to_numeric_axis(group[x_column]), y, budget)
+        sampled.append(group.iloc[kept])
+
+    return pd.concat(sampled, ignore_index=True)
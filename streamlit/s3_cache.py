@@ -0,0 +1,114 @@
+"""Local disk cache for the files the dashboard reads from the S3 bucket.
+
+Each cached file is stored next to a small metadata file holding its ETag and
+Last-Modified time. Downloads go to a temporary file that replaces the cached
+copy once complete, and the metadata is only written after that, so an
+interrupted download never leaves a partial file marked as up to date. Later
+loads revalidate with a conditional GET, so a file
+is only downloaded again when it has changed on the bucket, which for the
+archive is once a night. The archive .csv is also kept as a parsed feather
+copy, so repeat loads skip the .csv parse as well as the download."""
+
+import json
+from os import environ, makedirs, path, remove, replace
+from datetime import datetime
+import boto3
+from botocore.exceptions import ClientError
+import pandas as pd
+
+
+BUCKET_NAME = 'c14-gbu-storage'
+CACHE_DIR = environ.get("DASHBOARD_CACHE_DIR", "./s3_cache")
+
+
+def cache_paths(object_key: str) -> tuple[str, str]:
+    """Returns the local paths of a cached object and its metadata."""
+    local_path = path.join(CACHE_DIR, object_key)
+    return local_path, f"{local_path}.meta.json"
+
+
+def read_metadata(meta_path: str) -> dict:
+    """Returns the stored metadata of a cached object, or {} if there is none."""
+    try:
+        with open(meta_path, encoding='utf-8') as meta_file:
+            return json.load(meta_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_metadata(meta_path: str, metadata: dict) -> None:
+    """Stores the metadata of a cached object."""
+    with open(meta_path, 'w', encoding='utf-8') as meta_file:
+        json.dump(metadata, meta_file)
+
+
+def remove_if_exists(file_path: str) -> None:
+    """Removes a file, if it exists."""
+    if path.exists(file_path):
+        remove(file_path)
+
+
+def cached_download(s3: boto3.client, object_key: str) -> str:
+    """Returns the local path of an up to date copy of an object on the S3
+    bucket, downloading it only if it is missing locally or has changed since
+    it was cached. Returns None if the object is not on the bucket."""
+    makedirs(CACHE_DIR, exist_ok=True)
+    local_path, meta_path = cache_paths(object_key)
+    metadata = read_metadata(meta_path) if path.exists(local_path) else {}
+
+    conditions = {}
+    if 'etag' in metadata:
+        conditions['IfNoneMatch'] = metadata['etag']
+    if 'last_modified' in metadata:
+        conditions['IfModifiedSince'] = datetime.fromisoformat(metadata['last_modified'])
+
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=object_key, **conditions)
+    except ClientError as error:
+        error_code = error.response['Error']['Code']
+
+        if error_code in ('304', 'NotModified'):
+            return local_path
+        if error_code in ('NoSuchKey', '404'):
+            return None
+        raise
+
+    part_path = f"{local_path}.part"
+    try:
+        with open(part_path, 'wb') as local_file:
+            for chunk in response['Body'].iter_chunks(1024 * 1024):
+                local_file.write(chunk)
+        replace(part_path, local_path)
+    except Exception:
+        remove_if_exists(part_path)
+        remove_if_exists(meta_path)
+        raise
+
+    write_metadata(meta_path, {'etag': response['ETag'],
+                               'last_modified': response['LastModified'].isoformat()})
+
+    return local_path
+
+
+def load_archive_csv(s3: boto3.client,
+                     object_key: str = 'updated_recordings_data.csv') -> pd.DataFrame:
+    """Returns the archive .csv as a df, parsing the .csv only when it has
+    changed and otherwise reading the parsed feather copy. Returns None if
+    there is no archive on the bucket yet."""
+    csv_path = cached_download(s3, object_key)
+
+    if csv_path is None:
+        return None
+
+    etag = read_metadata(cache_paths(object_key)[1]).get('etag')
+    feather_path, feather_meta_path = f"{csv_path}.feather", f"{csv_path}.feather.meta.json"
+
+    if path.exists(feather_path) and read_metadata(feather_meta_path).get('etag') == etag:
+        return pd.read_feather(feather_path)
+
+    archive_df = pd.read_csv(csv_path)
+    archive_df['recording_taken'] = pd.to_datetime(archive_df['recording_taken'])
+    archive_df.to_feather(feather_path)
+    write_metadata(feather_meta_path, {'etag': etag})
+
+    return archive_df
@@ -0,0 +1,115 @@
+"""Test file for the time-bucketing engine in bucketing.py"""
+
+import numpy as np
+import pandas as pd
+from bucketing import bucket_aggregate
+
+
+def make_readings() -> pd.DataFrame:
+    """Returns readings of two plants, one every 20 seconds for ten minutes,
+    with a missing soil moisture and a missing timestamp."""
+    times = pd.date_range("2024-11-27 14:00", periods=30, freq="20s")
+    readings_df = pd.DataFrame({
+        'plant_id': np.tile([1, 2], 30),
+        'recording_taken': np.repeat(times, 2),
+        'soil_moisture': np.arange(60, dtype=np.float64),
+        'temperature': np.linspace(15, 25, 60)
+    })
+    readings_df.loc[3, 'soil_moisture'] = np.nan
+    readings_df.loc[4, 'recording_taken'] = pd.NaT
+    return readings_df
+
+
+AGGREGATIONS = {'moisture_mean': ('soil_moisture', 'mean'),
+                'moisture_sum': ('soil_moisture', 'sum'),
+                'moisture_min': ('soil_moisture', 'min'),
+                'moisture_max': ('soil_moisture', 'max'),
+                'moisture_count': ('soil_moisture', 'count'),
+                'readings': ('temperature', 'size')}
+
+
+def test_bucket_aggregate_matches_pandas():
+    """Tests every aggregation matches pandas grouping on floored times,
+    ignoring missing values and readings without a timestamp."""
+    readings_df = make_readings()
+
+    bucketed_df = bucket_aggregate(readings_df, 'recording_taken', '1min', AGGREGATIONS)
+
+    expected_df = readings_df.dropna(subset=['recording_taken']).groupby(
+        readings_df['recording_taken'].dt.floor('1min')).agg(**AGGREGATIONS).reset_index()
+    pd.testing.assert_frame_equal(bucketed_df, expected_df, check_dtype=False)
+
+
+def test_bucket_aggregate_per_group():
+    """Tests buckets are split per group, oldest bucket first."""
+    readings_df = make_readings()
+
+    bucketed_df = bucket_aggregate(readings_df, 'recording_taken', '5min',
+                                   {'readings': ('soil_moisture', 'size')}, 'plant_id')
+
+    assert bucketed_df['plant_id'].tolist() == [1, 2, 1, 2]
+    assert bucketed_df['recording_taken'].is_monotonic_increasing
+    assert bucketed_df['readings'].tolist() == [14, 15, 15, 15]
+
+
+def test_bucket_aggregate_leaves_out_missing_groups():
+    """Tests readings without a group value are left out, rather than
+    counted in another group's bucket."""
+    readings_df = make_readings().astype({'plant_id': float})
+    readings_df.loc[[0, 1], 'plant_id'] = np.nan
+
+    bucketed_df = bucket_aggregate(readings_df, 'recording_taken', '5min',
+                                   {'readings': ('soil_moisture', 'size'),
+                                    'moisture': ('soil_moisture', 'min')}, 'plant_id')
+
+    assert bucketed_df['plant_id'].tolist() == [1, 2, 1, 2]
+    assert bucketed_df['readings'].tolist() == [13, 14, 15, 15]
+    assert bucketed_df['moisture'].tolist() == [2, 5, 30, 31]
+
+
+def test_bucket_aggregate_between_start_and_end():
+    """Tests only readings between start and end are bucketed."""
+    bucketed_df = bucket_aggregate(make_readings(), 'recording_taken', '1min',
+                                   {'readings': ('soil_moisture', 'size')},
+                                   start="2024-11-27 14:02", end="2024-11-27 14:03:59")
+
+    assert bucketed_df['recording_taken'].tolist() == [
+        pd.Timestamp("2024-11-27 14:02"), pd.Timestamp("2024-11-27 14:03")]
+    assert bucketed_df['readings'].tolist() == [6, 6]
+
+
+def test_bucket_aggregate_fills_empty_buckets():
+    """Tests buckets without readings are included as NaN rows."""
+    readings_df = make_readings()
+    readings_df = readings_df[readings_df['recording_taken'].dt.minute != 2]
+
+    bucketed_df = bucket_aggregate(readings_df, 'recording_taken', '1min',
+                                   {'moisture': ('soil_moisture', 'mean')},
+                                   fill_empty=True)
+
+    assert len(bucketed_df) == 10
+    assert bucketed_df['moisture'].isna().tolist() == [False] * 2 + [True] + [False] * 7
+
+
+def test_bucket_aggregate_reflects_changed_data():
+    """Tests the same df changed in place is bucketed again, not served
+    from a stale result."""
+    readings_df = make_readings()
+    aggregations = {'moisture': ('soil_moisture', 'max')}
+    before_df = bucket_aggregate(readings_df, 'recording_taken', '10min', aggregations)
+
+    readings_df.loc[0, 'soil_moisture'] = 1000
+    after_df = bucket_aggregate(readings_df, 'recording_taken', '10min', aggregations)
+
+    assert before_df['moisture'].tolist() == [59]
+    assert after_df['moisture'].tolist() == [1000]
+
+
+def test_bucket_aggregate_empty_df():
+    """Tests an empty df gives an empty result with the output columns."""
+    empty_df = make_readings().iloc[0:0]
+
+    bucketed_df = bucket_aggregate(empty_df, 'recording_taken', '1min', AGGREGATIONS)
+
+    assert bucketed_df.empty
+    assert list(bucketed_df.columns) == ['recording_taken', *AGGREGATIONS]
@@ -0,0 +1,75 @@
+"""Test file for the compact recordings in compact.py"""
+
+import numpy as np
+import pandas as pd
+from compact import compact_recordings, expand_recordings, RecordingsBuffer
+
+
+def make_recordings(recording_ids: list[int], last_watered: list[str]) -> pd.DataFrame:
+    """Returns recordings newest first, one minute apart, with the given
+    ids and last watered times."""
+    return pd.DataFrame({
+        'recording_id': recording_ids,
+        'plant_id': [recording_id % 3 for recording_id in recording_ids],
+        'last_watered': last_watered,
+        'soil_moisture': [float(recording_id) for recording_id in recording_ids],
+        'temperature': 20.5,
+        'recording_taken': [pd.Timestamp("2024-11-27 12:00") + pd.Timedelta(minutes=recording_id)
+                            for recording_id in recording_ids]
+    })
+
+
+def test_compact_recordings_round_trip():
+    """Tests compact recordings expand back to the original values."""
+    recordings_df = make_recordings([3, 2, 1], ["2024-11-27 09:00"] * 3)
+
+    expanded_df = expand_recordings(compact_recordings(recordings_df))
+
+    assert expanded_df['recording_id'].tolist() == [3, 2, 1]
+    assert expanded_df['last_watered'].tolist() == [pd.Timestamp("2024-11-27 09:00")] * 3
+
+
+def test_buffer_prepends_without_copying_held_rows():
+    """Tests new recordings go in front of the held ones, which stay in
+    the same memory, and new watering times become new categories."""
+    buffer = RecordingsBuffer(compact_recordings(
+        make_recordings([2, 1], ["2024-11-27 09:00", None])))
+    held = buffer.arrays['recording_id']
+
+    buffer.prepend(make_recordings([4, 3], ["2024-11-27 11:00", "2024-11-27 09:00"]))
+    frame = buffer.frame()
+
+    assert buffer.arrays['recording_id'] is held
+    assert np.shares_memory(frame['recording_id'].to_numpy(), held)
+    assert frame['recording_id'].tolist() == [4, 3, 2, 1]
+    assert frame['last_watered'].tolist()[:3] == [
+        pd.Timestamp("2024-11-27 11:00"), pd.Timestamp("2024-11-27 09:00"),
+        pd.Timestamp("2024-11-27 09:00")]
+    assert pd.isna(frame['last_watered'].iloc[3])
+    assert frame['soil_moisture'].dtype == np.float32
+
+
+def test_buffer_grows_when_free_rows_run_out(monkeypatch):
+    """Tests the arrays are reallocated, keeping every row, once new
+    recordings no longer fit in the free rows."""
+    monkeypatch.setattr('compact.HEADROOM_ROWS', 2)
+    buffer = RecordingsBuffer(compact_recordings(make_recordings([1], ["2024-11-27 09:00"])))
+
+    for recording_id in range(2, 8):
+        buffer.prepend(make_recordings([recording_id], ["2024-11-27 09:00"]))
+
+    assert buffer.frame()['recording_id'].tolist() == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_buffer_widens_codes_for_many_watering_times():
+    """Tests the last_watered codes are widened once there are more
+    watering times than the narrow codes can index."""
+    times = [str(pd.Timestamp("2024-01-01") + pd.Timedelta(hours=hour)) for hour in range(200)]
+    buffer = RecordingsBuffer(compact_recordings(make_recordings([1], times[:1])))
+
+    buffer.prepend(make_recordings(list(range(201, 1, -1)), times[::-1]))
+    frame = buffer.frame()
+
+    assert len(frame) == 201
+    assert frame['last_watered'].iloc[0] == pd.Timestamp(times[-1])
+    assert frame['last_watered'].iloc[-1] == pd.Timestamp(times[0])
@@ -0,0 +1,41 @@
+"""Test file for the cache of the dashboard's data layer in data_layer.py"""
+
+from threading import Event, Thread
+from data_layer import TimedCache
+
+
+def test_timed_cache_reuses_value_within_ttl():
+    """Tests a key is loaded once and served from the cache until it expires."""
+    cache = TimedCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get("key", 60, loader) == 1
+    assert cache.get("key", 60, loader) == 1
+    assert cache.get("key", -1, loader) == 2
+
+
+def test_timed_cache_slow_load_does_not_block_other_keys():
+    """Tests another key is served while one key is still loading."""
+    cache = TimedCache()
+    loading, release = Event(), Event()
+
+    def slow_loader():
+        loading.set()
+        release.wait(5)
+        return "archive"
+
+    slow_load = Thread(target=cache.get, args=("archive_file", 60, slow_loader))
+    slow_load.start()
+    loading.wait(5)
+
+    try:
+        assert cache.get("current_state", 60, lambda: "state") == "state"
+    finally:
+        release.set()
+        slow_load.join()
+
+    assert cache.get("archive_file", 60, lambda: "reloaded") == "archive"
@@ -0,0 +1,123 @@
+"""Test file for the chart downsampling in downsample.py"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from downsample import point_budget, lttb_indices, minmax_indices, downsample
+
+
+def make_readings(count: int, plants: int = 1) -> pd.DataFrame:
+    """Returns count minutes of a noisy sine wave of readings per plant."""
+    times = pd.date_range("2024-11-27", periods=count, freq="min")
+    return pd.concat([pd.DataFrame({
+        'plant_id': plant_id,
+        'recording_taken': times,
+        'soil_moisture': 50 + 20 * np.sin(np.arange(count) / 30)
+        + np.random.default_rng(plant_id).normal(0, 2, count)
+    }) for plant_id in range(plants)], ignore_index=True)
+
+
+def test_point_budget_is_shared_between_series():
+    """Tests the budget is split between series, but never below 4 points."""
+    assert point_budget(1, 800) == 1600
+    assert point_budget(4, 800) == 400
+    assert point_budget(1000, 800) == 4
+
+
+@pytest.mark.parametrize('pick', [lttb_indices, minmax_indices])
+def test_indices_stay_within_threshold(pick):
+    """Tests both methods keep at most threshold points, in x order."""
+    x = np.arange(1000, dtype=np.float64)
+    kept = pick(x, np.sin(x / 10), 100)
+
+    assert 0 < len(kept) <= 100
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_first_and_last_points():
+    """Tests LTTB always keeps the first and last points."""
+    x = np.arange(1000, dtype=np.float64)
+    kept = lttb_indices(x, np.cos(x / 7), 3)
+
+    assert kept[0] == 0
+    assert kept[-1] == 999
+
+
+def test_lttb_keeps_a_spike():
+    """Tests LTTB keeps a lone spike that averaging would flatten."""
+    y = np.zeros(1000)
+    y[500] = 100
+
+    assert 500 in lttb_indices(np.arange(1000, dtype=np.float64), y, 50)
+
+
+def test_minmax_keeps_peak_and_trough():
+    """Tests min/max bucketing keeps the highest and lowest points."""
+    y = np.sin(np.arange(1000) / 10)
+
+    kept = minmax_indices(np.arange(1000, dtype=np.float64), y, 20)
+
+    assert np.argmax(y) in kept
+    assert np.argmin(y) in kept
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_short_input_is_unchanged(method):
+    """Tests a series within the budget is returned whole."""
+    readings_df = make_readings(50)
+
+    sampled_df = downsample(readings_df, 'recording_taken', 'soil_moisture',
+                            budget=100, method=method)
+
+    pd.testing.assert_frame_equal(sampled_df, readings_df)
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_bounds_each_series(method):
+    """Tests each series is reduced to the budget."""
+    readings_df = make_readings(5000, plants=3)
+
+    sampled_df = downsample(readings_df, 'recording_taken', 'soil_moisture',
+                            'plant_id', budget=200, method=method)
+
+    assert sampled_df['plant_id'].nunique() == 3
+    assert sampled_df.groupby('plant_id').size().max() <= 200
+
+
+def test_downsample_lttb_keeps_first_and_last_readings():
+    """Tests LTTB keeps each series' first and last readings, so the
+    chart still spans the whole selected range."""
+    readings_df = make_readings(5000, plants=2)
+
+    sampled_df = downsample(readings_df, 'recording_taken', 'soil_moisture',
+                            'plant_id', budget=100)
+
+    for _, plant_df in sampled_df.groupby('plant_id'):
+        assert plant_df['recording_taken'].min() == readings_df['recording_taken'].min()
+        assert plant_df['recording_taken'].max() == readings_df['recording_taken'].max()
+
+
+def test_downsample_drops_nan_and_keeps_single_points():
+    """Tests missing values are dropped before sampling, a series of one
+    reading is kept, and a series with no values is left out."""
+    readings_df = make_readings(500)
+    readings_df.loc[[0, 10, 20], 'soil_moisture'] = np.nan
+    readings_df = pd.concat([readings_df, pd.DataFrame({
+        'plant_id': [1, 2, 2],
+        'recording_taken': pd.to_datetime(["2024-11-27 12:00"] * 3),
+        'soil_moisture': [42.0, np.nan, np.nan]})], ignore_index=True)
+
+    sampled_df = downsample(readings_df, 'recording_taken', 'soil_moisture',
+                            'plant_id', budget=100)
+
+    assert not sampled_df['soil_moisture'].isna().any()
+    assert len(sampled_df[sampled_df['plant_id'] == 0]) <= 100
+    assert sampled_df.loc[sampled_df['plant_id'] == 1, 'soil_moisture'].tolist() == [42.0]
+    assert 2 not in sampled_df['plant_id'].tolist()
+
+
+def test_downsample_empty_df():
+    """Tests an empty df is returned as it is."""
+    empty_df = make_readings(0)
+
+    assert downsample(empty_df, 'recording_taken', 'soil_moisture').empty
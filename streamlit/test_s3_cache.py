@@ -0,0 +1,97 @@
+"""Test file for the local cache of S3 files in s3_cache.py"""
+
+import io
+from os import path
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+import pytest
+import pandas as pd
+from botocore.exceptions import ClientError
+from s3_cache import cached_download, load_archive_csv, cache_paths
+
+
+ARCHIVE_CSV = (b"recording_id,plant_id,last_watered,soil_moisture,temperature,recording_taken\n"
+               b"2,1,2024-11-27 09:00:00,40.5,20.1,2024-11-27 12:01:00\n"
+               b"1,1,2024-11-27 09:00:00,41.0,20.0,2024-11-27 12:00:00\n")
+
+
+def object_response(body: bytes, etag: str = '"v1"') -> dict:
+    """Returns a get_object response streaming body."""
+    stream = io.BytesIO(body)
+    response_body = MagicMock()
+    response_body.iter_chunks.side_effect = lambda size: iter(
+        lambda: stream.read(size), b'')
+    return {'Body': response_body, 'ETag': etag,
+            'LastModified': datetime(2024, 11, 28, tzinfo=timezone.utc)}
+
+
+def not_modified() -> ClientError:
+    """Returns the error boto3 raises for a 304 response."""
+    return ClientError({'Error': {'Code': '304'}}, 'GetObject')
+
+
+@pytest.fixture(name='cache_dir', autouse=True)
+def cache_dir_fixture(tmp_path):
+    """Keeps the cached files in a temporary directory."""
+    with patch('s3_cache.CACHE_DIR', str(tmp_path)):
+        yield tmp_path
+
+
+def test_cached_download_revalidates_with_etag():
+    """Tests a cached file is revalidated with its ETag and not downloaded again."""
+    s3 = MagicMock()
+    s3.get_object.side_effect = [object_response(b'data'), not_modified()]
+
+    first_path = cached_download(s3, 'rollup.csv')
+    second_path = cached_download(s3, 'rollup.csv')
+
+    assert first_path == second_path
+    assert s3.get_object.call_args.kwargs['IfNoneMatch'] == '"v1"'
+    with open(second_path, 'rb') as cached_file:
+        assert cached_file.read() == b'data'
+
+
+def test_cached_download_failure_keeps_no_metadata():
+    """Tests an interrupted download leaves no partial file marked as up
+    to date, so the next load downloads the file again."""
+    s3 = MagicMock()
+    broken = object_response(b'')
+    broken['Body'].iter_chunks.side_effect = ConnectionError
+    s3.get_object.side_effect = [object_response(b'old'), broken,
+                                 object_response(b'new', '"v2"')]
+
+    cached_download(s3, 'rollup.csv')
+    with pytest.raises(ConnectionError):
+        cached_download(s3, 'rollup.csv')
+    local_path, meta_path = cache_paths('rollup.csv')
+
+    assert not path.exists(meta_path)
+    assert not path.exists(f"{local_path}.part")
+    cached_download(s3, 'rollup.csv')
+    assert 'IfNoneMatch' not in s3.get_object.call_args.kwargs
+    with open(local_path, 'rb') as cached_file:
+        assert cached_file.read() == b'new'
+
+
+def test_cached_download_missing_object():
+    """Tests None is returned when the object is not on the bucket."""
+    s3 = MagicMock()
+    s3.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+    assert cached_download(s3, 'missing.csv') is None
+
+
+def test_load_archive_csv_reads_feather_copy_until_changed():
+    """Tests the archive .csv is parsed once and then read from its feather
+    copy, with recording_taken as datetimes."""
+    s3 = MagicMock()
+    s3.get_object.side_effect = [object_response(ARCHIVE_CSV), not_modified()]
+
+    parsed_df = load_archive_csv(s3)
+    with patch('s3_cache.pd.read_csv') as mock_read_csv:
+        cached_df = load_archive_csv(s3)
+
+    mock_read_csv.assert_not_called()
+    pd.testing.assert_frame_equal(cached_df, parsed_df)
+    assert cached_df['recording_taken'].tolist() == [
+        pd.Timestamp("2024-11-27 12:01"), pd.Timestamp("2024-11-27 12:00")]